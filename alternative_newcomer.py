@@ -11,9 +11,58 @@ Template AI Player
 """
 
 from tcg.controller import Controller
+from .common.anytime import AnytimeRunner, default_budget_ms
+from .common.arbiter import ActionArbiter
+from .common.config import Config
+from .common.deltas import DeltaEngine
+from .common.game_state import GameState
+from .common.graph import get_graph
+from .common.logistics import LogisticsPlanner
+from .common.profiling import make_profiler
+from .common.telemetry import make_telemetry
 import random
 
 
+class NewComerConfig(Config):
+    """NewComer の調整用の定数 (既定値は調整前の値)"""
+
+    DEFAULTS = {
+        # 防御的な設定（多くの部隊を溜められる）
+        "fortress_limit": [10, 10, 20, 30, 40, 50],
+        # FORTRESS_IMPORTANCEの設定はとりあえず一緒
+        "fortress_importance": {
+            0: 10, 1: 10, 2: 10,      # 上側エリア
+            3: 1, 4: 10, 5: 1,     # 中央上
+            6: 4, 7: 10, 8: 1,     # 中央下
+            9: 10, 10: 10, 11: 10     # 下側エリア
+        },
+        "key_upgrade_ratio": 0.4,        # 重要拠点 (4, 7) は上限の40%で強化開始
+        "upgrade_ratio": 0.5,            # その他の要塞の強化開始
+        "neutral_multiplier": 1.5,       # 中立を狙う兵力差
+        "attack_min_troops": 15,         # 攻撃する最低兵数
+        "attack_min_ratio": 0.5,         # 〃 (上限に対する割合)
+        "success_threshold": 3.0,        # 敵要塞を攻撃する戦力比
+        "success_threshold_ahead": 0.5,  # 〃 (総兵力で大差がついている時)
+        "dominance_ratio": 3,            # 総兵力が敵の何倍なら大差とみなすか
+        "late_neutral_threshold": 2.0,   # 終盤に中立を攻撃する戦力比
+        "late_neutral_dominance": 4,     # 〃 の大差の倍率 (大差なら success_threshold_ahead)
+        "brigade_threshold": 10,         # 前線へのバケツリレーで送り出す最低兵数
+    }
+    SPACE = {
+        "key_upgrade_ratio": (0.2, 0.9),
+        "upgrade_ratio": (0.2, 0.9),
+        "neutral_multiplier": (1.0, 3.0),
+        "attack_min_troops": (5, 30),
+        "attack_min_ratio": (0.2, 0.9),
+        "success_threshold": (0.8, 5.0),
+        "success_threshold_ahead": (0.2, 2.0),
+        "dominance_ratio": (2, 10),
+        "late_neutral_threshold": (0.8, 4.0),
+        "late_neutral_dominance": (2, 10),
+        "brigade_threshold": (2, 30),
+    }
+
+
 class NewComer(Controller):
     """
     テンプレートAIプレイヤー
@@ -21,27 +70,36 @@ class NewComer(Controller):
     このクラスをベースに独自の戦略を実装してください。
     """
 
-    # 防御的な設定（多くの部隊を溜められる）
-    fortress_limit = [10, 10, 20, 30, 40, 50]
+    # 自分をチーム1 (上側) と決め打ちしている (state[i][0] == 1 など)。チーム2 の時は反転した盤面が来る
+    team_one_view = True
 
-    # FORTRESS_IMPORTANCEの設定はとりあえず一緒
-    FORTRESS_IMPORTANCE = {
-        0: 10, 1: 10, 2: 10,      # 上側エリア
-        3: 1, 4: 10, 5: 1,     # 中央上
-        6: 4, 7: 10, 8: 1,     # 中央下
-        9: 10, 10: 10, 11: 10     # 下側エリア
-    }
+    config_class = NewComerConfig
+
+    # 防御的な設定・要塞の重要度 (調整できるのは NewComerConfig 側)
+    fortress_limit = NewComerConfig.DEFAULTS["fortress_limit"]
+    FORTRESS_IMPORTANCE = NewComerConfig.DEFAULTS["fortress_importance"]
 
     UP_FORTRESS_PRIORITY = [1, 2, 0, 4]
     DOWM_FORTRESS_PRIORITY = [10, 9, 11, 7]
 
 
-    def __init__(self) -> None:
+    def __init__(self, budget_ms=None, config=None) -> None:
         super().__init__()
+        self.config = config or NewComerConfig()
+        self.fortress_limit = self.config.fortress_limit
+        self.FORTRESS_IMPORTANCE = self.config.fortress_importance
         self.step = 0
-        self.prev_team_state = None # 前のターンのチーム状態を保存する変数
+        self.deltas = DeltaEngine() # 前のターンからの盤面の変化
         self.attacking_fort = None # 攻撃中の砦ID
         self.target_fort = None # 攻撃目標の砦ID
+        self.graph = None # 全点対距離テーブル (最初のtickで構築)
+        self.logistics = LogisticsPlanner(self.fortress_limit) # 全前線への補給をまとめて計画する
+        self.telemetry = make_telemetry("newcomer") # 計測 (既定は無効で no-op)
+        self.profiler = make_profiler("newcomer") # 段階ごとの時間・候補数 (既定は無効で no-op)
+        # 判断は段階ごとに区切って回し、持ち時間を超えたらそこまでの最良を返す (既定は締め切り無し)
+        self.runner = AnytimeRunner(self.profiler.wrap(self.decide),
+                                    budget_ms if budget_ms is not None else default_budget_ms(),
+                                    carry=self.carry)
 
     def team_name(self) -> str:
         """
@@ -69,21 +127,10 @@ class NewComer(Controller):
         if target_id is None:
             return
 
-        # 1. ターゲットからの距離マップを作成 (BFS)
-        dist_map = {i: 999 for i in range(12)}
-        dist_map[target_id] = 0
-        queue = [target_id]
-        visited = {target_id}
-        
-        while queue:
-            curr = queue.pop(0)
-            d = dist_map[curr]
-            neighbors = state[curr][5] # 5番目が隣接リスト
-            for n in neighbors:
-                if n not in visited:
-                    visited.add(n)
-                    dist_map[n] = d + 1
-                    queue.append(n)
+        # 1. ターゲットからの距離マップ (全点対距離テーブルの行を参照)
+        if self.graph is None:
+            self.graph = get_graph(state)
+        dist_map = self.graph.dist[target_id]
 
         # 2. 各要塞について、よりターゲットに近い味方要塞へ移動
         for my_fort in my_fortresses:
@@ -126,42 +173,51 @@ class NewComer(Controller):
         """
         戦略的な判断でコマンドを選択（改善版 - アップグレード優先）
         """
-        team, state, moving_pawns, spawning_pawns, done = info
         self.step += 1
+        return self.runner.update(info)
 
-        # 優先度付きアクションリスト
-        actions = []
-        # considered_actions = set()  # 重複防止
+    def carry(self, info):
+        """
+        判断を持ち越したtick (decide を回さないtick) でも前tickとの差分は進めておく
+        """
+        self.deltas.update(info[1])
 
-        # 前フレームから今回までで「新しく自軍になった砦」を検出
-        newly_captured = set()
-        current_teams = [state[i][0] for i in range(12)]
+    def decide(self, info):
+        """
+        update() の本体。段階ごとに今の最良候補を yield する (common/anytime.py)
+        """
+        team, state, moving_pawns, spawning_pawns, done = info
+        config = self.config
+        # 盤面ビュー (チーム別の要塞リスト・兵力集計をtickごとに一度だけ作る)
+        state = GameState(state, team, moving_pawns, spawning_pawns, self.graph)
+        if done:
+            # 試合終了: 1試合分の要約を書き出す
+            self.telemetry.export(step=self.step)
 
-        if self.prev_team_state is not None:
-            for i in range(12):
-                # 0(中立) or 2(敵) から 1(自軍) になったものを新規占領とみなす
-                if self.prev_team_state[i] != 1 and current_teams[i] == 1:
-                    newly_captured.add(i)
+        # 優先度付きアクション (最良の1件だけ残す。同じ (cmd, src, dst) はまとめる)
+        actions = ActionArbiter()
 
-        # 今回の状態を保存
-        self.prev_team_state = current_teams[:]
+        # 前フレームからの変化 (所有・レベル・強化) は DeltaEngine でまとめて計算する
+        delta = self.deltas.update(state)
+        # 0(中立) or 2(敵) から 1(自軍) になったものを新規占領とみなす
+        newly_captured = delta.gained(1)
 
         # 自分の要塞と敵の要塞を分類
-        my_fortresses = [i for i in range(12) if state[i][0] == 1]
-        enemy_fortresses = [i for i in range(12) if state[i][0] == 2]
-        neutral_fortresses = [i for i in range(12) if state[i][0] == 0]
+        my_fortresses = state.forts(1)
+        enemy_fortresses = state.forts(2)
+        neutral_fortresses = state.forts(0)
 
         # --- 全兵士数の計算 ---
         
         # 1. 砦の中にいる兵士の総数 (state[i][3] が兵士数)
         # state[i][0] が所有チーム (0:中立, 1:自分, 2:敵 ※自分が2の場合は逆)
-        total_in_forts = sum(int(s[3]) for s in state)
+        total_in_forts = state.fort_soldiers()
 
         # 2. 移動中の兵士の総数 (リストの長さがそのまま人数)
-        total_moving = len(moving_pawns)
+        total_moving = state.moving_count()
 
         # 3. 出撃待機中の兵士の総数 (spawning_pawns[i][2] が残りの出撃数)
-        total_spawning = sum(int(p[2]) for p in spawning_pawns)
+        total_spawning = state.spawning_count()
 
         # 全合計
         total_soldiers = total_in_forts + total_moving + total_spawning
@@ -170,18 +226,10 @@ class NewComer(Controller):
         enemy_team_id = 2 if team == 1 else 1
         
         # 自分の総兵力
-        my_soldiers = (
-            sum(int(s[3]) for s in state if s[0] == my_team_id) +
-            len([p for p in moving_pawns if p[0] == my_team_id]) +
-            sum(int(p[2]) for p in spawning_pawns if p[0] == my_team_id)
-        )
+        my_soldiers = state.soldiers(my_team_id)
 
         # 敵の総兵力
-        enemy_soldiers = (
-            sum(int(s[3]) for s in state if s[0] == enemy_team_id) +
-            len([p for p in moving_pawns if p[0] == enemy_team_id]) +
-            sum(int(p[2]) for p in spawning_pawns if p[0] == enemy_team_id)
-        )
+        enemy_soldiers = state.soldiers(enemy_team_id)
 
         # ゲームフェーズの判定 (取得要塞数で判断)
         my_fortress_num = len(my_fortresses)
@@ -194,60 +242,44 @@ class NewComer(Controller):
         else:
             phase = "late"
 
-        # デバッグ情報（序盤のみ表示）
-        if self.step % 1000 == 0:
-            print(f"\n=== Step {self.step} ({phase}) ===")
-            print(f"自分の要塞数: {len(my_fortresses)}, 敵の要塞数: {len(enemy_fortresses)}, 中立: {len(neutral_fortresses)}")
-            for my_fort in my_fortresses:
-                level = state[my_fort][2]
-                troops = state[my_fort][3]
-                max_troops = self.fortress_limit[level]
-                flag = " (NEW)" if my_fort in newly_captured else ""
-                print(f"  要塞{my_fort}{flag}: Lv{level}, 部隊{troops}/{max_troops}, 充填率{troops/max_troops*100:.1f}%")
-            print(f"全兵士数: {total_soldiers} (砦内: {total_in_forts}, 移動中: {total_moving}, 出撃待機: {total_spawning})")
-            print(f"自分の総兵力: {my_soldiers}, 敵の総兵力: {enemy_soldiers}")
+        # 状況のテレメトリ (無効なら何もしない。標準出力には書かない)
+        telemetry = self.telemetry
+        if telemetry.enabled:
+            telemetry.count("phase." + phase)
+            telemetry.gauge("forts.mine", len(my_fortresses))
+            telemetry.gauge("forts.enemy", len(enemy_fortresses))
+            telemetry.gauge("soldiers.mine", my_soldiers)
+            telemetry.gauge("soldiers.enemy", enemy_soldiers)
+            if self.step % 1000 == 0:
+                telemetry.event("status", step=self.step, phase=phase, neutral=len(neutral_fortresses),
+                                total=total_soldiers, in_forts=total_in_forts, moving=total_moving,
+                                spawning=total_spawning,
+                                forts=[(f, state[f][2], state[f][3], f in newly_captured) for f in my_fortresses])
+
+        # 区切り: ここまでは候補なし (締め切りならこのtickは何もしない)
+        profiler = self.profiler
+        profiler.stage("setup", actions)
+        yield None
 
         # === 緊急防御: 改良版 (Concrete Defense + Bucket Brigade) ===
-        under_attack_info = {} # key: target_fort_id, value: {total_enemy: int, min_dist: float}
-        incoming_reinforcements = {} # key: target_fort_id, value: total_friendly_troops
-
-        # 1. 移動中の部隊を分析（敵の攻撃と、味方の援軍）
-        for pawn in moving_pawns:
-            pawn_team, kind, from_, to, pos = pawn
-            
-            # 距離計算
-            if isinstance(pos, (list, tuple)):
-                dist = 1.0
-            else:
-                dist = max(1.0, 100 - float(pos))
-
-            # ケースA: 敵軍(2) -> 自軍(1) への攻撃
-            if pawn_team == 2 and state[to][0] == 1:
-                if to not in under_attack_info:
-                    under_attack_info[to] = {"total_enemy": 0, "min_dist": 999.0}
-                
-                under_attack_info[to]["total_enemy"] += kind
-                if dist < under_attack_info[to]["min_dist"]:
-                    under_attack_info[to]["min_dist"] = dist
-            
-            # ケースB: 自軍(1) -> 自軍(1) への移動（既存の援軍）
-            elif pawn_team == 1 and state[to][0] == 1:
-                incoming_reinforcements[to] = incoming_reinforcements.get(to, 0) + kind
+        # 1. 移動中の部隊を要塞ごとに集計（敵の攻撃と、味方の援軍）
+        in_flight = state.in_flight
+        enemy_nearest = in_flight.nearest(2)         # 最も近い敵までの距離
+        under_attack = [to for to in in_flight.targets(2) if state[to][0] == 1]
+        under_attack_info = set(under_attack)
+        forecast = state.forecast()
 
         # 2. 防御アクションの生成
         worst_target = None
         max_shortage = 0
 
-        for target_fort, info in under_attack_info.items():
-            total_enemy_troops = info["total_enemy"]
-            min_dist = info["min_dist"] # 最も近い敵までの距離（緊急度の指標）
-            
-            current_defenders = state[target_fort][3]
-            already_coming = incoming_reinforcements.get(target_fort, 0)
+        for target_fort in under_attack:
+            min_dist = enemy_nearest[target_fort] # 最も近い敵までの距離（緊急度の指標）
             
-            # 防衛に必要な兵力計算（敵総兵力の1.2倍を安全圏とする）
-            # 現在の兵力 + 既にや向かっている援軍 で足りているか？
-            needed_troops = (total_enemy_troops * 1.2) - (current_defenders + already_coming)
+            # 防衛に必要な兵力計算
+            # 現在の兵力 + 既に向かっている援軍 + 生産 で、到着順に受け止めきれるかを先読みする
+            # (落ちないと予測された要塞は援軍を要請しない)
+            needed_troops = forecast.needed(target_fort)
             
             # 兵力が不足している場合のみ援軍を要請
             if needed_troops > 0:
@@ -270,12 +302,16 @@ class NewComer(Controller):
                         priority = 200 + urgency_bonus + needed_troops
                         actions.append((priority, 1, my_fort, target_fort))
 
+        profiler.stage("defense", actions)
+
         # 3. 深刻な危機の場合、バケツリレーで遠方からも支援する
         if worst_target is not None and max_shortage >= 15:
              # バケツリレー関数を利用して、全軍に支援要請（優先度はbucket_brigade内で10000+で設定される）
              self.execute_bucket_brigade(worst_target, state, my_fortresses, actions)
-             if self.step < 500:
-                 print(f"  防衛バケツリレー発動: ターゲット{worst_target} (不足{max_shortage:.1f})")
+             telemetry.event("defense.brigade", step=self.step, fort=worst_target, shortage=max_shortage)
+
+        profiler.stage("defense_brigade", actions)
+        yield actions.best()
 
         # === アップグレード戦略（序盤最優先）===
         # 序盤は部隊を溜めるためにアップグレードを最優先
@@ -302,12 +338,12 @@ class NewComer(Controller):
                 if (state[fort_id][4] == -1 and 
                     (level < max_upgrade_level or my_soldiers > 200) and
                     level < 5 and
-                    troops >= self.fortress_limit[level] * 0.4):  # 40%で開始
+                    troops >= self.fortress_limit[level] * config.key_upgrade_ratio):  # 既定は40%で開始
                     priority = upgrade_priority_base + 50 + level * 10
                     actions.append((priority, 2, fort_id, 0))
                     # print("LAUNCH UPGRADE")
-                    if self.step < 500:
-                        print(f"    重要拠点アップグレード計画: 要塞{fort_id} Lv{level}→{level+1} (優先度{priority})")
+                    telemetry.count("plan.upgrade_key")
+        profiler.stage("upgrade_key", actions)
 
         # その他の要塞のアップグレード
         for my_fort in my_fortresses:
@@ -318,7 +354,7 @@ class NewComer(Controller):
                 enemy_neighbors = self.count_enemy_neighbors(my_fort, state)
                 
                 # 序盤は積極的にアップグレード
-                troops_threshold = self.fortress_limit[level] * (0.5 if phase == "early" else 0.5)
+                troops_threshold = self.fortress_limit[level] * config.upgrade_ratio
                 
                 if (state[my_fort][4] == -1 and 
                     (level < max_upgrade_level or my_soldiers > 200) and
@@ -335,8 +371,7 @@ class NewComer(Controller):
                         priority += 1000
                     actions.append((priority, 2, my_fort, 0)) 
                     # print("LAUNCH UPGRADE")
-                    if self.step < 500:
-                        print(f"    アップグレード計画: 要塞{my_fort} Lv{level}→{level+1} (優先度{priority})")
+                    telemetry.count("plan.upgrade")
         
         # # === 新規占領要塞の優先アップグレード ===
         # for fort_id in newly_captured:
@@ -355,6 +390,9 @@ class NewComer(Controller):
         #                     print(f"    新規占領アップグレード計画: 要塞{fort_id} Lv{level}→{level+1} (優先度{priority}, 部隊{troops})")
 
 
+        profiler.stage("upgrade", actions)
+        yield actions.best()
+
         # === 序盤戦略: ターゲット集中一斉攻撃 ===
         if (phase in ["early", "mid"]):
             # 1. ターゲット状態の更新
@@ -362,8 +400,7 @@ class NewComer(Controller):
                 # ターゲットが既に自分のものになったかチェック
                 if state[self.target_fort][0] == 1:
                     # 占領完了！ターゲット解除
-                    if self.step < 500:
-                        print(f"    占領完了: {self.target_fort} を確保しました")
+                    telemetry.event("target.captured", step=self.step, fort=self.target_fort)
                     self.target_fort = None
             
             # 2. 新規ターゲットの探索 (ターゲットがない場合のみ)
@@ -387,14 +424,14 @@ class NewComer(Controller):
                                 
                                 # 評価関数
                                 score = 0
-                                multiplier = 1.5
+                                multiplier = config.neutral_multiplier
                                 if (neighbor in [6, 8] and (my_fortress_num == 3 or my_fortress_num == 4)):
                                     # 戦略的に重要拠点は4番目にとってほしい
                                     score += 1000 # 重要拠点
                                     # 取れるならすぐに取ってほしい
                                     if (my_soldiers > 100):
                                         multiplier = 1.0
-                                    print("IMPORTANT TARGET!")
+                                    telemetry.count("target.important")
                                 score -= neutral_troops # 敵が少ない方がいい
                                 
                                 # 兵力差チェック (1.5倍以上)
@@ -406,8 +443,8 @@ class NewComer(Controller):
                 
                 if best_target is not None:
                     self.target_fort = best_target
-                    if self.step < 500:
-                        print(f"    新規ターゲット設定: {best_target} (トリガー: {best_trigger_fort})")
+                    telemetry.event("target.new", step=self.step, fort=best_target,
+                                    trigger=best_trigger_fort)
 
             # 3. 一斉攻撃の実行 (ターゲットがある場合)
             if self.target_fort is not None:
@@ -428,8 +465,7 @@ class NewComer(Controller):
                             # 兵力が多い砦から順次攻撃コマンドが発行される（自然なラウンドロビンになる）
                             priority = 10000 + troops
                             actions.append((priority, 1, my_fort, target))
-                            if self.step < 500:
-                                print(f"    一斉攻撃参加: {my_fort}→{target} (兵力{troops})")
+                            telemetry.count("plan.all_in")
                 
                 # バケツリレーを実行
                 self.execute_bucket_brigade(target, state, my_fortresses, actions)
@@ -491,10 +527,13 @@ class NewComer(Controller):
         #                         actions.append((priority, 1, my_fort, neighbor))
         #                         # considered_actions.add(action_key)
 
+        profiler.stage("neutral_target", actions)
+        yield actions.best()
+
         # === 敵要塞への戦略的攻撃 ===
         for my_fort in my_fortresses:
             level = state[my_fort][2]
-            min_troops = max(15, self.fortress_limit[level] * 0.5)
+            min_troops = max(config.attack_min_troops, self.fortress_limit[level] * config.attack_min_ratio)
             
             if state[my_fort][3] >= min_troops:
                 neighbors = state[my_fort][5]
@@ -511,9 +550,15 @@ class NewComer(Controller):
                         success_ratio = my_troops / max(adjusted_enemy_strength, 1)
                         # 取られて間もない要塞なら問題なく攻撃を開始する
                         if (state[neighbor][0] == 2):
-                            success_threshold = 0.5 if (my_soldiers > enemy_soldiers * 3) else 3.0
+                            if my_soldiers > enemy_soldiers * config.dominance_ratio:
+                                success_threshold = config.success_threshold_ahead
+                            else:
+                                success_threshold = config.success_threshold
                         elif (state[neighbor][0] == 0 and phase == "late"):
-                            success_threshold = 0.5 if (my_soldiers > enemy_soldiers * 4) else 2.0
+                            if my_soldiers > enemy_soldiers * config.late_neutral_dominance:
+                                success_threshold = config.success_threshold_ahead
+                            else:
+                                success_threshold = config.late_neutral_threshold
                         
                         if success_ratio >= success_threshold:  # 敵はより慎重に
                             importance = self.FORTRESS_IMPORTANCE.get(neighbor, 5)
@@ -522,18 +567,25 @@ class NewComer(Controller):
                             actions.append((priority, 1, my_fort, neighbor))
                             # considered_actions.add(action_key)
 
+        profiler.stage("attack", actions)
+        yield actions.best()
+
         # === 常時補給 (Logistics Supply) ===
         # ターゲットや防御対象がない場合でも、常に前線に兵を送る
         # 敵に隣接する自軍要塞を「前線」とみなす
         front_lines = [f for f in my_fortresses if self.count_enemy_neighbors(f, state) > 0]
         
-        # 前線要塞それぞれに対してバケツリレーを設定
+        # 全前線へのバケツリレーを1回で計画する (要塞ごとに送り先は1つ。距離が同じなら不足の大きい前線へ)
         if front_lines:
+            shortages = {}
             for fort in front_lines:
-                self.execute_bucket_brigade(fort, state, my_fortresses, actions, 
-                                          priority_base=50, 
-                                          troops_threshold=10, 
-                                          ignore_direct_neighbors=False)
+                enemy_adjacent = sum(state[n][3] for n in state[fort][5] if state[n][0] == 2)
+                shortages[fort] = max(0, enemy_adjacent - state[fort][3]) + forecast.needed(fort)
+            actions.extend(self.logistics.plan(state, my_fortresses, shortages, priority_base=50,
+                                               troops_threshold=config.brigade_threshold))
+
+        profiler.stage("front_brigade", actions)
+        yield actions.best()
 
         # === オーバーフロー防止 (Overflow Protection) ===
         # 前線の要塞などが満杯になった場合、隣接する味方へ兵を逃がす
@@ -577,21 +629,21 @@ class NewComer(Controller):
                         # バケツリレーのoverflow_bonus(300)と同等の優先度を持たせる
                         priority = 300 + best_score
                         actions.append((priority, 1, my_fort, best_receiver))
-                        if self.step < 500 and self.step % 10 == 0:
-                             print(f"  オーバーフロー防止: {my_fort}→{best_receiver} (score:{best_score:.1f})")
+                        telemetry.count("plan.overflow")
+        profiler.stage("overflow", actions)
 
         # 最も優先度の高いアクションを実行
         if actions:
-            actions.sort(reverse=True, key=lambda x: x[0])
-            _, command, subject, to = actions[0]
+            priority, command, subject, to = actions.best()
             
-            # デバッグ出力
-            if self.step < 500:
+            if telemetry.enabled:
                 if command == 1:
-                    action_type = "攻撃" if state[to][0] != 1 else "支援"
-                    print(f"  → 実行: {action_type} {subject}→{to} (優先度{actions[0][0]})")
-                elif command == 2:
-                    print(f"  → 実行: アップグレード 要塞{subject} (優先度{actions[0][0]})")
+                    action_type = "attack" if state[to][0] != 1 else "support"
+                else:
+                    action_type = "upgrade"
+                telemetry.count("action." + action_type)
+                telemetry.event("action", every=20, step=self.step, type=action_type,
+                                src=subject, dst=to, priority=priority, candidates=actions.considered)
             
             return command, subject, to
 
@@ -0,0 +1,7 @@
+"""共通部品 - 複数のプレイヤーで共有するユーティリティ."""
+
+from .game_state import GameState
+from .graph import FortressGraph, UNREACHABLE, get_graph
+from .logger import GameLogger
+
+__all__ = ["FortressGraph", "GameLogger", "GameState", "UNREACHABLE", "get_graph"]
@@ -0,0 +1,130 @@
+"""
+anytime.py - 締め切りつきの update() (途中で打ち切っても最良の手を返す)
+
+エンジンは毎フレーム答えを待つが、update() の所要時間には上限が無かった。
+AnytimeRunner は判断を「段階ごとに今の最良候補を yield するジェネレータ」として回し、
+締め切りが来たらそこまでの最良候補を返す。残りの段階は次のtickに続きから回す。
+
+    def decide(self, info):                  # ジェネレータ
+        ...                                  # 1段目 (防御など)
+        yield actions.best()                 # 今の最良 (priority, cmd, src, dst) か None
+        ...                                  # 2段目
+        yield actions.best()
+        return cmd, src, dst                 # 最後まで回った時の答え
+
+    self.runner = AnytimeRunner(self.decide, budget_ms=5)
+    def update(self, info):
+        return self.runner.update(info)
+
+  - budget_ms=None なら締め切り無し (毎tick最後まで回すので、ジェネレータにする前と同じ)
+  - 締め切りつきで判断を始める時は盤面 (要塞の行・移動中/出撃待ちの兵) を複製して渡す。
+    エンジンは行や兵のリストをその場で書き換えるので、複製しないと持ち越した判断が
+    途中から次のtickの盤面を読んでしまう。持ち越した判断は始めたtickの盤面のまま進むので、
+    max_carry tick を超えたら捨てて作り直す
+  - carry を渡すと、判断を新しく始めないtick (持ち越したtick) に carry(info) を呼ぶ
+    (tick数や前tickとの差分など、毎tick進めたいものを進める用)
+  - 途中で返した手と最後まで回した答えが同じなら、同じ手を2回打たないよう2回目は (0, 0, 0)
+  - 試合終了 (done) のtickは締め切りを無視して最後まで回す (ログの書き出しなど)
+
+既定の持ち時間は環境変数 TCG_UPDATE_BUDGET_MS (未設定なら締め切り無し)。
+"""
+import os
+import time
+
+NOOP = (0, 0, 0)
+BUDGET_ENV = "TCG_UPDATE_BUDGET_MS"
+
+
+def default_budget_ms():
+    """TCG_UPDATE_BUDGET_MS (未設定・空なら None)"""
+    value = os.environ.get(BUDGET_ENV, "").strip()
+    return float(value) if value else None
+
+
+def snapshot(info):
+    """info の盤面を複製する (行と兵のリストは1段ずつ。隣接リストはエンジンが書き換えないので共有)"""
+    team, state, moving_pawns, spawning_pawns, done = info
+    return (team, [list(s) for s in state], [list(p) for p in moving_pawns],
+            [list(p) for p in spawning_pawns], done)
+
+
+def run_to_end(generator):
+    """ジェネレータを最後まで回して return の値を返す"""
+    try:
+        while True:
+            next(generator)
+    except StopIteration as stop:
+        return stop.value
+
+
+class AnytimeRunner:
+    def __init__(self, decide, budget_ms=None, max_carry=2, clock=time.perf_counter, carry=None):
+        self.decide = decide
+        self.carry = carry
+        self.budget = budget_ms / 1000.0 if budget_ms else None
+        self.max_carry = max_carry
+        self.clock = clock
+        self._pending = None      # 途中の判断 (ジェネレータ)
+        self._best = None         # その判断がこれまでに出した最良候補
+        self._committed = None    # その判断から途中で返した手
+        self._carried = 0         # 持ち越したtick数
+        # 集計
+        self.completed = 0        # 最後まで回った判断の数
+        self.expired = 0          # 締め切りで打ち切ったtickの数
+        self.dropped = 0          # 持ち越しすぎて捨てた判断の数
+
+    def _reset(self):
+        self._pending = None
+        self._best = None
+        self._committed = None
+        self._carried = 0
+
+    def update(self, info) -> tuple:
+        if info[4] or self.budget is None:
+            # 締め切り無し (または試合終了): 途中の判断は捨てて今の盤面で最後まで回す
+            if self._pending is not None:
+                self.dropped += 1
+            self._reset()
+            self.completed += 1
+            return run_to_end(self.decide(info)) or NOOP
+
+        deadline = self.clock() + self.budget
+        if self._pending is not None and self._carried >= self.max_carry:
+            self._reset()
+            self.dropped += 1
+        if self._pending is None:
+            self._pending = self.decide(snapshot(info))
+        else:
+            self._carried += 1
+            if self.carry is not None:
+                self.carry(info)
+
+        generator = self._pending
+        try:
+            while True:
+                candidate = next(generator)
+                if candidate is not None:
+                    self._best = candidate
+                if self.clock() >= deadline:
+                    break
+        except StopIteration as stop:
+            result = tuple(stop.value or NOOP)
+            committed = self._committed
+            self._reset()
+            self.completed += 1
+            if committed is not None and result == committed:
+                return NOOP
+            return result
+
+        # 締め切り: ここまでの最良を返し、残りは次のtickに持ち越す
+        self.expired += 1
+        if self._best is None:
+            return NOOP
+        command = tuple(self._best[1:])
+        if command == self._committed:
+            return NOOP
+        self._committed = command
+        return command
+
+    def stats(self) -> dict:
+        return {"completed": self.completed, "expired": self.expired, "dropped": self.dropped}
@@ -0,0 +1,101 @@
+"""
+arbiter.py - 行動候補の調停
+
+各プレイヤーは候補 (priority, cmd, src, dst) を全部リストに積んでから
+sort して先頭だけ使っていた。ActionArbiter は積む時点で最良だけを残す
+(k > 1 なら上位k件だけを小さなヒープで持つ) ので、リストもソートも要らない。
+
+    actions = ActionArbiter()
+    actions.append((priority, 1, src, dst))   # list と同じ書き方で積める
+    if actions:
+        priority, command, subject, to = actions.best()
+
+- 優先度が同じなら先に積んだ方が勝つ (list.sort(reverse=True) の安定ソートと同じ)
+- 同じ (cmd, src, dst) は一番高い優先度の1件にまとめる
+"""
+import heapq
+
+
+class ActionArbiter:
+    """優先度付きの行動候補から最良 (または上位k件) を選ぶ"""
+
+    __slots__ = ("k", "_best", "_heap", "_entries", "_seq", "_count")
+
+    def __init__(self, k=1):
+        self.k = k
+        self._best = None        # k == 1 用: 今の最良 (priority, cmd, src, dst)
+        self._heap = []          # k > 1 用: [priority, -seq, action] の最小ヒープ
+        self._entries = {}       # (cmd, src, dst) -> ヒープ内のエントリ
+        self._seq = 0
+        self._count = 0          # 積まれた候補の数 (重複・落選も含む)
+
+    def append(self, action):
+        """候補 (priority, cmd, src, dst) を追加する"""
+        self._count += 1
+        priority = action[0]
+        if self.k == 1:
+            # 最良だけ持つなら重複は気にしなくてよい
+            best = self._best
+            if best is None or priority > best[0]:
+                self._best = action
+            return
+
+        key = (action[1], action[2], action[3])
+        self._seq += 1
+        heap = self._heap
+        entry = self._entries.get(key)
+        if entry is not None:
+            # 重複: 高い方だけ残す (同点の並びは高い方を積んだ時点で決まる)
+            if priority > entry[0]:
+                entry[0] = priority
+                entry[1] = -self._seq
+                entry[2] = action
+                heapq.heapify(heap)
+            return
+        entry = [priority, -self._seq, action]
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+            self._entries[key] = entry
+        elif entry > heap[0]:
+            dropped = heapq.heapreplace(heap, entry)
+            a = dropped[2]
+            del self._entries[(a[1], a[2], a[3])]
+            self._entries[key] = entry
+
+    # list.extend 相当
+    def extend(self, actions):
+        for action in actions:
+            self.append(action)
+
+    def best(self):
+        """最良の候補 (無ければ None)"""
+        if self.k == 1:
+            return self._best
+        if not self._heap:
+            return None
+        return max(self._heap)[2]
+
+    def top(self):
+        """上位の候補を良い順に返す (k == 1 なら最良の1件だけ)"""
+        if self.k == 1:
+            return [self._best] if self._best is not None else []
+        return [entry[2] for entry in sorted(self._heap, reverse=True)]
+
+    def clear(self):
+        self._best = None
+        self._heap.clear()
+        self._entries.clear()
+        self._count = 0
+
+    @property
+    def considered(self) -> int:
+        """これまでに積まれた候補の数"""
+        return self._count
+
+    def __len__(self):
+        if self.k == 1:
+            return 1 if self._best is not None else 0
+        return len(self._heap)
+
+    def __bool__(self):
+        return len(self) > 0
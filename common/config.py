@@ -0,0 +1,65 @@
+"""
+config.py - プレイヤーの調整用の定数 (しきい値・倍率) をまとめる入れ物
+
+各プレイヤーはこれを継承したクラスで DEFAULTS (名前 → 既定値) と
+SPACE (探索する名前 → (下限, 上限)) を決め、コンストラクタで config= を受け取る。
+
+    class MachinedConfig(Config):
+        DEFAULTS = {"upgrade_ratio": 0.5, "dominance_ratio": 10, ...}
+        SPACE = {"upgrade_ratio": (0.2, 0.9), "dominance_ratio": (2, 20), ...}
+
+    MachinedPlayer(config=MachinedConfig(upgrade_ratio=0.45))
+    config.replace(dominance_ratio=5)            # 一部だけ変えた新しい config
+    MachinedConfig.sample(random.Random(0))      # SPACE から一様に引く (既定値が int なら int で)
+
+知らない名前を渡すと KeyError (綴り間違いで既定値のまま調整されるのを防ぐ)。
+config を渡さなければ既定値 = 今までの定数なので、判断は変わらない。
+"""
+import copy
+
+
+class Config:
+    DEFAULTS = {}
+    SPACE = {}
+
+    def __init__(self, **values):
+        unknown = set(values) - set(self.DEFAULTS)
+        if unknown:
+            raise KeyError(f"{type(self).__name__}: unknown keys {sorted(unknown)}")
+        for name, default in self.DEFAULTS.items():
+            # リスト・辞書の既定値はインスタンスごとに複製する (書き換えが他へ漏れないように)
+            setattr(self, name, copy.deepcopy(values.get(name, default)))
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**(values or {}))
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+    def replace(self, **changes):
+        values = self.to_dict()
+        values.update(changes)
+        return type(self)(**values)
+
+    @classmethod
+    def sample(cls, rng):
+        """SPACE の範囲から一様に引いた config (SPACE に無いものは既定値)"""
+        values = {}
+        for name, (low, high) in cls.SPACE.items():
+            if isinstance(cls.DEFAULTS[name], int):
+                values[name] = rng.randint(low, high)
+            else:
+                values[name] = round(rng.uniform(low, high), 3)
+        return cls(**values)
+
+    def tuned(self) -> dict:
+        """SPACE の項目だけ (探索結果の表示・保存用)"""
+        return {name: getattr(self, name) for name in self.SPACE}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        changed = {k: v for k, v in self.to_dict().items() if v != self.DEFAULTS[k]}
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in changed.items())})"
@@ -0,0 +1,185 @@
+"""
+deltas.py - tickごとの盤面の変化 (差分) を一度だけ計算する
+
+前tickの state を各プレイヤーが自前で覚えて12要塞を毎tick見比べていた
+(prev_team_state で新規占領、prev_enemy_upgrade_timers で敵の強化開始) のを
+DeltaEngine にまとめる。変化は Delta で受け取るか、イベントを購読する。
+
+    self.deltas = DeltaEngine()
+    self.deltas.subscribe(OWNER, self.strategy.invalidate_distances)
+    ...
+    delta = self.deltas.update(state)      # state は GameState
+    newly_captured = delta.gained(1)
+    for fid in delta.upgrade_started: ...
+    if not delta.owner_changed: ...        # 所有が変わらない静かなtickは判断を省ける
+
+イベント (コールバックは callback(fid, old, new) で呼ばれる):
+  OWNER          所有チームが変わった (old/new はチーム)
+  LEVEL          レベルが変わった
+  UPGRADE_START  強化が始まった (upgrade_time が -1 → 正)
+  UPGRADE_DONE   強化が終わった (upgrade_time が正 → -1)
+  PAWNS          兵数が pawn_jump 以上一度に変わった
+
+毎tick呼ばれるので、前の盤面は GameState の列をそのまま持ち (複製しない)、
+変化の無い種類は空のタプルのまま、兵数の変化は読まれた時 (か PAWNS の購読者がいる時) だけ作る。
+"""
+from array import array
+
+from .rules import NO_UPGRADE
+
+OWNER = "owner"
+LEVEL = "level"
+UPGRADE_START = "upgrade_start"
+UPGRADE_DONE = "upgrade_done"
+PAWNS = "pawns"
+
+EVENTS = (OWNER, LEVEL, UPGRADE_START, UPGRADE_DONE, PAWNS)
+
+
+class Delta:
+    """1tick分の変化"""
+
+    __slots__ = ("step", "first", "owner", "level", "upgrade_started", "upgrade_done",
+                 "_pawns", "_pawn_columns", "_pawn_jump")
+
+    def __init__(self, step, first, pawn_columns=None, pawn_jump=5):
+        self.step = step
+        self.first = first            # 最初のtick (前の盤面が無い)
+        self.owner = ()               # [(fid, 旧チーム, 新チーム)] (変化が無ければ空のタプル。以下同じ)
+        self.level = ()               # [(fid, 旧レベル, 新レベル)]
+        self.upgrade_started = ()     # [fid]
+        self.upgrade_done = ()        # [fid]
+        self._pawns = None
+        self._pawn_columns = pawn_columns   # (前の兵数, 今の兵数) (最初のtickは None)
+        self._pawn_jump = pawn_jump
+
+    @property
+    def pawns(self):
+        """[(fid, 旧兵数, 新兵数)] (兵数が pawn_jump 以上変わった要塞。最初に読まれた時に作る)"""
+        if self._pawns is None:
+            if self._pawn_columns is None:
+                self._pawns = ()
+            else:
+                prev, pawns = self._pawn_columns
+                jump = self._pawn_jump
+                self._pawns = [(fid, prev[fid], p) for fid, p in enumerate(pawns) if abs(p - prev[fid]) >= jump]
+        return self._pawns
+
+    @property
+    def owner_changed(self) -> bool:
+        return bool(self.owner)
+
+    @property
+    def quiet(self) -> bool:
+        """所有・レベル・強化のどれも変わっていない"""
+        return not (self.owner or self.level or self.upgrade_started or self.upgrade_done)
+
+    def gained(self, team) -> set:
+        """team が新しく手に入れた要塞"""
+        return {fid for fid, old, new in self.owner if new == team}
+
+    def lost(self, team) -> set:
+        """team が失った要塞"""
+        return {fid for fid, old, new in self.owner if old == team}
+
+    def __repr__(self):
+        return (f"Delta(step={self.step}, owner={self.owner}, level={self.level}, "
+                f"up+={self.upgrade_started}, up-={self.upgrade_done}, pawns={self.pawns})")
+
+
+class DeltaEngine:
+    """
+    前tickの盤面 (所有・レベル・強化タイマー・兵数の列) を持ち、差分を出す
+
+    最初のtickは「前の盤面が無い」ので所有・レベル・兵数の変化は出さない。
+    強化だけは従来の prev_enemy_upgrade_timers と同じく「前は強化していなかった」
+    とみなすので、開始時点で強化中の要塞は UPGRADE_START として出る。
+    """
+
+    def __init__(self, pawn_jump=5):
+        self.pawn_jump = pawn_jump
+        self.step = 0
+        self._owner = None
+        self._level = None
+        self._upgrade = None
+        self._pawns = None
+        self._subscribers = {event: [] for event in EVENTS}
+        self.last = None
+
+    def subscribe(self, event, callback):
+        self._subscribers[event].append(callback)
+
+    def unsubscribe(self, event, callback):
+        self._subscribers[event].remove(callback)
+
+    def reset(self):
+        self.step = 0
+        self._owner = self._level = self._upgrade = self._pawns = None
+        self.last = None
+
+    def update(self, state) -> Delta:
+        """今tickの盤面 (GameState) との差分を計算して前の盤面を置き換える"""
+        owner, level, upgrade, pawns = _columns(state)
+        self.step += 1
+        first = self._owner is None
+        delta = Delta(self.step, first, None if first else (self._pawns, pawns), self.pawn_jump)
+
+        # 列の比較は C で済むので、変わった時だけ要塞ごとに見る
+        prev_upgrade = self._upgrade
+        if prev_upgrade != upgrade:
+            started = []
+            finished = []
+            for fid, t in enumerate(upgrade):
+                before = prev_upgrade[fid] if prev_upgrade is not None else NO_UPGRADE
+                if before == NO_UPGRADE and t > 0:
+                    started.append(fid)
+                elif before > 0 and t == NO_UPGRADE:
+                    finished.append(fid)
+            if started:
+                delta.upgrade_started = started
+            if finished:
+                delta.upgrade_done = finished
+
+        if not first:
+            prev = self._owner
+            if prev != owner:
+                delta.owner = [(fid, prev[fid], o) for fid, o in enumerate(owner) if prev[fid] != o]
+            prev = self._level
+            if prev != level:
+                delta.level = [(fid, prev[fid], v) for fid, v in enumerate(level) if prev[fid] != v]
+
+        self._owner, self._level, self._upgrade, self._pawns = owner, level, upgrade, pawns
+        self.last = delta
+        self._publish(delta)
+        return delta
+
+    def _publish(self, delta):
+        subscribers = self._subscribers
+        if subscribers[OWNER]:
+            for change in delta.owner:
+                for callback in subscribers[OWNER]:
+                    callback(*change)
+        if subscribers[LEVEL]:
+            for change in delta.level:
+                for callback in subscribers[LEVEL]:
+                    callback(*change)
+        if subscribers[UPGRADE_START]:
+            for fid in delta.upgrade_started:
+                for callback in subscribers[UPGRADE_START]:
+                    callback(fid, NO_UPGRADE, self._upgrade[fid])
+        if subscribers[UPGRADE_DONE]:
+            for fid in delta.upgrade_done:
+                for callback in subscribers[UPGRADE_DONE]:
+                    callback(fid, None, NO_UPGRADE)
+        if subscribers[PAWNS]:
+            for change in delta.pawns:
+                for callback in subscribers[PAWNS]:
+                    callback(*change)
+
+
+def _columns(state):
+    """GameState ならその列をそのまま使い (tickごとに作り直され、書き換えられない)、生の state なら列を作る"""
+    if hasattr(state, "owner"):
+        return state.owner, state.level, state.upgrade, state.pawns
+    return (array("b", (s[0] for s in state)), array("b", (s[2] for s in state)),
+            array("d", (s[4] for s in state)), array("d", (s[3] for s in state)))
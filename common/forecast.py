@@ -0,0 +1,284 @@
+"""
+forecast.py - 要塞ごとの先読み (移動中・出撃待機の兵の到着 + 生産)
+
+「敵の兵力が自分の1.5倍なら危険」のような静的な見積もりは、到着の順番や
+その間の生産を無視している。Forecast は要塞ごとに
+
+  - 移動中の兵: 残り距離 / pawn_speed tick後に到着
+  - 出撃待機の兵: spawn_interval ごとに1体ずつ出て、100 / pawn_speed tick後に到着
+  - 生産: 所有チームは PRODUCTION_INTERVAL[level] ごとに1体 (HARD_LIMITS[level] まで)
+
+を時系列に並べて horizon tick 先まで進め、所有がいつ変わるか・どれだけ足りないかを返す。
+到着する兵の重みは kind (PawnTable の incoming と同じ)。守備兵が重み以上なら重みだけ減り、
+足りなければ所有が変わって差分が残る (kind が1なら simulator/engine.py と同じ)。
+
+到着イベントは聞かれた要塞の分だけ作る (盤面全体の兵は行き先ごとに振り分けるだけ)。
+needed は「借りを許して」1回だけ回した時の最大の借り (二分探索はしない)。
+所有者以外の兵が1体も向かっていない要塞は落ちようがないので、needed / flips は
+到着イベントを作らずに 0 / False を返す (NewComer が聞く前線の大半はこれ)。
+
+    forecast = state.forecast()            # GameState から (tickごとに1回だけ作られる)
+    forecast.flips(fid)                    # horizon 内に所有が変わるか
+    forecast.needed(fid)                   # 持ちこたえるのに今足りない兵数 (0 なら十分)
+    forecast.fort(fid).flip_tick           # 最初に所有が変わるtick (変わらなければ None)
+
+速さ・出撃間隔の既定値は common/rules.py (= ローカルシミュレータのルール) で、
+本番のエンジンと違う場合は Forecast(..., pawn_speed=, spawn_interval=) で差し替える。
+出撃のタイミング (エンジンのstepの位相) はプレイヤーから見えないので、
+最初の1体は次のtickに出るものとして早め (守る側に厳しめ) に見積もる。
+pos が座標 ([x, y]) で来た場合は進行度が分からないので、道半ばとして扱う。
+"""
+import math
+
+from .rules import HARD_LIMITS, PAWN_SPEED, PRODUCTION_INTERVAL, SPAWN_INTERVAL
+
+DEFAULT_HORIZON = 300
+
+
+class FortForecast:
+    """1要塞の先読み結果"""
+
+    __slots__ = ("fid", "owner", "final_owner", "final_pawns", "flip_tick", "needed", "arrivals")
+
+    def __init__(self, fid, owner, final_owner, final_pawns, flip_tick, needed, arrivals):
+        self.fid = fid
+        self.owner = owner                # 今の所有チーム
+        self.final_owner = final_owner    # horizon 後の所有チーム
+        self.final_pawns = final_pawns    # horizon 後の兵数
+        self.flip_tick = flip_tick        # 最初に所有が変わるtick (None: 変わらない)
+        self.needed = needed              # 今の所有者が horizon まで持ちこたえるのに足りない兵数
+        self.arrivals = arrivals          # horizon 内に到着する兵 (イベント) の数
+
+    @property
+    def flips(self) -> bool:
+        return self.flip_tick is not None
+
+    @property
+    def margin(self) -> float:
+        """持ちこたえる場合の余裕 (horizon 後の兵数)。落ちる場合は -needed"""
+        if self.flip_tick is None:
+            return self.final_pawns
+        return -self.needed
+
+    def __repr__(self):
+        return (f"FortForecast(fid={self.fid}, owner={self.owner}->{self.final_owner}, "
+                f"flip={self.flip_tick}, needed={self.needed}, pawns={self.final_pawns})")
+
+
+class Forecast:
+    """盤面全体の先読み (要塞ごとに最初に聞かれた時に計算する)"""
+
+    def __init__(self, state, moving_pawns=(), spawning_pawns=(), horizon=DEFAULT_HORIZON,
+                 pawn_speed=PAWN_SPEED, spawn_interval=SPAWN_INTERVAL):
+        self.state = state
+        self.moving_pawns = moving_pawns
+        self.spawning_pawns = spawning_pawns
+        self.horizon = horizon
+        self.pawn_speed = pawn_speed
+        self.spawn_interval = spawn_interval
+        self.travel_ticks = int(100 / pawn_speed)
+        self._by_dst = None     # 行き先ごとの (移動中, 出撃待機) の兵
+        self._senders = None    # {(行き先, チーム)} (兵が向かっているか見るだけなら振り分けない)
+        self._events = {}       # fid -> [(tick, team, 重み)] (tick 順)
+        self._cache = {}        # fid -> FortForecast
+        self._at = {}           # (fid, tick) -> (所有, 兵数)
+
+    def _group(self):
+        # 行き先ごとに振り分けるだけ (到着tickは聞かれた要塞の分だけ計算する。兵の来ない要塞のリストは作らない)
+        moving = {}
+        spawning = {}
+        for p in self.moving_pawns:
+            dst = p[3]
+            if dst in moving:
+                moving[dst].append(p)
+            else:
+                moving[dst] = [p]
+        for sp in self.spawning_pawns:
+            dst = sp[4]
+            if dst in spawning:
+                spawning[dst].append(sp)
+            else:
+                spawning[dst] = [sp]
+        self._by_dst = (moving, spawning)
+        return self._by_dst
+
+    def arrivals(self, fid) -> list:
+        """fid に到着する兵 [(tick, team, 重み)] (horizon まで、tick 順)"""
+        events = self._events.get(fid)
+        if events is not None:
+            return events
+        moving, spawning = self._by_dst or self._group()
+        horizon = self.horizon
+        speed = self.pawn_speed
+        ceil = math.ceil
+        try:
+            events = [(max(1, ceil((100 - p[4]) / speed)), p[0], p[1]) for p in moving.get(fid, ())]
+        except TypeError:
+            # pos が座標で来た (進行度が分からないので道半ば)
+            half = self.travel_ticks // 2
+            events = [(half if isinstance(p[4], (list, tuple)) else max(1, ceil((100 - float(p[4])) / speed)),
+                       p[0], p[1]) for p in moving.get(fid, ())]
+        if horizon < self.travel_ticks:
+            events = [e for e in events if e[0] <= horizon]
+        interval = self.spawn_interval
+        first = 1 + self.travel_ticks
+        if first <= horizon:
+            fits = (horizon - first) // interval + 1
+            for sp in spawning.get(fid, ()):
+                team, kind = sp[0], sp[1]
+                events += [(first + i * interval, team, kind) for i in range(min(int(sp[2]), fits))]
+        events.sort()
+        self._events[fid] = events
+        return events
+
+    def fort(self, fid) -> FortForecast:
+        result = self._cache.get(fid)
+        if result is None:
+            result = self._cache[fid] = self._forecast(fid)
+        return result
+
+    def threatened(self, fid) -> bool:
+        """所有者以外 (中立の要塞なら誰か) の兵が移動中か出撃待機で fid に向かっている"""
+        senders = self._senders
+        if senders is None:
+            senders = {(p[3], p[0]) for p in self.moving_pawns}
+            senders.update((sp[4], sp[0]) for sp in self.spawning_pawns)
+            self._senders = senders
+        owner = self.state[fid][0]
+        return any((fid, team) in senders for team in (0, 1, 2) if team != owner)
+
+    def flips(self, fid) -> bool:
+        if fid not in self._cache and not self.threatened(fid):
+            return False
+        return self.fort(fid).flip_tick is not None
+
+    def needed(self, fid) -> int:
+        if fid not in self._cache and not self.threatened(fid):
+            return 0
+        return self.fort(fid).needed
+
+    def pawns_at(self, fid, tick):
+        """tick 後の (所有チーム, 兵数)。travel_ticks 後の分は fort() のついでに取ってある"""
+        tick = min(tick, self.horizon)
+        if tick == self.travel_ticks:
+            self.fort(fid)
+        result = self._at.get((fid, tick))
+        if result is None:
+            owner, pawns, _, _ = self._run(fid, tick)
+            result = self._at[(fid, tick)] = (owner, pawns)
+        return result
+
+    def _forecast(self, fid):
+        owner0 = self.state[fid][0]
+        owner, pawns, flip_tick, arrivals = self._run(fid, self.horizon, self.travel_ticks)
+        needed = 0
+        if flip_tick is not None and owner0 != 0:
+            # 借りの分だけ増やすと生産の上限に当たる時だけ、その増援込みでもう一度数える
+            # (増援は生産を減らすことはあっても増やさないので、足していけば最小の数になる)
+            while True:
+                deficit, peak = self._deficit(fid, needed)
+                needed += deficit
+                if deficit == 0 or peak + deficit < HARD_LIMITS[self.state[fid][2]]:
+                    break
+        return FortForecast(fid, owner0, owner, pawns, flip_tick, needed, arrivals)
+
+    def _produce(self, owner, pawns, counter, elapsed, interval, limit):
+        """elapsed tick 分の生産 (中立は増えない。上限に達したらカウンタは0に戻る) → (兵数, カウンタ)"""
+        if owner == 0:
+            return pawns, counter
+        if pawns >= limit:
+            return pawns, 0
+        counter += elapsed
+        gained = min(counter // interval, limit - pawns)
+        pawns += gained
+        return pawns, (0 if pawns >= limit else counter - gained * interval)
+
+    def _run(self, fid, horizon, snapshot=None):
+        """
+        horizon tick 進めて (所有, 兵数, 最初に所有が変わったtick, 到着数) を返す
+
+        snapshot (< horizon) を渡すと、その時点の (所有, 兵数) も pawns_at 用に残す。
+        """
+        s = self.state[fid]
+        owner = s[0]
+        interval = PRODUCTION_INTERVAL[s[2]]
+        limit = HARD_LIMITS[s[2]]
+        produce = self._produce
+
+        pawns = s[3]
+        now = 0
+        counter = 0            # 生産カウンタ (次の1体までの経過tick)
+        flip_tick = None
+        arrivals = 0
+
+        for tick, team, weight in self.arrivals(fid):
+            if tick > horizon:
+                break
+            if snapshot is not None and tick > snapshot:
+                self._at[(fid, snapshot)] = (owner, produce(owner, pawns, counter, snapshot - now, interval, limit)[0])
+                snapshot = None
+            arrivals += 1
+            # 到着までの生産 (_produce と同じ。到着ごとに呼ぶので展開してある)
+            if owner != 0:
+                if pawns < limit:
+                    counter += tick - now
+                    if counter >= interval:
+                        gained = min(counter // interval, limit - pawns)
+                        pawns += gained
+                        counter = 0 if pawns >= limit else counter - gained * interval
+                else:
+                    counter = 0
+            now = tick
+
+            # 到着: 味方なら +重み、敵なら守備兵を重みだけ減らし、足りなければ占領される
+            if team == owner:
+                pawns += weight
+            elif pawns >= weight:
+                pawns -= weight
+            else:
+                owner = team
+                pawns = weight - pawns
+                counter = 0
+                if flip_tick is None:
+                    flip_tick = tick
+
+        if snapshot is not None and snapshot < horizon:
+            self._at[(fid, snapshot)] = (owner, produce(owner, pawns, counter, snapshot - now, interval, limit)[0])
+        # 最後の到着から horizon までの生産
+        pawns, counter = produce(owner, pawns, counter, horizon - now, interval, limit)
+        return owner, pawns, flip_tick, arrivals
+
+    def _deficit(self, fid, extra=0):
+        """
+        extra 体多い状態から、horizon まで持ちこたえるのにさらに足りない兵数と、途中の兵数の最大
+
+        所有は変わらないものとして兵数がマイナスになるのを許して1回だけ回し、最大の借りを返す。
+        """
+        s = self.state[fid]
+        owner = s[0]
+        interval = PRODUCTION_INTERVAL[s[2]]
+        limit = HARD_LIMITS[s[2]]
+        produce = self._produce
+
+        pawns = s[3] + extra
+        peak = pawns
+        now = 0
+        counter = 0
+        lowest = 0
+        horizon = self.horizon
+        for tick, team, weight in self.arrivals(fid):
+            if tick > horizon:
+                break
+            pawns, counter = produce(owner, pawns, counter, tick - now, interval, limit)
+            now = tick
+            if team == owner:
+                pawns += weight
+            # 増援を足した時に生産が上限で止まるかは、この最大で分かる
+            if pawns > peak:
+                peak = pawns
+            if team != owner:
+                # 守備兵が重み以上あれば持ちこたえる (ちょうど0 は持ちこたえた扱い)
+                pawns -= weight
+                if pawns < lowest:
+                    lowest = pawns
+        return math.ceil(-lowest), peak
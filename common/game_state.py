@@ -0,0 +1,171 @@
+"""
+game_state.py - 1tick分の盤面ビュー
+
+update() のたびに各プレイヤー・各Strategyが
+[i for i in range(12) if state[i][0] == ...] や sum(int(s[3]) ...) を
+何度も作り直していたので、tickごとに一度だけ組み立てて使い回す。
+"""
+from array import array
+
+from .decision_cache import state_key
+from .forecast import DEFAULT_HORIZON, Forecast
+from .graph import get_graph
+from .pawns import PawnTable
+
+NEUTRAL = 0
+
+
+class GameState(list):
+    """
+    state (要塞リスト) のビュー
+
+    list を継承しているので state[i][3] のような既存コードはそのまま動く。
+    加えて、列データ (owner/level/pawns/upgrade) とチーム別の集計をキャッシュする。
+    返したリストは共有なので書き換えないこと。
+    """
+
+    __slots__ = (
+        "team", "enemy_team", "moving_pawns", "spawning_pawns",
+        "owner", "level", "pawns", "upgrade",
+        "_graph", "_forts", "_masks", "_totals", "_in_flight", "_forecast", "_key",
+    )
+
+    def __init__(self, state, team=1, moving_pawns=(), spawning_pawns=(), graph=None):
+        super().__init__(state)
+        self.team = team
+        self.enemy_team = 2 if team == 1 else 1
+        self.moving_pawns = moving_pawns
+        self.spawning_pawns = spawning_pawns
+        self._graph = graph
+        self._masks = None
+        self._totals = None
+        self._in_flight = None
+        self._forecast = None
+        self._key = None
+
+        # 列データ + チーム別の要塞リストを1パスで作る
+        forts = ([], [], [])
+        owner = array("b")
+        level = array("b")
+        pawns = array("d")
+        upgrade = array("d")
+        for i, s in enumerate(state):
+            forts[s[0]].append(i)
+            owner.append(s[0])
+            level.append(s[2])
+            pawns.append(s[3])
+            upgrade.append(s[4])
+        self._forts = forts
+        self.owner = owner
+        self.level = level
+        self.pawns = pawns
+        self.upgrade = upgrade
+
+    @classmethod
+    def from_info(cls, info, graph=None):
+        team, state, moving_pawns, spawning_pawns, done = info
+        return cls(state, team, moving_pawns, spawning_pawns, graph)
+
+    # --- グラフ ---
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = get_graph(self)
+        return self._graph
+
+    @property
+    def adjacency(self):
+        return self.graph.adjacency
+
+    # --- チーム別の要塞 ---
+
+    def forts(self, team) -> list:
+        """指定チームの要塞ID (昇順)"""
+        return self._forts[team]
+
+    def count(self, team) -> int:
+        return len(self._forts[team])
+
+    def mask(self, team) -> tuple:
+        """要塞ごとの所属フラグ (mask[i] が True なら team の要塞)"""
+        if self._masks is None:
+            owner = self.owner
+            self._masks = tuple(
+                tuple(o == t for o in owner) for t in range(3)
+            )
+        return self._masks[team]
+
+    @property
+    def my_forts(self) -> list:
+        return self._forts[self.team]
+
+    @property
+    def enemy_forts(self) -> list:
+        return self._forts[self.enemy_team]
+
+    @property
+    def neutral_forts(self) -> list:
+        return self._forts[NEUTRAL]
+
+    # --- キャッシュ用のキー ---
+
+    def quantized_key(self, bucket=1) -> bytes:
+        """DecisionCache 用の盤面キー (所有, レベル, 兵数 // bucket, 強化状態)"""
+        if self._key is None or self._key[0] != bucket:
+            self._key = (bucket, state_key(self, bucket))
+        return self._key[1]
+
+    # --- 移動中の兵 ---
+
+    @property
+    def in_flight(self) -> PawnTable:
+        """moving_pawns の列データと要塞ごとの集計 (最初に使った時に作る)"""
+        if self._in_flight is None:
+            self._in_flight = PawnTable(self.moving_pawns, len(self))
+        return self._in_flight
+
+    def forecast(self, horizon=DEFAULT_HORIZON) -> Forecast:
+        """移動中・出撃待機の兵の到着を先読みした Forecast (horizon ごとに1回だけ作る)"""
+        forecast = self._forecast
+        if forecast is None or forecast.horizon != horizon:
+            forecast = self._forecast = Forecast(self, self.moving_pawns, self.spawning_pawns, horizon)
+        return forecast
+
+    # --- 兵力の集計 ---
+
+    def _ensure_totals(self):
+        # [砦内, 移動中, 出撃待機] × チーム(0,1,2)
+        in_forts = [0, 0, 0]
+        for s in self:
+            in_forts[s[0]] += int(s[3])
+        moving = [0, 0, 0]
+        for p in self.moving_pawns:
+            moving[p[0]] += 1
+        spawning = [0, 0, 0]
+        for p in self.spawning_pawns:
+            spawning[p[0]] += int(p[2])
+        self._totals = (in_forts, moving, spawning)
+        return self._totals
+
+    def fort_soldiers(self, team=None) -> int:
+        """砦の中にいる兵士数 (team=None なら中立も含めた全体)"""
+        totals = self._totals or self._ensure_totals()
+        return sum(totals[0]) if team is None else totals[0][team]
+
+    def moving_count(self, team=None) -> int:
+        """移動中の兵士数"""
+        totals = self._totals or self._ensure_totals()
+        return sum(totals[1]) if team is None else totals[1][team]
+
+    def spawning_count(self, team=None) -> int:
+        """出撃待機中の兵士数 (spawning_pawns[i][2] の合計)"""
+        totals = self._totals or self._ensure_totals()
+        return sum(totals[2]) if team is None else totals[2][team]
+
+    def soldiers(self, team=None) -> int:
+        """砦内 + 移動中 + 出撃待機 の総兵力"""
+        totals = self._totals or self._ensure_totals()
+        if team is None:
+            return sum(totals[0]) + sum(totals[1]) + sum(totals[2])
+        return totals[0][team] + totals[1][team] + totals[2][team]
@@ -0,0 +1,90 @@
+"""
+graph.py - 要塞グラフの全点対距離テーブル
+
+隣接リスト (state[i][5]) は試合中に変化しないため、
+最初のtickで一度だけ全点対の距離・次ホップ表を作り、以後は表引きで済ませる。
+"""
+from collections import deque
+
+UNREACHABLE = 999  # 到達不能 (既存のBFSと同じ値)
+
+
+class FortressGraph:
+    """全点対距離 (dist) と次ホップ (next_hop) を保持する"""
+
+    def __init__(self, adjacency):
+        self.adjacency = tuple(tuple(ns) for ns in adjacency)
+        self.size = len(self.adjacency)
+        # dist[src][dst]: src から dst への最短ホップ数
+        # next_hop[src][dst]: src から dst へ向かう最短経路の最初の一歩 (-1: なし)
+        self.dist = tuple(self._bfs(src) for src in range(self.size))
+        self.next_hop = tuple(self._first_hops(src) for src in range(self.size))
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(s[5] for s in state)
+
+    def _bfs(self, src):
+        dist = [UNREACHABLE] * self.size
+        dist[src] = 0
+        queue = deque([src])
+        while queue:
+            curr = queue.popleft()
+            d = dist[curr] + 1
+            for n in self.adjacency[curr]:
+                if dist[n] > d:
+                    dist[n] = d
+                    queue.append(n)
+        return tuple(dist)
+
+    def _first_hops(self, src):
+        hops = [-1] * self.size
+        row = self.dist[src]
+        for dst in range(self.size):
+            if dst == src or row[dst] == UNREACHABLE:
+                continue
+            # 隣接要塞のうち、dst までの距離がちょうど1つ縮まる最小IDを採用
+            for n in self.adjacency[src]:
+                if self.dist[n][dst] == row[dst] - 1:
+                    hops[dst] = n
+                    break
+        return tuple(hops)
+
+    def distance(self, src, dst) -> int:
+        return self.dist[src][dst]
+
+    def distances_from(self, sources) -> list:
+        """複数始点からの距離 (各行の min 縮約)。始点が無ければ全て UNREACHABLE"""
+        result = [UNREACHABLE] * self.size
+        for s in sources:
+            row = self.dist[s]
+            for i in range(self.size):
+                if row[i] < result[i]:
+                    result[i] = row[i]
+        return result
+
+    def distances_to_team(self, state, team) -> list:
+        """指定チームの要塞群までの距離 (Strategy.calculate_distance 相当)"""
+        return self.distances_from([i for i in range(self.size) if state[i][0] == team])
+
+    def nearest(self, src, targets):
+        """src から最も近い target を返す (同距離ならID順で先のもの)"""
+        row = self.dist[src]
+        best, best_d = None, UNREACHABLE
+        for t in targets:
+            if row[t] < best_d:
+                best, best_d = t, row[t]
+        return best
+
+
+# 隣接リストごとのキャッシュ (同じマップなら全プレイヤー・全Strategyで共有)
+_GRAPH_CACHE = {}
+
+
+def get_graph(state) -> FortressGraph:
+    key = tuple(tuple(s[5]) for s in state)
+    graph = _GRAPH_CACHE.get(key)
+    if graph is None:
+        graph = FortressGraph(key)
+        _GRAPH_CACHE[key] = graph
+    return graph
@@ -0,0 +1,197 @@
+"""
+logger.py - バッファ付きゲームログ
+
+1行ごとに open/write/close していたログを、メモリ上のリングバッファに溜めて
+バックグラウンドスレッドがまとめて書き出す。
+レベルを OFF にすればファイルもスレッドも作らない (トーナメント用)。
+
+レベルは引数か環境変数 TCG_LOG_LEVEL (DEBUG / INFO / OFF) で指定する。
+
+出力先は試合・プレイヤーごとに分けられる (並列に試合を回しても混ざらない):
+  - パステンプレート: "logs/{match}_{player}_{pid}.txt" のように書ける
+    (引数 path か環境変数 TCG_LOG_PATH。{match} は TCG_MATCH_ID から。
+    {instance} はプロセス内で何番目に作ったロガーかで、同じプレイヤー同士の対戦でも別になる)
+  - どちらも無ければ DEFAULT_PATH (試合・プレイヤー・プロセス・インスタンスごとに別ファイル)
+  - ファイルハンドル: stream に渡せばそこへ書く (close はしない)
+  - 拡張子が .gz なら gzip、.zst なら zstd (zstandard パッケージが必要) で圧縮
+"""
+import atexit
+import gzip
+import io
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+OFF = 100
+
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "OFF": OFF}
+
+DEFAULT_PATH = "game_log_{match}_{player}_{pid}_{instance}.txt"
+
+# GameLogger を作った順の番号 ({instance})
+_instances = itertools.count(1)
+
+
+def resolve_level(level=None) -> int:
+    """引数 → 環境変数 → DEBUG (従来通り全部書く) の順でレベルを決める"""
+    if level is None:
+        level = os.environ.get("TCG_LOG_LEVEL", "DEBUG")
+    if isinstance(level, str):
+        return LEVELS[level.upper()]
+    return int(level)
+
+
+def expand_path(template, **fields) -> str:
+    """パステンプレートの {player} {match} {pid} {instance} {time} を埋める"""
+    fields.setdefault("player", "player")
+    fields.setdefault("match", os.environ.get("TCG_MATCH_ID", "0"))
+    fields.setdefault("pid", os.getpid())
+    fields.setdefault("instance", 0)
+    fields.setdefault("time", time.strftime("%Y%m%d-%H%M%S"))
+    return template.format(**fields)
+
+
+def open_sink(path, compress=None):
+    """
+    書き込み用のテキストストリームを開く
+
+    compress ("gzip" / "zstd") を指定すると拡張子を補う。
+    拡張子が .gz / .zst ならその形式で圧縮する。
+    """
+    if compress == "gzip" and not path.endswith(".gz"):
+        path += ".gz"
+    elif compress == "zstd" and not path.endswith(".zst"):
+        path += ".zst"
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd 圧縮のログには zstandard パッケージが必要です") from None
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+class GameLogger:
+    """
+    リングバッファ + 書き出しスレッドによるログ
+
+    バッファが capacity を超えた場合は古い行から捨てる (dropped に件数を記録)。
+    書き出しは batch_size 行溜まったとき、または flush_interval 秒ごと。
+
+    path はテンプレート可 (expand_path 参照)。None なら TCG_LOG_PATH → default_path。
+    fields はテンプレートに埋める値 (player など。instance はロガーごとに振る)。
+    """
+
+    def __init__(self, path=None, header=None, level=None, stream=None,
+                 compress=None, fields=None, default_path=DEFAULT_PATH,
+                 capacity=20000, batch_size=512, flush_interval=0.5):
+        if path is None:
+            path = os.environ.get("TCG_LOG_PATH", default_path)
+        fields = dict(fields or {})
+        fields.setdefault("instance", next(_instances))
+        self.path = None if stream is not None else expand_path(path, **fields)
+        self.level = resolve_level(level)
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._file = None
+        self._owns_file = stream is None
+        self._flush_each = True
+        self._thread = None
+
+        if self.level >= OFF:
+            return
+
+        if stream is not None:
+            self._file = stream
+        else:
+            # 従来通り、開始時にファイルを作り直す
+            self._file = open_sink(self.path, compress)
+            # 圧縮ストリームは毎回 flush すると圧縮率が落ちるので close まで任せる
+            self._flush_each = compress is None and not self.path.endswith((".gz", ".zst"))
+        if header is not None:
+            self._buffer.append(str(header))
+        self._thread = threading.Thread(target=self._run, name="GameLogger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enabled(self, level=INFO) -> bool:
+        return level >= self.level and not self._closed
+
+    def log(self, message, level=INFO):
+        if level < self.level or self._closed:
+            return
+        with self._cond:
+            if len(self._buffer) >= self.capacity:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(str(message))
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def debug(self, message):
+        self.log(message, DEBUG)
+
+    def info(self, message):
+        self.log(message, INFO)
+
+    def _drain(self):
+        # 呼び出し側で _write_lock を保持していること
+        with self._cond:
+            if not self._buffer:
+                return
+            lines = list(self._buffer)
+            self._buffer.clear()
+        self._file.write("\n".join(lines) + "\n")
+        if self._flush_each:
+            self._file.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._buffer and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            with self._write_lock:
+                self._drain()
+            if closed:
+                return
+
+    def flush(self):
+        """溜まっている行をこのスレッドで書き出す"""
+        if self._file is None:
+            return
+        with self._write_lock:
+            self._drain()
+
+    def close(self):
+        if self._file is None or self._closed:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        with self._write_lock:
+            self._drain()
+            if self._owns_file:
+                self._file.close()
+            else:
+                self._file.flush()
+        atexit.unregister(self.close)
@@ -0,0 +1,101 @@
+"""
+logistics.py - 前線への補給 (バケツリレー) を全前線まとめて1回で計画する
+
+NewComer は前線の要塞ごとに execute_bucket_brigade を呼んでいたので、
+2つの前線の間にある要塞は前線の数だけ別々の次ホップを出し、
+同じ優先度 (+乱数) の中からどれが選ばれるかはtickごとに変わった (兵が行ったり来たりする)。
+前線自身も「別の前線に近づく方向」へ兵を送っていた。
+
+LogisticsPlanner は全前線を始点にした1回の BFS (自軍の要塞だけを通る) で、
+各要塞について「どの前線へ・次にどこへ」を1つだけ決める。
+
+  - 不足 (shortage) のある前線だけを始点にする (どこにも不足が無ければ全前線に常時補給)。
+    不足の無い前線は通り道にはなるが、補給先にはならない
+  - 距離が同じ前線が複数あれば、不足が大きい前線 → ID の小さい前線を取る
+  - 前線 (不足の無いものも) は送り出さない (前線同士で兵を回さない)
+  - 兵が troops_threshold 未満の要塞は送らない。ただし上限の overflow_ratio 以上なら溢れ防止で送る
+
+    planner = LogisticsPlanner(fortress_limit)
+    routes = planner.route(state, my_fortresses, {front: shortage, ...})
+    routes.front[fid], routes.dist[fid], routes.next_hop[fid]    # 届かない要塞は None / UNREACHABLE / -1
+    for priority, command, src, dst in planner.plan(state, my_fortresses, fronts, priority_base=50):
+        actions.append((priority, command, src, dst))
+"""
+from collections import deque
+
+from .graph import UNREACHABLE
+
+# 溢れそうな要塞の輸送に足す優先度 (execute_bucket_brigade と同じ)
+OVERFLOW_BONUS = 300
+
+
+class Routes:
+    """route() の結果 (要塞ID で引く)"""
+
+    __slots__ = ("front", "dist", "next_hop")
+
+    def __init__(self, size):
+        self.front = [None] * size          # 補給先の前線
+        self.dist = [UNREACHABLE] * size    # その前線まで (自軍の要塞だけを通った) ホップ数
+        self.next_hop = [-1] * size         # 次に送る先 (前線自身・届かない要塞は -1)
+
+
+class LogisticsPlanner:
+    def __init__(self, fortress_limit, troops_threshold=5, overflow_ratio=0.9, overflow_bonus=OVERFLOW_BONUS):
+        self.fortress_limit = fortress_limit
+        self.troops_threshold = troops_threshold
+        self.overflow_ratio = overflow_ratio
+        self.overflow_bonus = overflow_bonus
+
+    def route(self, state, forts, fronts) -> Routes:
+        """
+        fronts (前線ID → 不足兵力、または前線IDの並び) を始点に forts の中だけで多始点 BFS
+
+        不足が0の前線は始点にしない (全部0なら全部を始点にする)。
+        始点を不足の大きい順に積むので、距離が同じなら不足の大きい前線の側に付く。
+        """
+        routes = Routes(len(state))
+        if not isinstance(fronts, dict):
+            fronts = dict.fromkeys(fronts, 0)
+        sources = [f for f in fronts if fronts[f] > 0] or list(fronts)
+        members = set(forts)
+        front, dist, next_hop = routes.front, routes.dist, routes.next_hop
+        queue = deque()
+        for f in sorted(sources, key=lambda f: (-fronts[f], f)):
+            if f in members:
+                front[f] = f
+                dist[f] = 0
+                queue.append(f)
+        while queue:
+            curr = queue.popleft()
+            d = dist[curr] + 1
+            for n in state[curr][5]:
+                if n in members and dist[n] > d:
+                    dist[n] = d
+                    front[n] = front[curr]
+                    next_hop[n] = curr
+                    queue.append(n)
+        return routes
+
+    def plan(self, state, forts, fronts, priority_base=50, troops_threshold=None) -> list:
+        """
+        全前線への輸送を (priority, 1, src, dst) のリストで返す (要塞ごとに高々1件)
+
+        priority は execute_bucket_brigade と同じく priority_base + 兵数 (+ 溢れそうなら overflow_bonus)。
+        """
+        if troops_threshold is None:
+            troops_threshold = self.troops_threshold
+        routes = self.route(state, forts, fronts)
+        next_hop = routes.next_hop
+        limit = self.fortress_limit
+        transfers = []
+        for fid in forts:
+            hop = next_hop[fid]
+            if hop < 0 or fid in fronts:
+                continue
+            troops = state[fid][3]
+            max_troops = limit[state[fid][2]]
+            bonus = self.overflow_bonus if max_troops > 0 and troops >= max_troops * self.overflow_ratio else 0
+            if troops >= troops_threshold or bonus:
+                transfers.append((priority_base + troops + bonus, 1, fid, hop))
+        return transfers
@@ -0,0 +1,162 @@
+"""
+mirror_queue.py - ミラー戦略の予約キュー
+
+Kai のミラーモードは「敵の行動を点対称に写した予約」をリストに積み、
+pop(0) / insert(0, ...) で出し入れしていた。期限切れも先頭から1tickに1件しか
+捨てないので、ミラーが遅れる長い試合ではキューが伸び続ける。
+
+MirrorPlan は
+  - 強化用の優先レーン + 移動用のレーン (どちらも deque で両端 O(1))
+  - 期限のヒープ (evict() で期限切れをまとめて捨てる)
+  - 同じ (種類, src, dst) の予約は1件にまとめて回数 (count) だけ増やす
+で、試合が長くてもメモリと1tickの処理量が増えないようにしたもの。
+
+    plan = MirrorPlan()
+    plan.push_move(src, dst, expire=step + 1000)
+    plan.push_upgrade(src, expire=step + 1000)   # 移動より先に実行される
+    plan.evict(step)
+    action = plan.peek()
+    if action is not None and action.kind == MOVE:
+        plan.consume(action)
+"""
+import heapq
+from collections import deque
+
+MOVE = "MOVE"
+UPGRADE = "UPGRADE"
+
+
+class MirrorAction:
+    """予約1件 (同じ内容の予約は count にまとめる)"""
+
+    __slots__ = ("kind", "src", "dst", "expire", "count", "alive")
+
+    def __init__(self, kind, src, dst, expire):
+        self.kind = kind
+        self.src = src
+        self.dst = dst
+        self.expire = expire
+        self.count = 1
+        self.alive = True
+
+    @property
+    def key(self):
+        return (self.kind, self.src, self.dst)
+
+    def __repr__(self):
+        return f"{self.kind}({self.src}->{self.dst} x{self.count} exp={self.expire})"
+
+
+class MirrorPlan:
+    """優先レーン付きの予約キュー (期限切れの一括削除と重複の集約つき)"""
+
+    def __init__(self):
+        self._upgrades = deque()   # 新しい強化ほど先 (従来の insert(0, ...) と同じ順)
+        self._moves = deque()      # 移動は古い順
+        self._expiry = []          # (expire, seq, action) の最小ヒープ
+        self._live = {}            # key -> 生きている予約
+        self._dead = 0             # レーンに残っている無効エントリの数
+        self._seq = 0
+
+    # --- 追加 ---
+
+    def push_move(self, src, dst, expire):
+        return self._push(MOVE, src, dst, expire, self._moves.append)
+
+    def push_upgrade(self, src, expire):
+        return self._push(UPGRADE, src, 0, expire, self._upgrades.appendleft)
+
+    def _push(self, kind, src, dst, expire, add):
+        key = (kind, src, dst)
+        action = self._live.get(key)
+        if action is not None:
+            # 重複はまとめる (期限は新しい方に延ばす)
+            action.count += 1
+            if expire > action.expire:
+                action.expire = expire
+                self._push_expiry(action)
+            return action
+        action = MirrorAction(kind, src, dst, expire)
+        self._live[key] = action
+        add(action)
+        self._push_expiry(action)
+        return action
+
+    def _push_expiry(self, action):
+        self._seq += 1
+        heapq.heappush(self._expiry, (action.expire, self._seq, action))
+
+    # --- 削除 ---
+
+    def evict(self, now) -> int:
+        """expire < now の予約をまとめて捨てる。捨てた件数を返す"""
+        heap = self._expiry
+        evicted = 0
+        while heap and heap[0][0] < now:
+            expire, _, action = heapq.heappop(heap)
+            # 期限を延ばした予約は古いヒープ要素を無視する
+            if action.alive and action.expire == expire:
+                self._kill(action)
+                evicted += 1
+        self._compact()
+        return evicted
+
+    def consume(self, action):
+        """予約を1回分実行済みにする (count が尽きたら消える)"""
+        action.count -= 1
+        if action.count <= 0:
+            self.drop(action)
+
+    def drop(self, action):
+        """予約を回数に関係なく取り消す"""
+        if action.alive:
+            self._kill(action)
+            self._compact()
+
+    def _kill(self, action):
+        action.alive = False
+        del self._live[action.key]
+        self._dead += 1
+
+    def _compact(self):
+        # 先頭の無効エントリは都度捨て、途中に溜まったら作り直す
+        for lane in (self._upgrades, self._moves):
+            while lane and not lane[0].alive:
+                lane.popleft()
+                self._dead -= 1
+        if self._dead > len(self._live):
+            self._upgrades = deque(a for a in self._upgrades if a.alive)
+            self._moves = deque(a for a in self._moves if a.alive)
+            self._dead = 0
+        if len(self._expiry) > 4 * len(self._live) + 16:
+            self._expiry = [e for e in self._expiry if e[2].alive and e[2].expire == e[0]]
+            heapq.heapify(self._expiry)
+
+    def clear(self):
+        self.__init__()
+
+    # --- 参照 ---
+
+    def peek(self):
+        """次に実行する予約 (無ければ None)"""
+        for lane in (self._upgrades, self._moves):
+            for action in lane:
+                if action.alive:
+                    return action
+        return None
+
+    def __iter__(self):
+        """実行順 (強化 → 移動) に生きている予約を返す"""
+        for lane in (self._upgrades, self._moves):
+            for action in lane:
+                if action.alive:
+                    yield action
+
+    def __len__(self):
+        return len(self._live)
+
+    def __bool__(self):
+        return bool(self._live)
+
+    def __repr__(self):
+        return f"MirrorPlan({list(self)})"
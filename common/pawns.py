@@ -0,0 +1,121 @@
+"""
+pawns.py - 移動中の兵 (moving_pawns) の列データと要塞ごとの集計
+
+終盤は数百体の兵が移動中になり、各プレイヤーが (team, kind, from, to, pos) を
+アンパックしながら under_attack / incoming_threats の dict を作っていた。
+PawnTable は moving_pawns を1パスだけ回して、聞かれたチームの
+「どの要塞に何体向かっているか」を要塞数の長さのリストへ足し込む
+(bincount と同じ形の集計)。結果はtickの間キャッシュする。
+プレイヤーが見るのはほぼ敵の分だけなので、集計はチームごとに作る (使わないチームの分は作らない)。
+
+    table = state.in_flight                    # GameState から (tickごとに1回だけ作られる)
+    table.incoming(2)[fid]                     # fid に向かう敵の兵力 (kind の合計)
+    table.threat(2)[fid]                       # 到着が近いほど重い脅威 (kind * 10 / 残り距離)
+    table.nearest(2)[fid]                      # 一番近い敵の残り距離
+    table.targets(2)                           # 敵が向かっている要塞 (最初に現れた順)
+
+moving_pawns[j] = [team, kind, from, to, pos]   (pos は 0〜100 の進行度)
+pos が座標 ([x, y]) で来た場合は、従来のコードと同じく残り距離 1.0 として扱う。
+"""
+from array import array
+
+# 残り距離の初期値 (向かってくる兵がいない)
+NO_PAWN = 999.0
+
+
+def remaining_distance(pos) -> float:
+    """到着までの残り距離 (最低 1.0)"""
+    if isinstance(pos, (list, tuple)):
+        return 1.0
+    return max(1.0, 100 - float(pos))
+
+
+class PawnTable:
+    """
+    moving_pawns の要塞ごとの集計 (+ 必要なら列データ)
+
+    集計 (incoming/threat/nearest/count/targets) はチームごとに、最初に使った時に
+    moving_pawns の1パスで作り、同じtickの中では使い回す。
+    列データ (team/kind/src/dst/distance の array) は columns() で別に作る。
+    """
+
+    __slots__ = ("moving_pawns", "size", "_aggregates", "_columns")
+
+    def __init__(self, moving_pawns, size=12):
+        self.moving_pawns = moving_pawns
+        self.size = size
+        self._aggregates = [None, None, None]   # チーム -> (incoming, threat, nearest, count, targets)
+        self._columns = None
+
+    def __len__(self):
+        return len(self.moving_pawns)
+
+    def _aggregate(self, team):
+        # team の兵だけを要塞数の長さのリストへ足し込む
+        aggregates = self._aggregates[team]
+        if aggregates is not None:
+            return aggregates
+        n = self.size
+        incoming = [0] * n
+        threat = [0.0] * n
+        nearest = [NO_PAWN] * n
+        count = [0] * n
+        targets = []
+        for p in self.moving_pawns:
+            if p[0] != team:
+                continue
+            to = p[3]
+            k = p[1]
+            pos = p[4]
+            if isinstance(pos, (list, tuple)):
+                d = 1.0
+            else:
+                d = 100 - float(pos)
+                if d < 1.0:
+                    d = 1.0
+            if not count[to]:
+                targets.append(to)
+            count[to] += 1
+            incoming[to] += k
+            threat[to] += k * 10 / d
+            if d < nearest[to]:
+                nearest[to] = d
+        aggregates = self._aggregates[team] = (incoming, threat, nearest, count, targets)
+        return aggregates
+
+    def incoming(self, team) -> list:
+        """要塞ごとの、team の兵の kind の合計 (向かっている兵力)"""
+        return self._aggregate(team)[0]
+
+    def threat(self, team) -> list:
+        """要塞ごとの、kind * 10 / 残り距離 の合計 (到着が近いほど重い)"""
+        return self._aggregate(team)[1]
+
+    def nearest(self, team) -> list:
+        """要塞ごとの、一番近い team の兵の残り距離 (いなければ NO_PAWN)"""
+        return self._aggregate(team)[2]
+
+    def count(self, team) -> list:
+        """要塞ごとの、向かっている team の兵の数"""
+        return self._aggregate(team)[3]
+
+    def targets(self, team) -> list:
+        """team の兵が向かっている要塞 (moving_pawns で最初に現れた順)"""
+        return self._aggregate(team)[4]
+
+    def columns(self) -> dict:
+        """列データ {"team", "kind", "src", "dst", "distance"} (array)"""
+        if self._columns is None:
+            team = array("b")
+            kind = array("d")
+            src = array("b")
+            dst = array("b")
+            distance = array("d")
+            for p in self.moving_pawns:
+                team.append(p[0])
+                kind.append(p[1])
+                src.append(p[2])
+                dst.append(p[3])
+                distance.append(remaining_distance(p[4]))
+            self._columns = {"team": team, "kind": kind, "src": src, "dst": dst, "distance": distance}
+        return self._columns
@@ -0,0 +1,289 @@
+"""
+profiling.py - update() の段階 (防御・アップグレード・攻撃・補給…) ごとの時間と候補数
+
+NewComer / MachinedPlayer の update() は段階を順に回して候補を ActionArbiter に積む。
+StageProfiler は段階の区切りごとに「前の区切りからの時間」と「その間に積まれた候補の数」を
+段階ごとのヒストグラム (2の冪のバケツ) に足していき、試合の終わり (done) に1試合1行で書き出す。
+
+    self.profiler = make_profiler("newcomer")
+    self.runner = AnytimeRunner(self.profiler.wrap(self.decide))   # ジェネレータの判断はこれだけ
+
+    def decide(self, info):                                   # 区切りごとに stage() を呼ぶ
+        ...
+        profiler.stage("defense", actions)
+        yield actions.best()
+
+    # ジェネレータでない update() は begin() / stage() / end() を直接呼ぶ
+    profiler.begin()
+    ...
+    profiler.stage("defense", actions)
+    ...
+    profiler.end(done)                                        # done なら書き出す
+
+  - 無効 (既定) のときは NullProfiler が返り、wrap() は decide をそのまま返し、他は何もしない
+  - 有効にするには引数 enabled=True か環境変数 TCG_PROFILE=1。
+    出力先は TCG_PROFILE_PATH (既定 "profile.jsonl"、{match} などのテンプレート可)
+  - wrap() したジェネレータは yield の間 (締め切りで次のtickに持ち越した間) を時間に数えない
+  - 集計して表にするには python -m tcg.players.common.profiling profile.jsonl
+  - done を受け取らずに終わった試合の分はプロセス終了時に書き出す (登録はモジュールに1つ。export() したものは外す)
+"""
+import argparse
+import atexit
+import json
+import os
+import sys
+import time
+
+from .telemetry import JsonLinesExporter
+
+DEFAULT_PATH = "profile.jsonl"
+
+# ヒストグラムのバケツ数。バケツ b は [2**(b-1), 2**b) (b=0 は 0)。時間は us 単位
+TIME_BUCKETS = 24
+COUNT_BUCKETS = 16
+
+TOTAL = "total"
+
+# まだ export() していない StageProfiler (プロセス終了時に書き出す)
+_pending = set()
+
+
+def _export_pending():
+    # done を受け取らずに終わった試合の分
+    for profiler in list(_pending):
+        profiler.export(incomplete=True)
+
+
+atexit.register(_export_pending)
+
+
+def profiling_enabled(enabled=None) -> bool:
+    if enabled is None:
+        return os.environ.get("TCG_PROFILE", "0").lower() not in ("", "0", "off", "false", "no")
+    return bool(enabled)
+
+
+def _bucket(value, size) -> int:
+    b = int(value).bit_length()
+    return b if b < size else size - 1
+
+
+def _quantile(hist, q) -> float:
+    """ヒストグラムから q 分位の上限を見積もる (バケツの上端)"""
+    n = sum(hist)
+    if not n:
+        return 0.0
+    rank = q * n
+    seen = 0
+    for b, count in enumerate(hist):
+        seen += count
+        if seen >= rank:
+            return float(2 ** b) if b else 0.0
+    return float(2 ** (len(hist) - 1))
+
+
+class NullProfiler:
+    """無効時のプロファイラ (全部 no-op)"""
+
+    __slots__ = ()
+
+    enabled = False
+
+    def wrap(self, decide):
+        return decide
+
+    def begin(self):
+        pass
+
+    def stage(self, name, actions=None):
+        pass
+
+    def end(self, done=False, **extra):
+        pass
+
+    def summary(self, **extra):
+        return {}
+
+    def export(self, **extra):
+        pass
+
+    def reset(self):
+        pass
+
+
+class StageProfiler:
+    """
+    1プレイヤー・1試合分の段階ごとの計測
+
+    stages[name] = [回数, 合計ns, 最大ns, 時間のヒストグラム, 候補の合計, 候補の最大, 候補数のヒストグラム]
+    "total" は begin() から end() まで (tick全体) の分。
+    """
+
+    enabled = True
+
+    def __init__(self, player="player", exporter=None, clock=time.perf_counter_ns):
+        self.player = player
+        self.exporter = exporter if exporter is not None else JsonLinesExporter(
+            os.environ.get("TCG_PROFILE_PATH", DEFAULT_PATH))
+        self.clock = clock
+        self.reset()
+        _pending.add(self)
+
+    def reset(self):
+        self.stages = {}
+        self.ticks = 0
+        self._last = 0           # 直前の区切りの時刻
+        self._elapsed = 0        # このtickに段階で数えた時間の合計 (yield の間を除く)
+        self._considered = 0     # 直前の区切りまでに積まれた候補の数
+
+    # --- 計測 ---
+
+    def wrap(self, decide):
+        """ジェネレータの decide を包む (再開するたびに時計を合わせ、最後まで回ったら end())"""
+        def profiled(info):
+            return self._run(decide(info), info[4])
+        return profiled
+
+    def _run(self, generator, done):
+        self.begin()
+        clock = self.clock
+        try:
+            while True:
+                # yield の間 (持ち越し中) は数えない
+                self._last = clock()
+                value = next(generator)
+                yield value
+        except StopIteration as stop:
+            self.end(done)
+            return stop.value
+
+    def begin(self):
+        self._elapsed = 0
+        self._considered = 0
+        self._last = self.clock()
+
+    def stage(self, name, actions=None):
+        """前の区切りからここまでを段階 name として数える (actions は ActionArbiter)"""
+        now = self.clock()
+        elapsed = now - self._last
+        self._elapsed += elapsed
+        considered = actions.considered if actions is not None else self._considered
+        self._record(name, elapsed, considered - self._considered)
+        self._considered = considered
+        self._last = self.clock()
+
+    def end(self, done=False, **extra):
+        self._record(TOTAL, self._elapsed + self.clock() - self._last, self._considered)
+        self.ticks += 1
+        if done:
+            self.export(**extra)
+
+    def _record(self, name, elapsed_ns, candidates):
+        s = self.stages.get(name)
+        if s is None:
+            s = self.stages[name] = [0, 0, 0, [0] * TIME_BUCKETS, 0, 0, [0] * COUNT_BUCKETS]
+        s[0] += 1
+        s[1] += elapsed_ns
+        if elapsed_ns > s[2]:
+            s[2] = elapsed_ns
+        s[3][_bucket(elapsed_ns // 1000, TIME_BUCKETS)] += 1
+        s[4] += candidates
+        if candidates > s[5]:
+            s[5] = candidates
+        s[6][_bucket(candidates, COUNT_BUCKETS)] += 1
+
+    # --- 書き出し ---
+
+    def summary(self, **extra) -> dict:
+        result = {
+            "player": self.player,
+            "match": os.environ.get("TCG_MATCH_ID", "0"),
+            "ticks": self.ticks,
+            "stages": {
+                name: {"n": s[0], "total_us": s[1] / 1000.0, "max_us": s[2] / 1000.0, "time_hist": list(s[3]),
+                       "candidates": s[4], "max_candidates": s[5], "candidate_hist": list(s[6])}
+                for name, s in self.stages.items()
+            },
+        }
+        result.update(extra)
+        return result
+
+    def export(self, **extra):
+        """試合の集計を書き出して、次の試合に備えて空にする (終了時の書き出しの登録も外す)"""
+        if self.stages:
+            self.exporter.write(self.summary(**extra))
+        self.reset()
+        _pending.discard(self)
+
+
+_NULL = NullProfiler()
+
+
+def make_profiler(player="player", enabled=None, exporter=None):
+    """有効なら StageProfiler、無効なら共有の NullProfiler を返す"""
+    if not profiling_enabled(enabled):
+        return _NULL
+    return StageProfiler(player, exporter)
+
+
+# --- 集計 ---
+
+def merge(summaries) -> dict:
+    """複数試合の summary を段階ごとに足し合わせる (ヒストグラムもそのまま足せる)"""
+    stages = {}
+    ticks = 0
+    for summary in summaries:
+        ticks += summary.get("ticks", 0)
+        for name, s in summary.get("stages", {}).items():
+            m = stages.get(name)
+            if m is None:
+                stages[name] = {k: (list(v) if isinstance(v, list) else v) for k, v in s.items()}
+                continue
+            m["n"] += s["n"]
+            m["total_us"] += s["total_us"]
+            m["max_us"] = max(m["max_us"], s["max_us"])
+            m["candidates"] += s["candidates"]
+            m["max_candidates"] = max(m["max_candidates"], s["max_candidates"])
+            for key in ("time_hist", "candidate_hist"):
+                m[key] = [a + b for a, b in zip(m[key], s[key])]
+    return {"ticks": ticks, "stages": stages}
+
+
+def format_table(summary) -> str:
+    """段階ごとの時間 (平均・分位・最大・tick全体に占める割合) と候補数の表"""
+    stages = summary["stages"]
+    total = stages.get(TOTAL, {}).get("total_us") or sum(s["total_us"] for s in stages.values()) or 1.0
+    lines = [f"{'stage':<16}{'n':>8}{'mean_us':>10}{'p50<=':>8}{'p99<=':>8}{'max_us':>10}{'share':>8}"
+             f"{'cand/n':>8}{'max_cand':>9}"]
+    for name, s in stages.items():
+        n = s["n"] or 1
+        lines.append(f"{name:<16}{s['n']:>8}{s['total_us'] / n:>10.1f}{_quantile(s['time_hist'], 0.5):>8.0f}"
+                     f"{_quantile(s['time_hist'], 0.99):>8.0f}{s['max_us']:>10.1f}"
+                     f"{s['total_us'] / total * 100:>7.1f}%{s['candidates'] / n:>8.2f}{s['max_candidates']:>9}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="段階ごとの計測 (profile.jsonl) をプレイヤーごとに集計する")
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_PATH])
+    parser.add_argument("--player", help="このプレイヤーの分だけ")
+    args = parser.parse_args(argv)
+
+    by_player = {}
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    summary = json.loads(line)
+                    by_player.setdefault(summary.get("player", "player"), []).append(summary)
+    for player, summaries in by_player.items():
+        if args.player and player != args.player:
+            continue
+        merged = merge(summaries)
+        print(f"{player}: {len(summaries)} matches, {merged['ticks']} ticks")
+        print(format_table(merged))
+        print()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+rules.py - ゲームのルール定数
+
+ローカルシミュレータ (simulator/) と、それを前提にした予測・探索で共有する。
+state[i] = [team, kind, level, pawn_number, upgrade_time, neighbors]
+moving_pawns[j] = [team, kind, from, to, pos]   (pos は 0〜100 の進行度)
+spawning_pawns[k] = [team, kind, 残り出撃数, from, to]
+"""
+
+# レベルごとの生産上限 (これ以上は自然には増えない。輸送で超えるのは可)
+HARD_LIMITS = [10, 10, 20, 30, 40, 50]
+MAX_LEVEL = 5
+
+# レベルごとの生産間隔 (何tickで1体増えるか)
+PRODUCTION_INTERVAL = [40, 30, 24, 20, 16, 12]
+
+# アップグレードにかかるtick数 (現在のレベルで引く)
+UPGRADE_TIME = [60, 80, 100, 120, 140, 0]
+
+# 出撃: SPAWN_INTERVAL tickごとに各出撃地点から1体ずつ出る
+SPAWN_INTERVAL = 4
+
+# 移動: 1tickあたりの進行度 (0→100 で到着)
+PAWN_SPEED = 2.0
+TRAVEL_TICKS = int(100 / PAWN_SPEED)
+
+NO_UPGRADE = -1  # upgrade_time の「強化していない」値
+
+
+def upgrade_cost(level) -> int:
+    """level → level+1 に必要な兵士数"""
+    return HARD_LIMITS[level + 1] // 2 if level < MAX_LEVEL else HARD_LIMITS[MAX_LEVEL] // 2
+
+
+def send_amount(pawns) -> int:
+    """移動コマンドで送り出される兵士数 (半分)"""
+    return int(pawns) // 2
@@ -0,0 +1,81 @@
+"""
+spawn_tracker.py - 出撃待機 (SpawnPoint) の差分検出
+
+Kai プレイヤーは新しい出撃を id(sp) で見分け、見た id を set に溜め続けていた。
+set は試合中ずっと増え続けるうえ、CPython は解放したオブジェクトの id を
+再利用するので、新しい出撃を見落としたり二重に数えたりする。
+
+SpawnTracker は前tickの SpawnPoint を中身で覚えておき、今tickと比べて
+「前tickの続きとして説明できない出撃」だけを新規イベントとして返す。
+覚えるのは直前の1tick分だけなので、メモリは生きている出撃の数で決まる。
+
+    tracker = SpawnTracker()
+    for team, src, dst, count in tracker.diff(SpawnPoint, team=enemy_team):
+        ...   # 今tick新しく始まった出撃
+
+SpawnPoint[k] = [team, kind, 残り出撃数, from, to]
+"""
+
+
+class SpawnTracker:
+    """
+    連続する SpawnPoint のスナップショットを比べて新しい出撃を見つける
+
+    同じ (team, from, to) の出撃は残り数で対応を取る。残り数は1tickに
+    高々 max_drop しか減らないので、前tickの残り p に対して
+    p - max_drop <= r <= p を満たす今tickの残り r は「続き」とみなす。
+    """
+
+    __slots__ = ("max_drop", "_prev")
+
+    def __init__(self, max_drop=1):
+        self.max_drop = max_drop
+        # (team, from, to) -> 残り出撃数のリスト (降順)
+        self._prev = {}
+
+    def diff(self, spawning_pawns, team=None) -> list:
+        """
+        新しく始まった出撃を [(team, from, to, 残り数), ...] で返す
+
+        team を指定するとそのチームの出撃だけを見る (他は覚えもしない)。
+        """
+        current = {}
+        for sp in spawning_pawns:
+            if team is not None and sp[0] != team:
+                continue
+            key = (sp[0], sp[3], sp[4])
+            remaining = current.get(key)
+            if remaining is None:
+                current[key] = [sp[2]]
+            else:
+                remaining.append(sp[2])
+
+        events = []
+        prev = self._prev
+        max_drop = self.max_drop
+        for key, remaining in current.items():
+            before = prev.get(key)
+            if len(remaining) > 1:
+                remaining.sort(reverse=True)
+            if not before:
+                for r in remaining:
+                    events.append((key[0], key[1], key[2], r))
+                continue
+            # 両方降順に並べて、大きい方から貪欲に対応を取る
+            i = 0
+            for r in remaining:
+                while i < len(before) and before[i] - max_drop > r:
+                    i += 1   # 前tickのこの出撃はもう終わった
+                if i < len(before) and r <= before[i]:
+                    i += 1   # 続き
+                else:
+                    events.append((key[0], key[1], key[2], r))
+        self._prev = current
+        return events
+
+    def reset(self):
+        self._prev = {}
+
+    def __len__(self):
+        """覚えている (生きている) 出撃の数"""
+        return sum(len(v) for v in self._prev.values())
@@ -0,0 +1,192 @@
+"""
+telemetry.py - 計測用のカウンタ・ゲージ・間引きイベント
+
+update() の中で print していたデバッグ出力の代わり。
+標準出力には何も書かず、試合の終わりに1試合1行の要約 (JSON) として書き出す。
+
+    self.telemetry = make_telemetry("newcomer")
+    self.telemetry.count("plan.upgrade")
+    self.telemetry.gauge("soldiers.mine", my_soldiers)
+    self.telemetry.event("action", every=10, cmd=1, src=3, dst=4)
+    ...
+    if done:
+        self.telemetry.export(step=self.step)
+
+無効 (既定) のときは NullTelemetry が返り、どのメソッドも何もしない。
+有効にするには引数 enabled=True か環境変数 TCG_TELEMETRY=1。
+出力先は TCG_TELEMETRY_PATH (既定 "telemetry.jsonl"、{match} などのテンプレート可)。
+
+done を受け取らずに終わった試合の分は、プロセス終了時にまとめて (incomplete=True 付きで) 書き出す。
+そのための登録はモジュールに1つだけで、export() したものは外す (試合ごとに atexit に積まない)。
+"""
+import atexit
+import json
+import os
+import threading
+
+from .logger import expand_path
+
+DEFAULT_PATH = "telemetry.jsonl"
+
+# 1種類のイベントにつき保存するサンプルの上限
+MAX_SAMPLES = 50
+
+# まだ export() していない Telemetry (プロセス終了時に書き出す)
+_pending = set()
+
+
+def _export_pending():
+    for telemetry in list(_pending):
+        telemetry.export(incomplete=True)
+
+
+atexit.register(_export_pending)
+
+
+def telemetry_enabled(enabled=None) -> bool:
+    if enabled is None:
+        return os.environ.get("TCG_TELEMETRY", "0").lower() not in ("", "0", "off", "false", "no")
+    return bool(enabled)
+
+
+class NullTelemetry:
+    """無効時のテレメトリ (全部 no-op)"""
+
+    __slots__ = ()
+
+    enabled = False
+
+    def count(self, name, n=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def event(self, name, every=1, **fields):
+        pass
+
+    def summary(self, **extra):
+        return {}
+
+    def export(self, **extra):
+        pass
+
+    def reset(self):
+        pass
+
+
+class Telemetry:
+    """
+    1プレイヤー・1試合分のテレメトリ
+
+    - count: 回数を足す
+    - gauge: 値を記録する (最後の値・最小・最大・平均を残す)
+    - event: 発生回数を数え、every 回に1回だけ中身をサンプルとして残す
+    """
+
+    enabled = True
+
+    def __init__(self, player="player", exporter=None, max_samples=MAX_SAMPLES):
+        self.player = player
+        self.exporter = exporter if exporter is not None else JsonLinesExporter()
+        self.max_samples = max_samples
+        self.reset()
+        _pending.add(self)
+
+    def reset(self):
+        self.counters = {}
+        # name -> [last, min, max, sum, n]
+        self.gauges = {}
+        # name -> [発生回数, サンプルのリスト]
+        self.events = {}
+
+    def count(self, name, n=1):
+        counters = self.counters
+        counters[name] = counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        g = self.gauges.get(name)
+        if g is None:
+            self.gauges[name] = [value, value, value, value, 1]
+            return
+        g[0] = value
+        if value < g[1]:
+            g[1] = value
+        if value > g[2]:
+            g[2] = value
+        g[3] += value
+        g[4] += 1
+
+    def event(self, name, every=1, **fields):
+        e = self.events.get(name)
+        if e is None:
+            e = self.events[name] = [0, []]
+        e[0] += 1
+        if (e[0] - 1) % every == 0 and len(e[1]) < self.max_samples:
+            e[1].append(fields)
+
+    def summary(self, **extra) -> dict:
+        result = {
+            "player": self.player,
+            "match": os.environ.get("TCG_MATCH_ID", "0"),
+            "counters": dict(self.counters),
+            "gauges": {
+                name: {"last": g[0], "min": g[1], "max": g[2], "mean": g[3] / g[4], "n": g[4]}
+                for name, g in self.gauges.items()
+            },
+            "events": {name: {"count": e[0], "samples": e[1]} for name, e in self.events.items()},
+        }
+        result.update(extra)
+        return result
+
+    def export(self, **extra):
+        """試合の要約を書き出して、次の試合に備えて空にする (終了時の書き出しの登録も外す)"""
+        if self.counters or self.gauges or self.events:
+            self.exporter.write(self.summary(**extra))
+        self.reset()
+        _pending.discard(self)
+
+
+class JsonLinesExporter:
+    """要約を JSON lines のファイルに追記する (並列に試合を回しても1行単位で混ざらない)"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path=None, **fields):
+        template = path or os.environ.get("TCG_TELEMETRY_PATH", DEFAULT_PATH)
+        self.template = template
+        self.fields = fields
+
+    def write(self, summary):
+        path = expand_path(self.template, player=summary.get("player", "player"), **self.fields)
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        line = json.dumps(summary, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            # O_APPEND で1回の write にすれば、別プロセスの行と混ざらない
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+
+
+class MemoryExporter:
+    """要約をメモリに貯めるだけ (テスト・トーナメントの集計用)"""
+
+    def __init__(self):
+        self.summaries = []
+
+    def write(self, summary):
+        self.summaries.append(summary)
+
+
+_NULL = NullTelemetry()
+
+
+def make_telemetry(player="player", enabled=None, exporter=None):
+    """有効なら Telemetry、無効なら共有の NullTelemetry を返す"""
+    if not telemetry_enabled(enabled):
+        return _NULL
+    return Telemetry(player, exporter)
@@ -11,9 +11,51 @@ Template AI Player
 """
 
 from tcg.controller import Controller
+from .common.arbiter import ActionArbiter
+from .common.config import Config
+from .common.decision_cache import DecisionCache
+from .common.deltas import DeltaEngine
+from .common.game_state import GameState
+from .common.profiling import make_profiler
 import random
 
 
+class MachinedConfig(Config):
+    """MachinedPlayer の調整用の定数 (既定値は調整前の値)"""
+
+    DEFAULTS = {
+        # 防御的な設定（多くの部隊を溜められる）
+        "fortress_limit": [10, 10, 20, 30, 40, 50],
+        # FORTRESS_IMPORTANCEの設定はとりあえず一緒
+        "fortress_importance": {
+            0: 10, 1: 10, 2: 10,      # 上側エリア
+            3: 1, 4: 10, 5: 1,     # 中央上
+            6: 4, 7: 10, 8: 1,     # 中央下
+            9: 10, 10: 10, 11: 10     # 下側エリア
+        },
+        "defense_margin": 1.2,           # 守備兵 < 脅威 * これ なら援軍
+        "key_upgrade_ratio": 0.4,        # 重要拠点 (4, 7) は上限の40%で強化開始
+        "upgrade_ratio": 0.5,            # その他の要塞の強化開始
+        "neutral_multiplier": 1.5,       # 中立を狙う兵力差
+        "attack_min_troops": 15,         # 敵要塞を攻撃する最低兵数
+        "attack_min_ratio": 0.5,         # 〃 (上限に対する割合)
+        "success_threshold": 3.0,        # 敵要塞を攻撃する戦力比
+        "success_threshold_ahead": 0.5,  # 〃 (総兵力で大差がついている時)
+        "dominance_ratio": 10,           # 総兵力が敵の何倍なら大差とみなすか
+    }
+    SPACE = {
+        "defense_margin": (0.8, 2.0),
+        "key_upgrade_ratio": (0.2, 0.9),
+        "upgrade_ratio": (0.2, 0.9),
+        "neutral_multiplier": (1.0, 3.0),
+        "attack_min_troops": (5, 30),
+        "attack_min_ratio": (0.2, 0.9),
+        "success_threshold": (0.8, 5.0),
+        "success_threshold_ahead": (0.2, 2.0),
+        "dominance_ratio": (2, 20),
+    }
+
+
 class MachinedPlayer(Controller):
     """
     テンプレートAIプレイヤー
@@ -21,27 +63,33 @@ class MachinedPlayer(Controller):
     このクラスをベースに独自の戦略を実装してください。
     """
 
-    # 防御的な設定（多くの部隊を溜められる）
-    fortress_limit = [10, 10, 20, 30, 40, 50]
+    # 自分をチーム1 (上側) と決め打ちしている (state[i][0] == 1 など)。チーム2 の時は反転した盤面が来る
+    team_one_view = True
 
-    # FORTRESS_IMPORTANCEの設定はとりあえず一緒
-    FORTRESS_IMPORTANCE = {
-        0: 10, 1: 10, 2: 10,      # 上側エリア
-        3: 1, 4: 10, 5: 1,     # 中央上
-        6: 4, 7: 10, 8: 1,     # 中央下
-        9: 10, 10: 10, 11: 10     # 下側エリア
-    }
+    config_class = MachinedConfig
+
+    # 防御的な設定・要塞の重要度 (調整できるのは MachinedConfig 側)
+    fortress_limit = MachinedConfig.DEFAULTS["fortress_limit"]
+    FORTRESS_IMPORTANCE = MachinedConfig.DEFAULTS["fortress_importance"]
 
     UP_FORTRESS_PRIORITY = [1, 2, 0, 4]
     DOWM_FORTRESS_PRIORITY = [10, 9, 11, 7]
 
 
-    def __init__(self) -> None:
+    def __init__(self, config=None) -> None:
         super().__init__()
+        self.config = config or MachinedConfig()
+        self.fortress_limit = self.config.fortress_limit
+        self.FORTRESS_IMPORTANCE = self.config.fortress_importance
         self.step = 0
-        self.prev_team_state = None # 前のターンのチーム状態を保存する変数
+        self.deltas = DeltaEngine() # 前のターンからの盤面の変化
         self.attacking_fort = None # 攻撃中の砦ID
         self.target_fort = None # 攻撃目標の砦ID
+        self.decisions = DecisionCache() # 盤面キー -> (判断, 攻撃目標)
+        # 優先度の揺らぎ用の乱数はプレイヤー専用にする (キャッシュに当たったtickは引かないので、
+        # グローバルの random を使うと相手や engine の乱数列がキャッシュの当たり外れでずれる)
+        self.rng = random.Random(0)
+        self.profiler = make_profiler("machined") # 段階ごとの時間・候補数 (既定は無効で no-op)
 
     def team_name(self) -> str:
         """
@@ -60,40 +108,36 @@ class MachinedPlayer(Controller):
         """
         team, state, moving_pawns, spawning_pawns, done = info
         self.step += 1
+        config = self.config
+        profiler = self.profiler
+        profiler.begin()
+        # 盤面ビュー (チーム別の要塞リスト・兵力集計をtickごとに一度だけ作る)
+        state = GameState(state, team, moving_pawns, spawning_pawns)
 
-        # 優先度付きアクションリスト
-        actions = []
-        # considered_actions = set()  # 重複防止
+        # 優先度付きアクション (最良の1件だけ残す。同じ (cmd, src, dst) はまとめる)
+        actions = ActionArbiter()
 
-        # 前フレームから今回までで「新しく自軍になった砦」を検出
-        newly_captured = set()
-        current_teams = [state[i][0] for i in range(12)]
-
-        if self.prev_team_state is not None:
-            for i in range(12):
-                # 0(中立) or 2(敵) から 1(自軍) になったものを新規占領とみなす
-                if self.prev_team_state[i] != 1 and current_teams[i] == 1:
-                    newly_captured.add(i)
-
-        # 今回の状態を保存
-        self.prev_team_state = current_teams[:]
+        # 前フレームからの変化 (所有・レベル・強化) は DeltaEngine でまとめて計算する
+        delta = self.deltas.update(state)
+        # 0(中立) or 2(敵) から 1(自軍) になったものを新規占領とみなす
+        newly_captured = delta.gained(1)
 
         # 自分の要塞と敵の要塞を分類
-        my_fortresses = [i for i in range(12) if state[i][0] == 1]
-        enemy_fortresses = [i for i in range(12) if state[i][0] == 2]
-        neutral_fortresses = [i for i in range(12) if state[i][0] == 0]
+        my_fortresses = state.forts(1)
+        enemy_fortresses = state.forts(2)
+        neutral_fortresses = state.forts(0)
 
         # --- 全兵士数の計算 ---
         
         # 1. 砦の中にいる兵士の総数 (state[i][3] が兵士数)
         # state[i][0] が所有チーム (0:中立, 1:自分, 2:敵 ※自分が2の場合は逆)
-        total_in_forts = sum(int(s[3]) for s in state)
+        total_in_forts = state.fort_soldiers()
 
         # 2. 移動中の兵士の総数 (リストの長さがそのまま人数)
-        total_moving = len(moving_pawns)
+        total_moving = state.moving_count()
 
         # 3. 出撃待機中の兵士の総数 (spawning_pawns[i][2] が残りの出撃数)
-        total_spawning = sum(int(p[2]) for p in spawning_pawns)
+        total_spawning = state.spawning_count()
 
         # 全合計
         total_soldiers = total_in_forts + total_moving + total_spawning
@@ -102,18 +146,10 @@ class MachinedPlayer(Controller):
         enemy_team_id = 2 if team == 1 else 1
         
         # 自分の総兵力
-        my_soldiers = (
-            sum(int(s[3]) for s in state if s[0] == my_team_id) +
-            len([p for p in moving_pawns if p[0] == my_team_id]) +
-            sum(int(p[2]) for p in spawning_pawns if p[0] == my_team_id)
-        )
+        my_soldiers = state.soldiers(my_team_id)
 
         # 敵の総兵力
-        enemy_soldiers = (
-            sum(int(s[3]) for s in state if s[0] == enemy_team_id) +
-            len([p for p in moving_pawns if p[0] == enemy_team_id]) +
-            sum(int(p[2]) for p in spawning_pawns if p[0] == enemy_team_id)
-        )
+        enemy_soldiers = state.soldiers(enemy_team_id)
 
         # ゲームフェーズの判定 (取得要塞数で判断)
         my_fortress_num = len(my_fortresses)
@@ -126,36 +162,33 @@ class MachinedPlayer(Controller):
 
         # デバッグ情報（序盤のみ表示）
 
+        profiler.stage("setup", actions)
 
         # === 緊急防御: 最優先 ===
-        under_attack = {}
-        incoming_threats = {}
-        
-        for pawn in moving_pawns:
-            pawn_team, kind, from_, to, pos = pawn
-            # pos がリストの場合に対応（例: [x, y]）
-            if isinstance(pos, (list, tuple)):
-                # 進行度が別で保存されていないなら、距離計算は「ざっくり1」として扱うか、
-                # もしくは x,y から距離を近似して計算する
-                # ここでは安全のため固定値扱いにして、「エラーを出さずに動かす」ことを優先
-                distance = 1.0
-            else:
-                distance = max(1.0, 100 - float(pos))
-
-            if pawn_team == 2 and state[to][0] == 1:
-                if to not in under_attack:
-                    under_attack[to] = []
-                under_attack[to].append((from_, pos))
-
-                threat = kind * 10 / distance
-                incoming_threats[to] = incoming_threats.get(to, 0) + threat
+        # 移動中の敵兵を要塞ごとに集計 (残り距離が近いほど脅威が大きい。pos が座標なら距離1扱い)
+        in_flight = state.in_flight
+        incoming_threats = in_flight.threat(2)
+        under_attack = [to for to in in_flight.targets(2) if state[to][0] == 1]
+
+        # 攻撃を受けていない (移動中の敵兵に左右されない) tickの判断は、盤面と
+        # 総兵力のしきい値と攻撃目標だけで決まるので、同じなら前の答えを使い回す
+        decision_key = None
+        if not under_attack:
+            decision_key = (state.quantized_key(), my_soldiers > 100, my_soldiers > 400,
+                            my_soldiers > enemy_soldiers * config.dominance_ratio, self.target_fort)
+            cached = self.decisions.get(decision_key)
+            if cached is not None:
+                command, self.target_fort = cached
+                profiler.stage("cached", actions)
+                profiler.end(done)
+                return command
 
         # 防御が必要な要塞への支援
-        for target_fort, threats in under_attack.items():
+        for target_fort in under_attack:
             current_defenders = state[target_fort][3]
-            total_threat = incoming_threats.get(target_fort, 0)
+            total_threat = incoming_threats[target_fort]
 
-            if current_defenders < total_threat * 1.2:
+            if current_defenders < total_threat * config.defense_margin:
                 neighbors = state[target_fort][5]
                 for my_fort in neighbors:
                     action_key = (1, my_fort, target_fort)
@@ -166,6 +199,7 @@ class MachinedPlayer(Controller):
                         priority = 200 + total_threat * 10
                         actions.append((priority, 1, my_fort, target_fort))
                         # considered_actions.add(action_key)
+        profiler.stage("defense", actions)
 
         # === アップグレード戦略（序盤最優先）===
         # 序盤は部隊を溜めるためにアップグレードを最優先
@@ -191,7 +225,7 @@ class MachinedPlayer(Controller):
                 if (state[fort_id][4] == -1 and 
                     (level < max_upgrade_level or my_soldiers > 400) and
                     level < 5 and
-                    troops >= self.fortress_limit[level] * 0.4):  # 40%で開始
+                    troops >= self.fortress_limit[level] * config.key_upgrade_ratio):  # 既定は40%で開始
                     priority = upgrade_priority_base + 50 + level * 10
                     actions.append((priority, 2, fort_id, 0))
 
@@ -204,7 +238,7 @@ class MachinedPlayer(Controller):
                 enemy_neighbors = self.count_enemy_neighbors(my_fort, state)
                 
                 # 序盤は積極的にアップグレード
-                troops_threshold = self.fortress_limit[level] * (0.5 if phase == "early" else 0.5)
+                troops_threshold = self.fortress_limit[level] * config.upgrade_ratio
                 
                 if (state[my_fort][4] == -1 and 
                     (level < max_upgrade_level or my_soldiers > 400) and
@@ -220,6 +254,7 @@ class MachinedPlayer(Controller):
                     if (near_enemy == False):
                         priority += 1000
                     actions.append((priority, 2, my_fort, 0)) 
+        profiler.stage("upgrade", actions)
         
         # # === 新規占領要塞の優先アップグレード ===
         # for fort_id in newly_captured:
@@ -267,7 +302,7 @@ class MachinedPlayer(Controller):
                                 
                                 # 評価関数
                                 score = 0
-                                multiplier = 1.5
+                                multiplier = config.neutral_multiplier
                                 if (neighbor in [4, 7] and my_fortress_num == 3):
                                     # 戦略的に重要拠点は4番目にとってほしい
                                     score += 1000 # 重要拠点
@@ -359,11 +394,12 @@ class MachinedPlayer(Controller):
         #                             priority += 1000  # 重要拠点は更に優先
         #                         actions.append((priority, 1, my_fort, neighbor))
         #                         # considered_actions.add(action_key)
+        profiler.stage("neutral_target", actions)
 
         # === 敵要塞への戦略的攻撃 ===
         for my_fort in my_fortresses:
             level = state[my_fort][2]
-            min_troops = max(15, self.fortress_limit[level] * 0.5)
+            min_troops = max(config.attack_min_troops, self.fortress_limit[level] * config.attack_min_ratio)
             
             if state[my_fort][3] >= min_troops:
                 neighbors = state[my_fort][5]
@@ -379,7 +415,10 @@ class MachinedPlayer(Controller):
                         adjusted_enemy_strength = enemy_troops * defense_multiplier
                         success_ratio = my_troops / max(adjusted_enemy_strength, 1)
                         # 取られて間もない要塞なら問題なく攻撃を開始する
-                        success_threshold = 0.5 if (my_soldiers > enemy_soldiers * 10) else 3.0
+                        if my_soldiers > enemy_soldiers * config.dominance_ratio:
+                            success_threshold = config.success_threshold_ahead
+                        else:
+                            success_threshold = config.success_threshold
                         
                         if success_ratio >= success_threshold:  # 敵はより慎重に
                             importance = self.FORTRESS_IMPORTANCE.get(neighbor, 5)
@@ -387,6 +426,7 @@ class MachinedPlayer(Controller):
                             priority = 120 + importance * 2 + weakness + int(success_ratio * 5)
                             actions.append((priority, 1, my_fort, neighbor))
                             # considered_actions.add(action_key)
+        profiler.stage("attack", actions)
 
         # === 部隊の戦略的再配置（バケツリレー改善版）===
         for my_fort in my_fortresses:
@@ -447,20 +487,21 @@ class MachinedPlayer(Controller):
                 if best_target is not None:
                     action_key = (1, my_fort, best_target)
                     # 優先度に微小なランダム値を加えて、順番をばらけさせる
-                    randomized_priority = best_priority + random.uniform(0, 0.1)
+                    randomized_priority = best_priority + self.rng.uniform(0, 0.1)
                     actions.append((best_priority, 1, my_fort, best_target))
                     # considered_actions.add(action_key)
+        profiler.stage("rebalance", actions)
 
-        # 最も優先度の高いアクションを実行
+        # 最も優先度の高いアクションを実行 (何もすることがない場合は 0, 0, 0)
+        result = (0, 0, 0)
         if actions:
-            actions.sort(reverse=True, key=lambda x: x[0])
-            _, command, subject, to = actions[0]
-            
-
-            return command, subject, to
+            priority, command, subject, to = actions.best()
+            result = (command, subject, to)
 
-        # 何もすることがない場合
-        return 0, 0, 0
+        if decision_key is not None:
+            self.decisions.put(decision_key, (result, self.target_fort))
+        profiler.end(done)
+        return result
 
     def is_already_attacking(self, from_fort, to_fort, spawning_pawns, moving_pawns):
         """指定された経路で既に攻撃部隊を送っているか確認"""
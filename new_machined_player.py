@@ -11,9 +11,42 @@ Template AI Player
 """
 
 from tcg.controller import Controller
+from .common.arbiter import ActionArbiter
+from .common.config import Config
+from .common.deltas import DeltaEngine
+from .common.game_state import GameState
+from .common.graph import get_graph
+from .common.telemetry import make_telemetry
 import random
 
 
+class NewMachinedConfig(Config):
+    """NewMachinedPlayer の調整用の定数 (既定値は調整前の値)"""
+
+    DEFAULTS = {
+        "defense_margin": 1.2,           # 守備兵 < 脅威 * これ なら援軍
+        "key_upgrade_ratio": 0.4,        # 重要拠点 (4, 7) は上限の40%で強化開始
+        "upgrade_ratio": 0.5,            # その他の要塞の強化開始
+        "attacking_upgrade_ratio": 0.8,  # ターゲット攻撃中の強化開始 (兵の供給を優先)
+        "level_defense": 0.15,           # 敵要塞の守備力をレベルごとに何割増しで見るか
+        "attack_threshold": 1.2,         # 敵要塞を攻撃する戦力比
+        "advantage_ratio": 3,            # 終盤に総兵力が敵の何倍なら圧倒的有利とみなすか
+        "advantage_threshold": 0.1,      # 〃 の時の攻撃する戦力比
+        "attack_keep_ratio": 0.5,        # 敵要塞を攻める時に残す兵 (上限に対する割合)
+    }
+    SPACE = {
+        "defense_margin": (0.8, 2.0),
+        "key_upgrade_ratio": (0.2, 0.9),
+        "upgrade_ratio": (0.2, 0.9),
+        "attacking_upgrade_ratio": (0.4, 1.0),
+        "level_defense": (0.0, 0.5),
+        "attack_threshold": (0.8, 3.0),
+        "advantage_ratio": (2, 10),
+        "advantage_threshold": (0.05, 1.0),
+        "attack_keep_ratio": (0.0, 0.9),
+    }
+
+
 class NewMachinedPlayer(Controller):
     """
     テンプレートAIプレイヤー
@@ -21,6 +54,11 @@ class NewMachinedPlayer(Controller):
     このクラスをベースに独自の戦略を実装してください。
     """
 
+    # 自分をチーム1 (上側) と決め打ちしている (state[i][0] == 1 など)。チーム2 の時は反転した盤面が来る
+    team_one_view = True
+
+    config_class = NewMachinedConfig
+
     # 防御的な設定（多くの部隊を溜められる）
     fortress_limit = [10, 10, 20, 30, 40, 50]
 
@@ -36,12 +74,15 @@ class NewMachinedPlayer(Controller):
     DOWM_FORTRESS_PRIORITY = [10, 9, 11, 7]
 
 
-    def __init__(self) -> None:
+    def __init__(self, config=None) -> None:
         super().__init__()
+        self.config = config or NewMachinedConfig()
         self.step = 0
-        self.prev_team_state = None # 前のターンのチーム状態を保存する変数
+        self.deltas = DeltaEngine() # 前のターンからの盤面の変化
         self.attacking_fort = None # 攻撃中の砦ID
         self.target_fort = None # 攻撃目標の砦ID
+        self.graph = None # 全点対距離テーブル (最初のtickで構築)
+        self.telemetry = make_telemetry("new_machined") # 計測 (既定は無効で no-op)
 
     def team_name(self) -> str:
         """
@@ -66,21 +107,10 @@ class NewMachinedPlayer(Controller):
         if target_id is None:
             return
 
-        # 1. ターゲットからの距離マップを作成 (BFS)
-        dist_map = {i: 999 for i in range(12)}
-        dist_map[target_id] = 0
-        queue = [target_id]
-        visited = {target_id}
-        
-        while queue:
-            curr = queue.pop(0)
-            d = dist_map[curr]
-            neighbors = state[curr][5] # 5番目が隣接リスト
-            for n in neighbors:
-                if n not in visited:
-                    visited.add(n)
-                    dist_map[n] = d + 1
-                    queue.append(n)
+        # 1. ターゲットからの距離マップ (全点対距離テーブルの行を参照)
+        if self.graph is None:
+            self.graph = get_graph(state)
+        dist_map = self.graph.dist[target_id]
 
         # 2. 各要塞について、よりターゲットに近い味方要塞へ移動
         for my_fort in my_fortresses:
@@ -124,40 +154,37 @@ class NewMachinedPlayer(Controller):
         """
         team, state, moving_pawns, spawning_pawns, done = info
         self.step += 1
+        config = self.config
+        # 盤面ビュー (チーム別の要塞リスト・兵力集計をtickごとに一度だけ作る)
+        state = GameState(state, team, moving_pawns, spawning_pawns, self.graph)
+        if done:
+            # 試合終了: 1試合分の要約を書き出す
+            self.telemetry.export(step=self.step)
 
-        # 優先度付きアクションリスト
-        actions = []
-        # considered_actions = set()  # 重複防止
-
-        # 前フレームから今回までで「新しく自軍になった砦」を検出
-        newly_captured = set()
-        current_teams = [state[i][0] for i in range(12)]
+        # 優先度付きアクション (最良の1件だけ残す。同じ (cmd, src, dst) はまとめる)
+        actions = ActionArbiter()
 
-        if self.prev_team_state is not None:
-            for i in range(12):
-                # 0(中立) or 2(敵) から 1(自軍) になったものを新規占領とみなす
-                if self.prev_team_state[i] != 1 and current_teams[i] == 1:
-                    newly_captured.add(i)
-
-        # 今回の状態を保存
-        self.prev_team_state = current_teams[:]
+        # 前フレームからの変化 (所有・レベル・強化) は DeltaEngine でまとめて計算する
+        delta = self.deltas.update(state)
+        # 0(中立) or 2(敵) から 1(自軍) になったものを新規占領とみなす
+        newly_captured = delta.gained(1)
 
         # 自分の要塞と敵の要塞を分類
-        my_fortresses = [i for i in range(12) if state[i][0] == 1]
-        enemy_fortresses = [i for i in range(12) if state[i][0] == 2]
-        neutral_fortresses = [i for i in range(12) if state[i][0] == 0]
+        my_fortresses = state.forts(1)
+        enemy_fortresses = state.forts(2)
+        neutral_fortresses = state.forts(0)
 
         # --- 全兵士数の計算 ---
         
         # 1. 砦の中にいる兵士の総数 (state[i][3] が兵士数)
         # state[i][0] が所有チーム (0:中立, 1:自分, 2:敵 ※自分が2の場合は逆)
-        total_in_forts = sum(int(s[3]) for s in state)
+        total_in_forts = state.fort_soldiers()
 
         # 2. 移動中の兵士の総数 (リストの長さがそのまま人数)
-        total_moving = len(moving_pawns)
+        total_moving = state.moving_count()
 
         # 3. 出撃待機中の兵士の総数 (spawning_pawns[i][2] が残りの出撃数)
-        total_spawning = sum(int(p[2]) for p in spawning_pawns)
+        total_spawning = state.spawning_count()
 
         # 全合計
         total_soldiers = total_in_forts + total_moving + total_spawning
@@ -166,18 +193,10 @@ class NewMachinedPlayer(Controller):
         enemy_team_id = 2 if team == 1 else 1
         
         # 自分の総兵力
-        my_soldiers = (
-            sum(int(s[3]) for s in state if s[0] == my_team_id) +
-            len([p for p in moving_pawns if p[0] == my_team_id]) +
-            sum(int(p[2]) for p in spawning_pawns if p[0] == my_team_id)
-        )
+        my_soldiers = state.soldiers(my_team_id)
 
         # 敵の総兵力
-        enemy_soldiers = (
-            sum(int(s[3]) for s in state if s[0] == enemy_team_id) +
-            len([p for p in moving_pawns if p[0] == enemy_team_id]) +
-            sum(int(p[2]) for p in spawning_pawns if p[0] == enemy_team_id)
-        )
+        enemy_soldiers = state.soldiers(enemy_team_id)
 
         # ゲームフェーズの判定 (取得要塞数で判断)
         my_fortress_num = len(my_fortresses)
@@ -188,48 +207,32 @@ class NewMachinedPlayer(Controller):
         else:
             phase = "late"
 
-        # デバッグ情報（序盤のみ表示）
-        if self.step % 1000 == 0:
-            print(f"\n=== Step {self.step} ({phase}) ===")
-            print(f"自分の要塞数: {len(my_fortresses)}, 敵の要塞数: {len(enemy_fortresses)}, 中立: {len(neutral_fortresses)}")
-            for my_fort in my_fortresses:
-                level = state[my_fort][2]
-                troops = state[my_fort][3]
-                max_troops = self.fortress_limit[level]
-                flag = " (NEW)" if my_fort in newly_captured else ""
-                print(f"  要塞{my_fort}{flag}: Lv{level}, 部隊{troops}/{max_troops}, 充填率{troops/max_troops*100:.1f}%")
-            print(f"全兵士数: {total_soldiers} (砦内: {total_in_forts}, 移動中: {total_moving}, 出撃待機: {total_spawning})")
-            print(f"自分の総兵力: {my_soldiers}, 敵の総兵力: {enemy_soldiers}")
+        # 状況のテレメトリ (無効なら何もしない。標準出力には書かない)
+        telemetry = self.telemetry
+        if telemetry.enabled:
+            telemetry.count("phase." + phase)
+            telemetry.gauge("forts.mine", len(my_fortresses))
+            telemetry.gauge("forts.enemy", len(enemy_fortresses))
+            telemetry.gauge("soldiers.mine", my_soldiers)
+            telemetry.gauge("soldiers.enemy", enemy_soldiers)
+            if self.step % 1000 == 0:
+                telemetry.event("status", step=self.step, phase=phase, neutral=len(neutral_fortresses),
+                                total=total_soldiers, in_forts=total_in_forts, moving=total_moving,
+                                spawning=total_spawning,
+                                forts=[(f, state[f][2], state[f][3], f in newly_captured) for f in my_fortresses])
 
         # === 緊急防御: 最優先 ===
-        under_attack = {}
-        incoming_threats = {}
-        
-        for pawn in moving_pawns:
-            pawn_team, kind, from_, to, pos = pawn
-            # pos がリストの場合に対応（例: [x, y]）
-            if isinstance(pos, (list, tuple)):
-                # 進行度が別で保存されていないなら、距離計算は「ざっくり1」として扱うか、
-                # もしくは x,y から距離を近似して計算する
-                # ここでは安全のため固定値扱いにして、「エラーを出さずに動かす」ことを優先
-                distance = 1.0
-            else:
-                distance = max(1.0, 100 - float(pos))
-
-            if pawn_team == 2 and state[to][0] == 1:
-                if to not in under_attack:
-                    under_attack[to] = []
-                under_attack[to].append((from_, pos))
-
-                threat = kind * 10 / distance
-                incoming_threats[to] = incoming_threats.get(to, 0) + threat
+        # 移動中の敵兵を要塞ごとに集計 (残り距離が近いほど脅威が大きい。pos が座標なら距離1扱い)
+        in_flight = state.in_flight
+        incoming_threats = in_flight.threat(2)
+        under_attack = [to for to in in_flight.targets(2) if state[to][0] == 1]
 
         # 防御が必要な要塞への支援
-        for target_fort, threats in under_attack.items():
+        for target_fort in under_attack:
             current_defenders = state[target_fort][3]
-            total_threat = incoming_threats.get(target_fort, 0)
+            total_threat = incoming_threats[target_fort]
 
-            if current_defenders < total_threat * 1.2:
+            if current_defenders < total_threat * config.defense_margin:
                 neighbors = state[target_fort][5]
                 for my_fort in neighbors:
                     action_key = (1, my_fort, target_fort)
@@ -258,8 +261,8 @@ class NewMachinedPlayer(Controller):
 
         # ターゲット攻撃中は兵士供給を優先するため、アップグレード基準を厳しくする
         is_attacking_target = (self.target_fort is not None)
-        upgrade_troop_ratio = 0.8 if is_attacking_target else 0.4
-        upgrade_troop_ratio_neutral = 0.8 if is_attacking_target else 0.5
+        upgrade_troop_ratio = config.attacking_upgrade_ratio if is_attacking_target else config.key_upgrade_ratio
+        upgrade_troop_ratio_neutral = config.attacking_upgrade_ratio if is_attacking_target else config.upgrade_ratio
 
         # 中央の重要拠点は最優先でアップグレード
         for fort_id in [4, 7]:
@@ -274,8 +277,7 @@ class NewMachinedPlayer(Controller):
                     priority = upgrade_priority_base + 50 + level * 10
                     actions.append((priority, 2, fort_id, 0))
                     # print("LAUNCH UPGRADE")
-                    if self.step < 500:
-                        print(f"    重要拠点アップグレード計画: 要塞{fort_id} Lv{level}→{level+1} (優先度{priority})")
+                    telemetry.count("plan.upgrade_key")
 
         # その他の要塞のアップグレード
         for my_fort in my_fortresses:
@@ -304,8 +306,7 @@ class NewMachinedPlayer(Controller):
                         priority += 1000
                     actions.append((priority, 2, my_fort, 0)) 
                     # print("LAUNCH UPGRADE")
-                    if self.step < 500:
-                        print(f"    アップグレード計画: 要塞{my_fort} Lv{level}→{level+1} (優先度{priority})")
+                    telemetry.count("plan.upgrade")
         
         # # === 新規占領要塞の優先アップグレード ===
         # for fort_id in newly_captured:
@@ -330,8 +331,7 @@ class NewMachinedPlayer(Controller):
         if self.target_fort is not None:
             # ターゲットが既に自分のものになったかチェック
             if state[self.target_fort][0] == 1:
-                if self.step < 500:
-                    print(f"    占領完了: {self.target_fort} を確保しました")
+                telemetry.event("target.captured", step=self.step, fort=self.target_fort)
                 self.target_fort = None
             # 他にも、ターゲットが極端に強化されて勝てなくなった場合などの解除条件を入れると良い
 
@@ -377,7 +377,7 @@ class NewMachinedPlayer(Controller):
             if best_target is None:
                 # 現在の総兵力の差を見る
                 advantage_mode = False
-                if (my_soldiers > enemy_soldiers * 3) and (phase == "late"):
+                if (my_soldiers > enemy_soldiers * config.advantage_ratio) and (phase == "late"):
                     # 自分が圧倒的に有利な場合は、より積極的に攻撃を仕掛ける
                     advantage_mode = True
                 
@@ -400,18 +400,18 @@ class NewMachinedPlayer(Controller):
                     enemy_troops = state[enemy_id][3]
                     enemy_level = state[enemy_id][2]
                     
-                    defense_multiplier = 1 + enemy_level * 0.15
+                    defense_multiplier = 1 + enemy_level * config.level_defense
                     adjusted_enemy_strength = enemy_troops * defense_multiplier
                     
                     # 勝率 (総戦力 vs 敵戦力)
                     ratio = total_power / max(adjusted_enemy_strength, 1)
                     
                     # 閾値設定 (確実に勝てるときだけ行く)
-                    threshold = 1.2
+                    threshold = config.attack_threshold
 
                     # 自分の総兵力が極端に多い場合は閾値を大きく下げる
                     if advantage_mode == True:
-                        threshold = 0.1
+                        threshold = config.advantage_threshold
                     
                     if ratio >= threshold:
                         importance = self.FORTRESS_IMPORTANCE.get(enemy_id, 5)
@@ -426,9 +426,8 @@ class NewMachinedPlayer(Controller):
             # ターゲット決定
             if best_target is not None:
                 self.target_fort = best_target
-                if self.step < 500:
-                    type_str = "中立" if state[best_target][0] == 0 else "敵"
-                    print(f"    新規ターゲット({type_str}): {best_target} (予想戦力比などを加味)")
+                telemetry.event("target.new", step=self.step, fort=best_target,
+                                owner=state[best_target][0])
 
         # 3. 一斉攻撃の実行 (ターゲットがある場合)
         if self.target_fort is not None:
@@ -444,13 +443,12 @@ class NewMachinedPlayer(Controller):
                     # 敵要塞への攻撃時は、最低限の守りを残すと安全かも（任意）
                     min_remain = 0
                     if state[target][0] == 2:
-                        min_remain = int(self.fortress_limit[level] * 0.50) # 50%だけ残す
+                        min_remain = int(self.fortress_limit[level] * config.attack_keep_ratio) # 既定は50%だけ残す
 
                     if troops > min_remain:
                         priority = 10000 + troops
                         actions.append((priority, 1, my_fort, target))
-                        if self.step < 500:
-                            print(f"    一斉攻撃参加: {my_fort}→{target} (兵力{troops})")
+                        telemetry.count("plan.all_in")
             
             # バケツリレーを実行
             self.execute_bucket_brigade(target, state, my_fortresses, actions)
@@ -520,16 +518,16 @@ class NewMachinedPlayer(Controller):
 
         # 最も優先度の高いアクションを実行
         if actions:
-            actions.sort(reverse=True, key=lambda x: x[0])
-            _, command, subject, to = actions[0]
+            priority, command, subject, to = actions.best()
             
-            # デバッグ出力
-            if self.step < 500:
+            if telemetry.enabled:
                 if command == 1:
-                    action_type = "攻撃" if state[to][0] != 1 else "支援"
-                    print(f"  → 実行: {action_type} {subject}→{to} (優先度{actions[0][0]})")
-                elif command == 2:
-                    print(f"  → 実行: アップグレード 要塞{subject} (優先度{actions[0][0]})")
+                    action_type = "attack" if state[to][0] != 1 else "support"
+                else:
+                    action_type = "upgrade"
+                telemetry.count("action." + action_type)
+                telemetry.event("action", every=20, step=self.step, type=action_type,
+                                src=subject, dst=to, priority=priority, candidates=actions.considered)
             
             return command, subject, to
 
@@ -3,80 +3,90 @@ player.py - Kai Player Ver.Hybrid (後方は鏡、前線は鬼)
 """
 from tcg.controller import Controller
 from .strategy import Strategy
+from ..common.deltas import DeltaEngine
+from ..common.game_state import GameState
+from ..common.logger import INFO, GameLogger
+from ..common.spawn_tracker import SpawnTracker
+from ..common.telemetry import make_telemetry
 
 class Kai3Player(Controller):
-    def __init__(self):
+    def __init__(self, log_level=None, log_path=None, log_stream=None):
         super().__init__()
         self.strategy = Strategy()
         self.step_count = 0
         
-        self.seen_spawn_ids = set()
-        self.prev_enemy_upgrade_timers = {}
+        self.spawn_tracker = SpawnTracker() # 敵の出撃の差分検出
+        self.deltas = DeltaEngine() # 前tickからの盤面の変化 (敵の強化開始など)
         self.action_queue = []
         
         # ログ設定 (今回は軽量化のためコンソールのみ)
-        self.log_file = "game_log.txt"
-        with open(self.log_file, "w", encoding="utf-8") as f:
-            f.write("=== Game Start (Hybrid Ver) ===\n")
+        # 出力先は試合・プレイヤーごとに指定可 (未指定なら logger.DEFAULT_PATH)
+        self.logger = GameLogger(log_path, header="=== Game Start (Hybrid Ver) ===", level=log_level,
+                                 stream=log_stream, fields={"player": "kai3"})
+        self.log_file = self.logger.path
+        self.telemetry = make_telemetry("kai3")
 
     def team_name(self) -> str:
         return "KaiHybrid"
 
-    def log_to_file(self, message):
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(str(message) + "\n")
+    def log_to_file(self, message, level=INFO):
+        self.logger.log(message, level)
 
     def update(self, info) -> tuple[int, int, int]:
+        try:
+            return self.decide(info)
+        finally:
+            if info[4]:
+                # 試合終了: このtickのログまで書き出してから、ファイルと書き出しスレッドを閉じる
+                self.logger.close()
+
+    def decide(self, info) -> tuple[int, int, int]:
         self.step_count += 1
         team, state, pawn, SpawnPoint, done = info
+        state = GameState(state, team, pawn, SpawnPoint)
+        delta = self.deltas.update(state)
+        if done:
+            self.telemetry.export(step=self.step_count)
         
         my_team = team
         enemy_team = 2 if team == 1 else 1
 
-        # --- リアルタイム兵力表示 ---
-        if self.step_count % 10 == 0:
-            my_s = sum(int(s[3]) for s in state if s[0] == my_team) + \
-                   len([p for p in pawn if p[0] == my_team])
-            en_s = sum(int(s[3]) for s in state if s[0] == enemy_team) + \
-                   len([p for p in pawn if p[0] == enemy_team])
-            print(f"Step {self.step_count:5d} | 自: {my_s} vs 敵: {en_s}")
+        # --- 兵力のテレメトリ (標準出力には書かない) ---
+        if self.step_count % 10 == 0 and self.telemetry.enabled:
+            my_s = state.fort_soldiers(my_team) + state.moving_count(my_team)
+            en_s = state.fort_soldiers(enemy_team) + state.moving_count(enemy_team)
+            self.telemetry.gauge("soldiers.mine", my_s)
+            self.telemetry.gauge("soldiers.enemy", en_s)
 
         # === 1. 敵の行動検知 (ミラーリング用) ===
         # ただし、前線に関する動きは無視する
         
-        current_enemy_spawns = [p for p in SpawnPoint if p[0] == enemy_team]
-        for sp in current_enemy_spawns:
-            sp_id = id(sp)
-            if sp_id not in self.seen_spawn_ids:
-                self.seen_spawn_ids.add(sp_id)
-                
-                e_from, e_to = sp[3], sp[4]
-                m_src = self.strategy.get_mirror_id(e_from)
-                m_dst = self.strategy.get_mirror_id(e_to)
-                
-                # 【重要】自分が「前線」ならミラー予約しない (自律戦闘に任せる)
-                if self.strategy.is_frontline(state, m_src, my_team):
-                    self.log_to_file(f"[IGNORE] ID:{m_src}は前線のためミラー拒否")
+        # 前tickとの差分で「今tick新しく始まった敵の出撃」だけを見る
+        for _, e_from, e_to, _ in self.spawn_tracker.diff(SpawnPoint, team=enemy_team):
+            m_src = self.strategy.get_mirror_id(e_from)
+            m_dst = self.strategy.get_mirror_id(e_to)
+            
+            # 【重要】自分が「前線」ならミラー予約しない (自律戦闘に任せる)
+            if self.strategy.is_frontline(state, m_src, my_team):
+                self.log_to_file(f"[IGNORE] ID:{m_src}は前線のためミラー拒否")
+                continue
+
+            # 重複チェック
+            if self.action_queue:
+                last = self.action_queue[-1]
+                if last["type"] == "MOVE" and last["src"] == m_src and last["dst"] == m_dst:
                     continue
 
-                # 重複チェック
-                if self.action_queue:
-                    last = self.action_queue[-1]
-                    if last["type"] == "MOVE" and last["src"] == m_src and last["dst"] == m_dst:
-                        continue
-
-                self.action_queue.append({
-                    "type": "MOVE",
-                    "src": m_src,
-                    "dst": m_dst,
-                    "expire": self.step_count + 50
-                })
+            self.action_queue.append({
+                "type": "MOVE",
+                "src": m_src,
+                "dst": m_dst,
+                "expire": self.step_count + 50
+            })
 
         # 強化検知 (強化は前線でもミラーして良い場合が多いが、兵士を使うので一応チェック)
-        for fid in [i for i in range(12) if state[i][0] == enemy_team]:
-            current = state[fid][4]
-            prev = self.prev_enemy_upgrade_timers.get(fid, -1)
-            if prev == -1 and current > 0:
+        for fid in delta.upgrade_started:
+            if state[fid][0] == enemy_team:
                 m_src = self.strategy.get_mirror_id(fid)
                 # 前線でも強化は有効だが、戦闘中なら無視したほうがいいかも？
                 # ここでは「余裕があればやる」程度に予約に入れる
@@ -86,14 +96,13 @@ class Kai3Player(Controller):
                     "dst": 0,
                     "expire": self.step_count + 200
                 })
-            self.prev_enemy_upgrade_timers[fid] = current
 
 
         # === 2. 行動実行フェーズ ===
 
         # (A) 自律戦闘 (前線 & 余剰兵力)
         # ミラー予約より先に、前線の判断を優先させる
-        my_fortresses = [i for i in range(12) if state[i][0] == my_team]
+        my_fortresses = state.forts(my_team)
         for fid in my_fortresses:
             # 前線、または満タンに近い後方基地
             if self.strategy.is_frontline(state, fid, my_team) or \
@@ -3,34 +3,53 @@ player.py - Kai Player Ver.33 (強化優先ロジック適用)
 """
 from tcg.controller import Controller
 from .strategy import Strategy
+from ..common.deltas import OWNER, DeltaEngine
+from ..common.game_state import GameState
+from ..common.logger import DEBUG, INFO, GameLogger
+from ..common.spawn_tracker import SpawnTracker
+from ..common.telemetry import make_telemetry
 import os
 
 class Kai4Player(Controller):
-    def __init__(self):
+    def __init__(self, log_level=None, log_path=None, log_stream=None):
         super().__init__()
         self.strategy = Strategy()
         self.step_count = 0
-        self.seen_spawn_ids = set()
+        self.spawn_tracker = SpawnTracker() # 敵の出撃の差分検出
         self.action_queue = []
-        self.prev_enemy_upgrade_timers = {}
+        self.deltas = DeltaEngine() # 前tickからの盤面の変化 (敵の強化開始など)
+        self.deltas.subscribe(OWNER, self.strategy.invalidate_distances)
         
         self.mode = "MIRROR" 
         self.mirror_failure_count = 0 
 
-        self.log_file = "game_log_full.txt"
-        with open(self.log_file, "w", encoding="utf-8") as f:
-            f.write("=== Game Start (Ver.33 Economy First) ===\n")
+        # 出力先は試合・プレイヤーごとに指定可 (未指定なら logger.DEFAULT_PATH)
+        self.logger = GameLogger(log_path, header="=== Game Start (Ver.33 Economy First) ===", level=log_level,
+                                 stream=log_stream, fields={"player": "kai4"})
+        self.log_file = self.logger.path
+        self.telemetry = make_telemetry("kai4")
 
     def team_name(self) -> str:
         return f"Kai{self.mode}"
 
-    def log(self, message):
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(str(message) + "\n")
+    def log(self, message, level=INFO):
+        self.logger.log(message, level)
 
     def update(self, info) -> tuple[int, int, int]:
+        try:
+            return self.decide(info)
+        finally:
+            if info[4]:
+                # 試合終了: このtickのログまで書き出してから、ファイルと書き出しスレッドを閉じる
+                self.logger.close()
+
+    def decide(self, info) -> tuple[int, int, int]:
         self.step_count += 1
         team, state, pawn, SpawnPoint, done = info
+        state = GameState(state, team, pawn, SpawnPoint, self.strategy.graph)
+        delta = self.deltas.update(state)
+        if done:
+            self.telemetry.export(step=self.step_count)
         my_team = team
         enemy_team = 2 if team == 1 else 1
 
@@ -38,8 +57,8 @@ class Kai4Player(Controller):
 
         # === 0. モード切替 ===
         if self.mode == "MIRROR":
-            my_forts = len([i for i in range(12) if state[i][0] == my_team])
-            en_forts = len([i for i in range(12) if state[i][0] == enemy_team])
+            my_forts = state.count(my_team)
+            en_forts = state.count(enemy_team)
             
             if my_forts < en_forts:
                 self.mode = "ADAPTIVE"
@@ -50,35 +69,27 @@ class Kai4Player(Controller):
                 self.log(f"[SWITCH] ミラー失敗多数: MIRROR -> ADAPTIVE")
 
         # === 1. 検知 (MIRROR) ===
-        current_enemy_spawns = [p for p in SpawnPoint if p[0] == enemy_team]
-        for sp in current_enemy_spawns:
-            sp_id = id(sp)
-            if sp_id not in self.seen_spawn_ids:
-                self.seen_spawn_ids.add(sp_id)
-                e_from, e_to = sp[3], sp[4]
-                m_src = self.strategy.get_mirror_id(e_from)
-                m_dst = self.strategy.get_mirror_id(e_to)
-                
+        # 前tickとの差分で「今tick新しく始まった敵の出撃」だけを見る
+        for _, e_from, e_to, _ in self.spawn_tracker.diff(SpawnPoint, team=enemy_team):
+            m_src = self.strategy.get_mirror_id(e_from)
+            m_dst = self.strategy.get_mirror_id(e_to)
+            
+            if self.mode == "MIRROR":
+                self.action_queue.append({
+                    "type": "MOVE", "src": m_src, "dst": m_dst,
+                    "expire": self.step_count + 100
+                })
+                self.log(f"[DETECT] 敵移動 {e_from}->{e_to} | 予約 {m_src}->{m_dst}")
+
+        for fid in delta.upgrade_started:
+            if state[fid][0] == enemy_team:
+                m_src = self.strategy.get_mirror_id(fid)
                 if self.mode == "MIRROR":
                     self.action_queue.append({
-                        "type": "MOVE", "src": m_src, "dst": m_dst,
-                        "expire": self.step_count + 100
+                        "type": "UPGRADE", "src": m_src, "dst": 0,
+                        "expire": self.step_count + 300
                     })
-                    self.log(f"[DETECT] 敵移動 {e_from}->{e_to} | 予約 {m_src}->{m_dst}")
-
-        for fid in range(12):
-            if state[fid][0] == enemy_team:
-                curr = state[fid][4]
-                prev = self.prev_enemy_upgrade_timers.get(fid, -1)
-                if prev == -1 and curr > 0:
-                    m_src = self.strategy.get_mirror_id(fid)
-                    if self.mode == "MIRROR":
-                        self.action_queue.append({
-                            "type": "UPGRADE", "src": m_src, "dst": 0,
-                            "expire": self.step_count + 300
-                        })
-                        self.log(f"[DETECT] 敵強化 {fid} | 予約 {m_src}")
-                self.prev_enemy_upgrade_timers[fid] = curr
+                    self.log(f"[DETECT] 敵強化 {fid} | 予約 {m_src}")
 
         # === 2. 実行 ===
         if self.mode == "MIRROR":
@@ -130,16 +141,15 @@ class Kai4Player(Controller):
         return 0, 0, 0
 
     def write_step_log(self, state, pawn, SpawnPoint, my_team, enemy_team):
-        my_s = sum(int(s[3]) for s in state if s[0] == my_team) + \
-               len([p for p in pawn if p[0] == my_team])
-        en_s = sum(int(s[3]) for s in state if s[0] == enemy_team) + \
-               len([p for p in pawn if p[0] == enemy_team])
+        my_s = state.fort_soldiers(my_team) + state.moving_count(my_team)
+        en_s = state.fort_soldiers(enemy_team) + state.moving_count(enemy_team)
         
         if self.step_count % 10 == 0:
-            print(f"Step {self.step_count:5d} [{self.mode[0]}] | 自: {my_s} vs 敵: {en_s}")
+            self.telemetry.gauge("soldiers.mine", my_s)
+            self.telemetry.gauge("soldiers.enemy", en_s)
 
         fort_str = ""
         for i in range(12):
             owner = "M" if state[i][0] == my_team else ("E" if state[i][0] == enemy_team else "N")
             fort_str += f"{i}:{owner}L{state[i][2]}P{int(state[i][3])} "
-        self.log(f"STEP:{self.step_count} MODE:{self.mode} MY:{my_s} EN:{en_s} | {fort_str}")
+        self.log(f"STEP:{self.step_count} MODE:{self.mode} MY:{my_s} EN:{en_s} | {fort_str}", DEBUG)
@@ -1,7 +1,7 @@
 """
 strategy.py - Kai Player Ver.34 (拡張・侵略ロジック修正版)
 """
-from collections import deque
+from ..common.graph import get_graph
 
 MIRROR_MAP = {
     0: 11, 11: 0, 1: 10, 10: 1, 2: 9,  9: 2,
@@ -11,7 +11,13 @@ HARD_LIMITS = [10, 10, 20, 30, 40, 50]
 
 class Strategy:
     def __init__(self):
-        pass
+        self.graph = None # 全点対距離テーブル (最初のtickで構築)
+        self.dist_cache = {} # チーム -> 距離マップ (所有が変わるまで使い回す)
+
+    def get_graph(self, state):
+        if self.graph is None:
+            self.graph = get_graph(state)
+        return self.graph
 
     def get_mirror_id(self, fortress_id) -> int:
         return MIRROR_MAP.get(fortress_id, 0)
@@ -21,25 +27,21 @@ class Strategy:
         cost = (HARD_LIMITS[f_state[2] + 1] if f_state[2] < 5 else 50) // 2
         return f_state[3] >= cost
 
-    def calculate_distance(self, state, target_team) -> dict:
-        distances = {i: 999 for i in range(12)}
-        queue = deque()
-        for i in range(12):
-            if state[i][0] == target_team:
-                distances[i] = 0
-                queue.append(i)
-        
-        while queue:
-            curr = queue.popleft()
-            for n in state[curr][5]:
-                if distances[n] > distances[curr] + 1:
-                    distances[n] = distances[curr] + 1
-                    queue.append(n)
-        return distances
+    def calculate_distance(self, state, target_team) -> list:
+        # 距離表の行を min 縮約するだけ (BFS不要)。所有が変わらない限り同じ結果なので使い回す
+        dist_map = self.dist_cache.get(target_team)
+        if dist_map is None:
+            dist_map = self.get_graph(state).distances_from(state.forts(target_team))
+            self.dist_cache[target_team] = dist_map
+        return dist_map
+
+    def invalidate_distances(self, *_):
+        """所有が変わったら距離マップを捨てる (DeltaEngine の OWNER イベントから呼ぶ)"""
+        self.dist_cache.clear()
 
     def get_upgrade_move(self, state, my_team, enemy_team) -> tuple[int, int, int]:
         """ADAPTIVEモード時の強化判断"""
-        my_forts = [i for i in range(12) if state[i][0] == my_team]
+        my_forts = state.forts(my_team)
         for fid in my_forts:
             if not self.can_upgrade(state[fid]): continue
             
@@ -71,7 +73,7 @@ class Strategy:
         dist_map = self.calculate_distance(state, enemy_team)
         neutral_dist_map = self.calculate_distance(state, 0)
 
-        my_forts = [i for i in range(12) if state[i][0] == my_team]
+        my_forts = state.forts(my_team)
         best_cmd = (0, 0, 0)
         best_score = -9999
 
@@ -2,53 +2,78 @@
 player.py - Kai Player Ver.53 (Hive Mind / 全体意思)
 """
 from tcg.controller import Controller
-from .strategy import Strategy
+from .strategy import Kai5Config, Strategy
+from ..common.deltas import DeltaEngine
+from ..common.game_state import GameState
+from ..common.logger import DEBUG, INFO, GameLogger
+from ..common.mirror_queue import MOVE, UPGRADE, MirrorPlan
+from ..common.spawn_tracker import SpawnTracker
+from ..common.telemetry import make_telemetry
 import os
 
 class Kai5Player(Controller):
-    def __init__(self):
+    config_class = Kai5Config
+
+    def __init__(self, log_level=None, log_path=None, log_stream=None, config=None):
         super().__init__()
-        self.strategy = Strategy()
+        self.config = config or Kai5Config()
+        self.strategy = Strategy(self.config)
         self.step_count = 0
-        self.seen_spawn_ids = set()
-        self.action_queue = []
-        self.prev_enemy_upgrade_timers = {}
+        self.spawn_tracker = SpawnTracker() # 敵の出撃の差分検出
+        self.action_queue = MirrorPlan()
+        self.deltas = DeltaEngine() # 前tickからの盤面の変化 (敵の強化開始など)
         
         self.mode = "MIRROR" 
 
-        self.log_file = "game_log_full.txt"
-        with open(self.log_file, "w", encoding="utf-8") as f:
-            f.write("=== Game Start (Ver.53 Hive Mind) ===\n")
+        # 出力先は試合・プレイヤーごとに指定可 (未指定なら logger.DEFAULT_PATH)
+        self.logger = GameLogger(log_path, header="=== Game Start (Ver.53 Hive Mind) ===", level=log_level,
+                                 stream=log_stream, fields={"player": "kai5"})
+        self.log_file = self.logger.path
+        self.telemetry = make_telemetry("kai5")
 
     def team_name(self) -> str:
         return "KaiHiveMind"
 
-    def log(self, message):
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(str(message) + "\n")
+    def log(self, message, level=INFO):
+        self.logger.log(message, level)
 
     def update(self, info) -> tuple[int, int, int]:
+        try:
+            return self.decide(info)
+        finally:
+            if info[4]:
+                # 試合終了: このtickのログまで書き出してから、ファイルと書き出しスレッドを閉じる
+                self.logger.close()
+
+    def decide(self, info) -> tuple[int, int, int]:
         self.step_count += 1
         team, state, pawn, SpawnPoint, done = info
+        state = GameState(state, team, pawn, SpawnPoint, self.strategy.graph)
+        delta = self.deltas.update(state)
+        if done:
+            self.telemetry.export(step=self.step_count)
         my_team = team
         enemy_team = 2 if team == 1 else 1
 
-        if self.step_count % 50 == 0 or self.step_count < 100:
+        if (self.step_count % 50 == 0 or self.step_count < 100) and self.logger.enabled(DEBUG):
             self.write_full_log(state, pawn, SpawnPoint, my_team, enemy_team)
 
-        if self.step_count % 10 == 0:
-            my_s = sum(int(s[3]) for s in state if s[0] == my_team)
-            en_s = sum(int(s[3]) for s in state if s[0] == enemy_team)
-            print(f"Step {self.step_count:5d} [{self.mode[0]}] | 自: {my_s} vs 敵: {en_s}")
+        # --- 兵力のテレメトリ (標準出力には書かない) ---
+        if self.step_count % 10 == 0 and self.telemetry.enabled:
+            my_s = state.fort_soldiers(my_team)
+            en_s = state.fort_soldiers(enemy_team)
+            self.telemetry.gauge("soldiers.mine", my_s)
+            self.telemetry.gauge("soldiers.enemy", en_s)
+            self.telemetry.count("mode." + self.mode)
 
         # === 0. モード切替 ===
         if self.mode == "MIRROR":
-            my_forts = len([i for i in range(12) if state[i][0] == my_team])
-            en_forts = len([i for i in range(12) if state[i][0] == enemy_team])
-            # 砦数で2つ以上差がついたら解除
-            if my_forts <= en_forts - 2:
+            my_forts = state.count(my_team)
+            en_forts = state.count(enemy_team)
+            # 砦数で switch_margin (既定2) 以上差がついたら解除
+            if my_forts <= en_forts - self.config.switch_margin:
                 self.mode = "ADAPTIVE"
-                self.log(f"[SWITCH] 砦数大差(2差以上): MIRROR -> ADAPTIVE")
+                self.log(f"[SWITCH] 砦数大差({self.config.switch_margin}差以上): MIRROR -> ADAPTIVE")
 
         # === 1. ミラー予約 (経済のみ) ===
         if self.mode == "MIRROR":
@@ -56,36 +81,21 @@ class Kai5Player(Controller):
             # (戦闘移動はミラーしない)
             
             # 拡張検知
-            current_enemy_spawns = [p for p in SpawnPoint if p[0] == enemy_team]
-            for sp in current_enemy_spawns:
-                sp_id = id(sp)
-                if sp_id not in self.seen_spawn_ids:
-                    self.seen_spawn_ids.add(sp_id)
-                    e_from, e_to = sp[3], sp[4]
-                    
-                    # 行き先が中立なら真似する
-                    if state[e_to][0] == 0:
-                        m_src = self.strategy.get_mirror_id(e_from)
-                        m_dst = self.strategy.get_mirror_id(e_to)
-                        self.action_queue.append({
-                            "type": "MOVE", "src": m_src, "dst": m_dst,
-                            "expire": self.step_count + 500
-                        })
-                        self.log(f"[DETECT-EXPAND] 敵拡張: {e_from}->{e_to} | 予約: {m_src}->{m_dst}")
+            # 前tickとの差分で「今tick新しく始まった敵の出撃」だけを見る
+            for _, e_from, e_to, _ in self.spawn_tracker.diff(SpawnPoint, team=enemy_team):
+                # 行き先が中立なら真似する
+                if state[e_to][0] == 0:
+                    m_src = self.strategy.get_mirror_id(e_from)
+                    m_dst = self.strategy.get_mirror_id(e_to)
+                    self.action_queue.push_move(m_src, m_dst, expire=self.step_count + self.config.mirror_expire)
+                    self.log(f"[DETECT-EXPAND] 敵拡張: {e_from}->{e_to} | 予約: {m_src}->{m_dst}")
 
             # 強化検知
-            for fid in range(12):
+            for fid in delta.upgrade_started:
                 if state[fid][0] == enemy_team:
-                    curr = state[fid][4]
-                    prev = self.prev_enemy_upgrade_timers.get(fid, -1)
-                    if prev == -1 and curr > 0:
-                        m_src = self.strategy.get_mirror_id(fid)
-                        self.action_queue.insert(0, {
-                            "type": "UPGRADE", "src": m_src, "dst": 0,
-                            "expire": self.step_count + 500
-                        })
-                        self.log(f"[DETECT-UPGRADE] 敵強化: {fid} | 予約: {m_src}")
-                    self.prev_enemy_upgrade_timers[fid] = curr
+                    m_src = self.strategy.get_mirror_id(fid)
+                    self.action_queue.push_upgrade(m_src, expire=self.step_count + self.config.mirror_expire)
+                    self.log(f"[DETECT-UPGRADE] 敵強化: {fid} | 予約: {m_src}")
 
         # === 2. 行動実行 ===
         
@@ -97,25 +107,24 @@ class Kai5Player(Controller):
 
         # (B) ミラー実行 (経済のみ)
         if self.mode == "MIRROR":
-            if self.action_queue and self.action_queue[0]["expire"] < self.step_count:
-                self.action_queue.pop(0)
+            self.action_queue.evict(self.step_count)
 
             for i, action in enumerate(self.action_queue):
-                src = action["src"]
-                dst = action["dst"]
+                src = action.src
+                dst = action.dst
                 if state[src][0] != my_team: continue
 
-                if action["type"] == "MOVE":
+                if action.kind == MOVE:
                     if state[src][3] >= 1:
-                        self.action_queue.pop(i)
+                        self.action_queue.consume(action)
                         self.log(f"[EXEC-MIRROR] 拡張: {src}->{dst}")
                         return 1, src, dst
                     else:
                         return 0, 0, 0 
 
-                elif action["type"] == "UPGRADE":
+                elif action.kind == UPGRADE:
                     if self.strategy.can_upgrade(state[src]):
-                        self.action_queue.pop(i)
+                        self.action_queue.consume(action)
                         self.log(f"[EXEC-MIRROR] 強化: {src}")
                         return 2, src, 0
                     else:
@@ -134,11 +143,11 @@ class Kai5Player(Controller):
 
     def write_full_log(self, state, pawn, SpawnPoint, my_team, enemy_team):
         # ログ出力（前回と同じ）
-        my_s = sum(int(s[3]) for s in state if s[0] == my_team)
-        en_s = sum(int(s[3]) for s in state if s[0] == enemy_team)
+        my_s = state.fort_soldiers(my_team)
+        en_s = state.fort_soldiers(enemy_team)
         msg = f"\n=== Step {self.step_count} [{self.mode}] (My:{my_s} vs En:{en_s}) ===\n"
         for i in range(12):
             s = state[i]
             owner = "MY" if s[0] == my_team else ("EN" if s[0] == enemy_team else "NU")
             msg += f"{i:2d} | {owner:3s} | {s[2]}  | {s[3]:4.1f}\n"
-        self.log(msg)
+        self.log(msg, DEBUG)
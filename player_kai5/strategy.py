@@ -1,7 +1,8 @@
 """
 strategy.py - Kai Player Ver.53 (Hive Mind / 全体誘導)
 """
-from collections import deque
+from ..common.config import Config
+from ..common.graph import get_graph
 
 MIRROR_MAP = {
     0: 11, 11: 0, 1: 10, 10: 1, 2: 9,  9: 2,
@@ -9,9 +10,36 @@ MIRROR_MAP = {
 }
 HARD_LIMITS = [10, 10, 20, 30, 40, 50]
 
+
+class Kai5Config(Config):
+    """Kai5 の調整用の定数 (既定値は調整前の値)"""
+
+    DEFAULTS = {
+        "switch_margin": 2,          # 砦数が (敵 - これ) 以下になったら MIRROR -> ADAPTIVE
+        "mirror_expire": 500,        # ミラー予約の有効期限 (tick)
+        "attack_margin": 1.1,        # ターゲットに勝てるとみなす兵力差 (1.1倍)
+        "relay_overflow_ratio": 2.0, # 輸送先が上限の何倍を超えたら輸送の優先度を下げるか
+        "neutral_bonus": 2000,       # ターゲット選びで中立に足す点
+    }
+    SPACE = {
+        "switch_margin": (1, 4),
+        "mirror_expire": (100, 1000),
+        "attack_margin": (0.8, 2.0),
+        "relay_overflow_ratio": (1.0, 4.0),
+        "neutral_bonus": (0, 4000),
+    }
+
+
 class Strategy:
-    def __init__(self):
+    def __init__(self, config=None):
+        self.config = config or Kai5Config()
         self.target_fort = None # 全体目標
+        self.graph = None # 全点対距離テーブル (最初のtickで構築)
+
+    def get_graph(self, state):
+        if self.graph is None:
+            self.graph = get_graph(state)
+        return self.graph
 
     def get_mirror_id(self, fortress_id) -> int:
         return MIRROR_MAP.get(fortress_id, 0)
@@ -38,20 +66,11 @@ class Strategy:
         target = self.target_fort
         if target is None: return 0, 0, 0
 
-        # 2. ターゲットへの距離マップ作成 (BFS)
-        dist_map = {i: 999 for i in range(12)}
-        dist_map[target] = 0
-        queue = deque([target])
-        
-        while queue:
-            curr = queue.popleft()
-            for n in state[curr][5]:
-                if dist_map[n] > dist_map[curr] + 1:
-                    dist_map[n] = dist_map[curr] + 1
-                    queue.append(n)
+        # 2. ターゲットへの距離マップ (距離表の行を参照)
+        dist_map = self.get_graph(state).dist[target]
 
         # 3. 全砦の行動決定
-        my_forts = [i for i in range(12) if state[i][0] == my_team]
+        my_forts = state.forts(my_team)
         best_cmd = (0, 0, 0)
         best_priority = -9999
 
@@ -66,7 +85,7 @@ class Strategy:
                 # 勝てる、またはターゲットが敵なら削るために攻撃
                 score = 10000
                 if state[target][0] == enemy_team: score += 500
-                if attack_power > target_power * 1.1: score += 1000
+                if attack_power > target_power * self.config.attack_margin: score += 1000
                 
                 if score > best_priority:
                     best_priority = score
@@ -83,7 +102,7 @@ class Strategy:
                         
                         # 溢れ防止 (ただしターゲットへ向かうルートは太くする)
                         limit = HARD_LIMITS[state[nid][2]]
-                        if state[nid][3] > limit * 2.0:
+                        if state[nid][3] > limit * self.config.relay_overflow_ratio:
                             priority -= 2000 
                         
                         if priority > best_priority:
@@ -107,8 +126,8 @@ class Strategy:
         best_score = -9999
         best_target = None
         
-        # 候補: 中立 または 敵の砦
-        candidates = [i for i in range(12) if state[i][0] != my_team]
+        # 候補: 中立 または 敵の砦 (同点なら ID の小さい方を取るので ID 順に並べる)
+        candidates = sorted(state.forts(0) + state.forts(enemy_team))
         
         for cand in candidates:
             # 評価関数:
@@ -117,13 +136,13 @@ class Strategy:
             # 3. 兵数が少ない (弱い)
             
             score = 0
-            if state[cand][0] == 0: score += 2000 # 中立優先
+            if state[cand][0] == 0: score += self.config.neutral_bonus # 中立優先
             score -= state[cand][3] * 10 # 弱い方がいい
             
             # 自分の砦からの最小距離
             min_dist = 999
-            for i in range(12):
-                if state[i][0] == my_team and cand in state[i][5]:
+            for i in state.forts(my_team):
+                if cand in state[i][5]:
                     min_dist = 1
                     break
             
@@ -137,7 +156,7 @@ class Strategy:
         self.target_fort = best_target
 
     def get_upgrade_move(self, state, my_team, enemy_team) -> tuple[int, int, int]:
-        my_forts = [i for i in range(12) if state[i][0] == my_team]
+        my_forts = state.forts(my_team)
         for fid in my_forts:
             if not self.can_upgrade(state[fid]): continue
             
@@ -2,56 +2,79 @@
 player.py - Kai Player Ver.40 (ネバネバ・ミラー)
 """
 from tcg.controller import Controller
-from .strategy import Strategy
+from .strategy import Kai6Config, Strategy
+from ..common.deltas import OWNER, DeltaEngine
+from ..common.game_state import GameState
+from ..common.logger import DEBUG, INFO, GameLogger
+from ..common.mirror_queue import MOVE, UPGRADE, MirrorPlan
+from ..common.spawn_tracker import SpawnTracker
+from ..common.telemetry import make_telemetry
 import os
 
 class Kai6Player(Controller):
-    def __init__(self):
+    config_class = Kai6Config
+
+    def __init__(self, log_level=None, log_path=None, log_stream=None, config=None):
         super().__init__()
-        self.strategy = Strategy()
+        self.config = config or Kai6Config()
+        self.strategy = Strategy(self.config)
         self.step_count = 0
-        self.seen_spawn_ids = set()
-        self.action_queue = []
-        self.prev_enemy_upgrade_timers = {}
+        self.spawn_tracker = SpawnTracker() # 敵の出撃の差分検出
+        self.action_queue = MirrorPlan()
+        self.deltas = DeltaEngine() # 前tickからの盤面の変化 (敵の強化開始など)
+        self.deltas.subscribe(OWNER, self.strategy.invalidate_distances)
         
         self.mode = "MIRROR" 
         self.mirror_failure_count = 0 
 
-        self.log_file = "game_log_full.txt"
-        with open(self.log_file, "w", encoding="utf-8") as f:
-            f.write("=== Game Start (Ver.40 Sticky Mirror) ===\n")
+        # 出力先は試合・プレイヤーごとに指定可 (未指定なら logger.DEFAULT_PATH)
+        self.logger = GameLogger(log_path, header="=== Game Start (Ver.40 Sticky Mirror) ===", level=log_level,
+                                 stream=log_stream, fields={"player": "kai6"})
+        self.log_file = self.logger.path
+        self.telemetry = make_telemetry("kai6")
 
     def team_name(self) -> str:
         return f"KaiSticky"
 
-    def log(self, message):
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(str(message) + "\n")
+    def log(self, message, level=INFO):
+        self.logger.log(message, level)
 
     def update(self, info) -> tuple[int, int, int]:
+        try:
+            return self.decide(info)
+        finally:
+            if info[4]:
+                # 試合終了: このtickのログまで書き出してから、ファイルと書き出しスレッドを閉じる
+                self.logger.close()
+
+    def decide(self, info) -> tuple[int, int, int]:
         self.step_count += 1
         team, state, pawn, SpawnPoint, done = info
+        state = GameState(state, team, pawn, SpawnPoint, self.strategy.graph)
+        delta = self.deltas.update(state)
+        if done:
+            self.telemetry.export(step=self.step_count)
         my_team = team
         enemy_team = 2 if team == 1 else 1
 
-        if self.step_count % 50 == 0 or self.step_count < 100:
+        if (self.step_count % 50 == 0 or self.step_count < 100) and self.logger.enabled(DEBUG):
             self.write_full_log(state, pawn, SpawnPoint, my_team, enemy_team)
 
-        # --- コンソール ---
-        if self.step_count % 10 == 0:
-            my_s = sum(int(s[3]) for s in state if s[0] == my_team) + \
-                   len([p for p in pawn if p[0] == my_team])
-            en_s = sum(int(s[3]) for s in state if s[0] == enemy_team) + \
-                   len([p for p in pawn if p[0] == enemy_team])
-            print(f"Step {self.step_count:5d} [{self.mode[0]}] | 自: {my_s} vs 敵: {en_s}")
+        # --- 兵力のテレメトリ (標準出力には書かない) ---
+        if self.step_count % 10 == 0 and self.telemetry.enabled:
+            my_s = state.fort_soldiers(my_team) + state.moving_count(my_team)
+            en_s = state.fort_soldiers(enemy_team) + state.moving_count(enemy_team)
+            self.telemetry.gauge("soldiers.mine", my_s)
+            self.telemetry.gauge("soldiers.enemy", en_s)
+            self.telemetry.count("mode." + self.mode)
 
         # === 0. モード切替判定 (修正: 超・粘り強く) ===
         if self.mode == "MIRROR":
-            my_forts = len([i for i in range(12) if state[i][0] == my_team])
-            en_forts = len([i for i in range(12) if state[i][0] == enemy_team])
+            my_forts = state.count(my_team)
+            en_forts = state.count(enemy_team)
             
             # 【修正】砦差が2つ開くまではミラー継続！ (1つ差なら誤差)
-            if my_forts < en_forts - 1:
+            if my_forts < en_forts - self.config.switch_margin:
                 self.mode = "ADAPTIVE"
                 self.log(f"[SWITCH] 砦数大差(2つ以上): MIRROR -> ADAPTIVE")
             
@@ -59,43 +82,29 @@ class Kai6Player(Controller):
             # if self.mirror_failure_count > 20: ...
 
         # === 1. 検知 ===
-        current_enemy_spawns = [p for p in SpawnPoint if p[0] == enemy_team]
-        for sp in current_enemy_spawns:
-            sp_id = id(sp)
-            if sp_id not in self.seen_spawn_ids:
-                self.seen_spawn_ids.add(sp_id)
-                e_from, e_to = sp[3], sp[4]
-                m_src = self.strategy.get_mirror_id(e_from)
-                m_dst = self.strategy.get_mirror_id(e_to)
-                
-                # 接敵中でもミラーは予約する（実行時に判断）
-                if self.mode == "MIRROR":
-                    # 期限を大幅延長 (1000ステップ待つ)
-                    self.action_queue.append({
-                        "type": "MOVE", "src": m_src, "dst": m_dst,
-                        "expire": self.step_count + 1000
-                    })
-                    self.log(f"[DETECT] 敵移動: {e_from}->{e_to} | 予約: {m_src}->{m_dst}")
-
-        for fid in range(12):
+        # 前tickとの差分で「今tick新しく始まった敵の出撃」だけを見る
+        for _, e_from, e_to, _ in self.spawn_tracker.diff(SpawnPoint, team=enemy_team):
+            m_src = self.strategy.get_mirror_id(e_from)
+            m_dst = self.strategy.get_mirror_id(e_to)
+            
+            # 接敵中でもミラーは予約する（実行時に判断）
+            if self.mode == "MIRROR":
+                # 期限を大幅延長 (1000ステップ待つ)
+                self.action_queue.push_move(m_src, m_dst, expire=self.step_count + 1000)
+                self.log(f"[DETECT] 敵移動: {e_from}->{e_to} | 予約: {m_src}->{m_dst}")
+
+        for fid in delta.upgrade_started:
             if state[fid][0] == enemy_team:
-                curr = state[fid][4]
-                prev = self.prev_enemy_upgrade_timers.get(fid, -1)
-                if prev == -1 and curr > 0:
-                    m_src = self.strategy.get_mirror_id(fid)
-                    if self.mode == "MIRROR":
-                        self.action_queue.insert(0, {
-                            "type": "UPGRADE", "src": m_src, "dst": 0,
-                            "expire": self.step_count + 1000
-                        })
-                        self.log(f"[DETECT] 敵強化: {fid} | 予約: {m_src}")
-                self.prev_enemy_upgrade_timers[fid] = curr
+                m_src = self.strategy.get_mirror_id(fid)
+                if self.mode == "MIRROR":
+                    self.action_queue.push_upgrade(m_src, expire=self.step_count + 1000)
+                    self.log(f"[DETECT] 敵強化: {fid} | 予約: {m_src}")
 
         # === 2. 実行 ===
         
         # (A) 緊急戦闘・強化 (最優先)
         # ただし、ミラー中は「本当に危険な時」だけ介入する
-        my_fortresses = [i for i in range(12) if state[i][0] == my_team]
+        my_fortresses = state.forts(my_team)
         for fid in my_fortresses:
             if self.mode == "ADAPTIVE" or self.strategy.is_critical_danger(state, fid, my_team, enemy_team):
                 cmd, src, dst = self.strategy.get_combat_move(state, fid, my_team, enemy_team)
@@ -112,31 +121,30 @@ class Kai6Player(Controller):
 
         # (C) ミラー実行 (粘り強く待つ)
         if self.mode == "MIRROR":
-            if self.action_queue and self.action_queue[0]["expire"] < self.step_count:
-                self.action_queue.pop(0) # さすがに古すぎるのは捨てる
+            self.action_queue.evict(self.step_count) # さすがに古すぎるのは捨てる
 
             # 先頭の命令だけを見る (順序厳守)
-            if self.action_queue:
-                action = self.action_queue[0]
-                src = action["src"]
-                dst = action["dst"]
+            action = self.action_queue.peek()
+            if action is not None:
+                src = action.src
+                dst = action.dst
                 
                 # 持っていない砦の命令はスキップして次へ
                 if state[src][0] != my_team:
-                    self.action_queue.pop(0)
+                    self.action_queue.drop(action)
                     self.log(f"[SKIP] 未所持のためスキップ: {src}")
                     return 0, 0, 0
 
-                if action["type"] == "MOVE":
+                if action.kind == MOVE:
                     if state[src][3] >= 1:
-                        self.action_queue.pop(0)
+                        self.action_queue.consume(action)
                         self.log(f"[EXEC-MIRROR] 移動: {src}->{dst}")
                         return 1, src, dst
                     # 兵不足なら return 0 で待つ (次のフレームでまたチェック)
 
-                elif action["type"] == "UPGRADE":
+                elif action.kind == UPGRADE:
                     if self.strategy.can_upgrade(state[src]):
-                        self.action_queue.pop(0)
+                        self.action_queue.consume(action)
                         self.log(f"[EXEC-MIRROR] 強化: {src}")
                         return 2, src, 0
                     # コスト不足なら待つ
@@ -161,8 +169,8 @@ class Kai6Player(Controller):
 
     def write_full_log(self, state, pawn, SpawnPoint, my_team, enemy_team):
         # ログ出力（前回と同じ）
-        my_s = sum(int(s[3]) for s in state if s[0] == my_team)
-        en_s = sum(int(s[3]) for s in state if s[0] == enemy_team)
+        my_s = state.fort_soldiers(my_team)
+        en_s = state.fort_soldiers(enemy_team)
         msg = f"\n=== Step {self.step_count} [{self.mode}] (My:{my_s} vs En:{en_s}) ===\n"
         for i in range(12):
             s = state[i]
@@ -170,5 +178,5 @@ class Kai6Player(Controller):
             end = "\n" if i % 2 == 1 else "  |  "
             msg += f"ID:{i:2d} [{owner}] Lv:{s[2]} 兵:{s[3]:4.1f}{end}"
         if self.action_queue:
-            msg += f"Queue Top: {self.action_queue[0]}\n"
-        self.log(msg)
+            msg += f"Queue Top: {self.action_queue.peek()}\n"
+        self.log(msg, DEBUG)
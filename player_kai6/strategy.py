@@ -1,7 +1,9 @@
 """
 strategy.py - Kai Player Ver.40 (危機判定・粘り腰)
 """
-from collections import deque
+from ..common.config import Config
+from ..common.graph import get_graph
+from ..common.rules import send_amount
 
 MIRROR_MAP = {
     0: 11, 11: 0, 1: 10, 10: 1, 2: 9,  9: 2,
@@ -9,9 +11,40 @@ MIRROR_MAP = {
 }
 HARD_LIMITS = [10, 10, 20, 30, 40, 50]
 
+
+class Kai6Config(Config):
+    """Kai6 の調整用の定数 (既定値は調整前の値)"""
+
+    DEFAULTS = {
+        "switch_margin": 1,          # 砦数が (敵 - これ) を下回ったら MIRROR -> ADAPTIVE
+        "danger_ratio": 1.0,         # 隣の敵の送れる兵 > 先読みの守備兵 * これ なら危険
+        "attack_margin": 1.1,        # 敵要塞を攻撃する兵力差 (1.1倍で攻撃)
+        "overflow_ratio": 0.9,       # 上限の何割で溢れとみなすか
+        "battery_release_ratio": 3.0,  # 後方の要塞が上限の何倍で前線へ放出するか
+        "adaptive_fill_ratio": 5.0,  # 拡張時に前線側の味方へ送り込む上限 (上限の何倍まで)
+    }
+    SPACE = {
+        "switch_margin": (0, 3),
+        "danger_ratio": (0.5, 2.0),
+        "attack_margin": (0.8, 2.0),
+        "overflow_ratio": (0.5, 1.0),
+        "battery_release_ratio": (1.0, 5.0),
+        "adaptive_fill_ratio": (1.0, 8.0),
+    }
+
+
 class Strategy:
-    def __init__(self):
-        pass
+    def __init__(self, config=None):
+        self.config = config or Kai6Config()
+        self.graph = None # 全点対距離テーブル (最初のtickで構築)
+        self.dist_cache = {} # チーム -> 距離マップ (所有が変わるまで使い回す)
+        self._danger_state = None # is_critical_danger の結果を持っている盤面 (tick)
+        self._danger = {} # 要塞ID -> 危険か (同じtickの間だけ)
+
+    def get_graph(self, state):
+        if self.graph is None:
+            self.graph = get_graph(state)
+        return self.graph
 
     def get_mirror_id(self, fortress_id) -> int:
         return MIRROR_MAP.get(fortress_id, 0)
@@ -31,38 +64,52 @@ class Strategy:
         """本当に危険な状態か？ (ミラーを中断してでも守るべきか)"""
         if not self.is_touching_real_enemy(state, fid, my_team, enemy_team):
             return False
-        
-        my_pawns = state[fid][3]
+
+        # 先読みは盤面 (tick) ごとに1回。同じtickにもう一度聞かれたら結果を返す
+        if state is not self._danger_state:
+            self._danger_state = state
+            self._danger.clear()
+        danger = self._danger.get(fid)
+        if danger is None:
+            danger = self._danger[fid] = self._critical_danger(state, fid, my_team, enemy_team)
+        return danger
+
+    def _critical_danger(self, state, fid, my_team, enemy_team) -> bool:
+        # 移動中・出撃待機の兵の到着だけで落ちるなら危険
+        forecast = state.forecast()
+        if forecast.flips(fid):
+            return True
+
+        # 隣の敵が今から送ってくる兵 (半分ずつ、移動にかかるtick後に着く) を
+        # その時点の守備兵 (到着と生産を先読みした値) で受け止められるか
+        owner, defenders = forecast.pawns_at(fid, forecast.travel_ticks)
+        if owner != my_team:
+            return True
         enemy_power = 0
         for nid in state[fid][5]:
             if state[nid][0] == enemy_team:
-                enemy_power += state[nid][3]
-        
-        # 敵の総兵力が自分の1.5倍を超えていたら危険
-        return enemy_power > my_pawns * 1.5
+                enemy_power += send_amount(state[nid][3])
+        return enemy_power > defenders * self.config.danger_ratio
 
     def is_overflowing(self, state, fid) -> bool:
         limit = HARD_LIMITS[state[fid][2]]
-        return state[fid][3] >= limit * 0.9
-
-    def calculate_distance(self, state, target_team) -> dict:
-        distances = {i: 999 for i in range(12)}
-        queue = deque()
-        for i in range(12):
-            if state[i][0] == target_team:
-                distances[i] = 0
-                queue.append(i)
-        while queue:
-            curr = queue.popleft()
-            for n in state[curr][5]:
-                if distances[n] > distances[curr] + 1:
-                    distances[n] = distances[curr] + 1
-                    queue.append(n)
-        return distances
+        return state[fid][3] >= limit * self.config.overflow_ratio
+
+    def calculate_distance(self, state, target_team) -> list:
+        # 距離表の行を min 縮約するだけ (BFS不要)。所有が変わらない限り同じ結果なので使い回す
+        dist_map = self.dist_cache.get(target_team)
+        if dist_map is None:
+            dist_map = self.get_graph(state).distances_from(state.forts(target_team))
+            self.dist_cache[target_team] = dist_map
+        return dist_map
+
+    def invalidate_distances(self, *_):
+        """所有が変わったら距離マップを捨てる (DeltaEngine の OWNER イベントから呼ぶ)"""
+        self.dist_cache.clear()
 
     def get_battery_move(self, state, my_team, enemy_team) -> tuple[int, int, int]:
         # (Ver.39と同じ、限界突破ロジック)
-        my_forts = [i for i in range(12) if state[i][0] == my_team]
+        my_forts = state.forts(my_team)
         for fid in my_forts:
             if self.is_touching_real_enemy(state, fid, my_team, enemy_team): continue
             targets = []
@@ -81,7 +128,7 @@ class Strategy:
                 targets.sort(key=lambda x: x[1], reverse=True)
                 if state[fid][3] >= 5: return 1, fid, targets[0][0]
             limit = HARD_LIMITS[state[fid][2]]
-            if state[fid][3] > limit * 3.0:
+            if state[fid][3] > limit * self.config.battery_release_ratio:
                 for nid in state[fid][5]:
                     if self.is_touching_real_enemy(state, nid, my_team, enemy_team):
                         return 1, fid, nid
@@ -104,7 +151,7 @@ class Strategy:
             n = state[nid]
             score = -9999
             if n[0] == enemy_team:
-                if attack_power > n[3] * 1.1: score = 1000
+                if attack_power > n[3] * self.config.attack_margin: score = 1000
                 elif self.is_overflowing(state, fid): score = 500
                 else: score = -100 
             elif n[0] == 0:
@@ -119,7 +166,7 @@ class Strategy:
         # 拡張ロジック (Ver.39と同じ)
         dist_map = self.calculate_distance(state, enemy_team)
         neutral_dist_map = self.calculate_distance(state, 0)
-        my_forts = [i for i in range(12) if state[i][0] == my_team]
+        my_forts = state.forts(my_team)
         for fid in my_forts:
             if state[fid][3] < 2: continue
             curr_dist = dist_map[fid]
@@ -131,7 +178,7 @@ class Strategy:
                     if dist_map[nid] < curr_dist:
                         t_state = state[nid]
                         limit = HARD_LIMITS[t_state[2]]
-                        if t_state[3] < limit * 5.0: return 1, fid, nid
+                        if t_state[3] < limit * self.config.adaptive_fill_ratio: return 1, fid, nid
                     elif curr_dist > 10 and neutral_dist_map[nid] < neutral_dist_map[fid]:
                          return 1, fid, nid
         return 0, 0, 0
@@ -0,0 +1,5 @@
+"""MCTS Player - 既存の戦略を使った時間制限つきの木探索."""
+
+from .player import MCTSPlayer
+
+__all__ = ["MCTSPlayer"]
@@ -0,0 +1,200 @@
+"""
+parallel.py - 候補手ごとのロールアウトをプロセスプールで並列に回す
+
+ワーカープロセスは方策 (StrategyPolicy) と探索の設定を持って常駐し、
+tickごとには小さな盤面スナップショット (と変わらない隣接リスト) だけを受け取る。
+
+  スナップショット = 12要塞の列 (owner/kind/level/pawns/upgrade/生産カウンタ) の array
+                   + 移動中・出撃待機の兵を平らにした array + step
+
+各ワーカーは全候補手を順番に (ワーカーごとに開始位置をずらして) ロールアウトし、
+締め切りまで回した分の {command: (勝ちやすさの合計, 回数)} を返す。
+締め切りまでに始まらなかったタスクはキャンセルし、遅れて返ってきた結果は捨てる。
+
+    executor = RolloutExecutor(workers=8)
+    pending = executor.submit(sim, team, commands, deadline)   # deadline は perf_counter 基準
+    tree.search(sim, deadline)                                  # 待っている間は手元でも探索
+    tree.merge(pending.collect())
+    executor.shutdown()
+"""
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from .policy import StrategyPolicy
+from .search import SearchTree
+from ..simulator.engine import Simulator
+
+# ワーカーの締め切りを親より早める秒数 (結果をプロセス間で送り返す時間)
+RESULT_SLACK = 0.001
+
+# ワーカープロセス内の状態 (_init_worker で作る)
+_policy = None
+_trees = {}
+
+
+# --- スナップショット ---
+
+def snapshot(sim) -> tuple:
+    """Simulator を送りやすい形 (array のタプル) にする。隣接リストは含めない"""
+    state = sim.state
+    moving = array("d")
+    for p in sim.moving_pawns:
+        moving.extend(p)
+    spawning = array("d")
+    for p in sim.spawning_pawns:
+        spawning.extend(p)
+    return (
+        sim.step_count,
+        array("b", [s[0] for s in state]),
+        array("b", [s[1] for s in state]),
+        array("b", [s[2] for s in state]),
+        array("d", [s[3] for s in state]),
+        array("d", [s[4] for s in state]),
+        array("i", sim.production),
+        moving,
+        spawning,
+    )
+
+
+def restore(snap, adjacency) -> Simulator:
+    """snapshot() から Simulator を作り直す"""
+    step, owner, kind, level, pawns, upgrade, production, moving, spawning = snap
+    state = [[owner[i], kind[i], level[i], pawns[i], upgrade[i], list(adjacency[i])]
+             for i in range(len(owner))]
+    moving_pawns = [[int(moving[j]), moving[j + 1], int(moving[j + 2]), int(moving[j + 3]), moving[j + 4]]
+                    for j in range(0, len(moving), 5)]
+    spawning_pawns = [[int(spawning[j]), spawning[j + 1], int(spawning[j + 2]), int(spawning[j + 3]),
+                       int(spawning[j + 4])]
+                      for j in range(0, len(spawning), 5)]
+    return Simulator(state, moving_pawns, spawning_pawns, step, list(production))
+
+
+# --- ワーカー側 ---
+
+def _init_worker(epsilon, options):
+    global _policy, _trees
+    # ワーカー内のログ・計測・標準出力は捨てる
+    os.environ["TCG_LOG_LEVEL"] = "OFF"
+    os.environ.pop("TCG_TELEMETRY", None)
+    sys.stdout = open(os.devnull, "w")
+    _policy = StrategyPolicy(epsilon=epsilon)
+    _trees = {team: SearchTree(team, _policy, **options) for team in (1, 2)}
+
+
+def _warm():
+    return os.getpid()
+
+
+def _rollouts(snap, adjacency, team, commands, wall_deadline, seed):
+    """
+    締め切りまで commands を順番にロールアウトして {command: (勝ちやすさの合計, 回数)} を返す
+
+    締め切りで途中で止まったロールアウトは数えない (SearchTree._iterate と同じ)。
+    """
+    if not commands:
+        return {}
+    # 壁時計の締め切りをこのプロセスの perf_counter に直す (プロセス間で比べられるのは壁時計だけ)
+    deadline = time.perf_counter() + (wall_deadline - time.time())
+    stats = {command: [0.0, 0] for command in commands}
+    root = restore(snap, adjacency)
+    tree = _trees[team]
+    _policy.rng.seed(seed)
+    ticks = tree.rollout_ticks
+    i = seed % len(commands)
+    while time.perf_counter() < deadline:
+        command = commands[i]
+        sim = root.clone()
+        if not tree.play(sim, command, ticks, deadline) and sim.winner() is None:
+            break
+        entry = stats[command]
+        entry[0] += tree.evaluate(sim)
+        entry[1] += 1
+        i = (i + 1) % len(commands)
+    return {command: (value, n) for command, (value, n) in stats.items() if n}
+
+
+# --- 親側 ---
+
+class PendingRollouts:
+    """submit() の結果。collect() で締め切りまで待って集計する"""
+
+    def __init__(self, futures, deadline):
+        self.futures = futures
+        self.deadline = deadline
+
+    def collect(self) -> dict:
+        timeout = max(0.0, self.deadline - time.perf_counter())
+        done, not_done = wait(self.futures, timeout=timeout)
+        for future in not_done:
+            future.cancel()   # まだ始まっていないものは取り消す (実行中のものは締め切りで止まる)
+        stats = {}
+        for future in done:
+            if future.cancelled() or future.exception() is not None:
+                continue
+            for command, (value, n) in future.result().items():
+                entry = stats.get(command)
+                stats[command] = (value, n) if entry is None else (entry[0] + value, entry[1] + n)
+        return stats
+
+
+class RolloutExecutor:
+    """
+    常駐ワーカーでのロールアウト
+
+    workers=None なら CPU数。warm() か最初の submit() でプロセスを起動する。
+    options は各ワーカーの SearchTree に渡す (rollout_ticks, policy_every など)。
+    """
+
+    def __init__(self, workers=None, epsilon=0.1, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.epsilon = epsilon
+        self.options = options
+        self._pool = None
+        self._adjacency = None
+        self._seed = 0
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self.epsilon, self.options))
+        return self
+
+    def warm(self, block=False):
+        """全ワーカーを起動しておく (最初のtickの持ち時間を起動に使わないように)"""
+        self.start()
+        futures = [self._pool.submit(_warm) for _ in range(self.workers)]
+        if block:
+            wait(futures)
+        return self
+
+    def submit(self, sim, team, commands, deadline) -> PendingRollouts:
+        """各ワーカーに全候補手のロールアウトを投げる (deadline は perf_counter 基準)"""
+        self.start()
+        if self._adjacency is None:
+            self._adjacency = tuple(tuple(s[5]) for s in sim.state)
+        snap = snapshot(sim)
+        commands = list(commands)
+        wall_deadline = time.time() + (deadline - time.perf_counter()) - RESULT_SLACK
+        futures = []
+        for _ in range(self.workers):
+            self._seed += 1
+            futures.append(self._pool.submit(_rollouts, snap, self._adjacency, team, commands, wall_deadline,
+                                             self._seed))
+        return PendingRollouts(futures, deadline)
+
+    def evaluate(self, sim, team, commands, deadline) -> dict:
+        return self.submit(sim, team, commands, deadline).collect()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
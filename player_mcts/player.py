@@ -0,0 +1,98 @@
+"""
+player.py - MCTS Player (時間制限つきの木探索)
+
+既存の戦略 (Kai5/Kai6/NewComer) を候補手とロールアウトに使い、
+ローカルシミュレータで先を読んで手を選ぶ。
+
+  - interval tick ごとに1回、今の盤面で探索して根で一番多く試した手を打つ
+  - その間の tick は毎tickロールアウト方策 (Kai6 の ADAPTIVE) の手を打つ
+    (予測した盤面での探索はしない。予測が外れると、外れた盤面の統計で手を選んでしまい
+    方策そのものより弱くなった)
+  - 決定した手の子を次の根にして、候補手は実際の盤面で作り直す (SearchTree.rebase)
+  - 1tickの持ち時間 (budget_ms) を超えない。iterations を指定すると
+    時間ではなく反復数で止める (結果を再現したい時用)
+  - workers > 0 なら、根の候補手ごとのロールアウトを常駐ワーカー (parallel.py) にも
+    同じ締め切りで回させて、結果を根の統計に足す
+"""
+import time
+
+from tcg.controller import Controller
+from .parallel import RolloutExecutor
+from .policy import NOOP, StrategyPolicy
+from .search import SearchTree
+from ..common.telemetry import make_telemetry
+from ..simulator.engine import Simulator
+
+# 持ち時間のうち探索に使う割合 (残りは GC の停止や最後の1反復のはみ出し用)
+SEARCH_SHARE = 0.8
+
+
+class MCTSPlayer(Controller):
+    def __init__(self, budget_ms=10.0, iterations=None, interval=10, depth=2, rollout_ticks=20, policy_every=5,
+                 max_candidates=5, workers=0):
+        super().__init__()
+        self.budget = budget_ms / 1000.0
+        self.iterations = iterations
+        self.interval = interval
+        self.depth = depth
+        self.rollout_ticks = rollout_ticks
+        self.policy_every = policy_every
+        self.policy = StrategyPolicy(max_candidates=max_candidates)
+        self.tree = None  # 最初のtickでチームが分かってから作る
+        self.step_count = 0
+        self.telemetry = make_telemetry("mcts")
+        self.executor = None
+        if workers and iterations is None:
+            # ワーカーは木を持たずに「候補手 → 木の深さ分 + ロールアウト」を1本で回す
+            self.executor = RolloutExecutor(workers, rollout_ticks=interval * depth + rollout_ticks,
+                                            policy_every=policy_every).warm()
+
+    def team_name(self) -> str:
+        return "MCTS"
+
+    def update(self, info) -> tuple[int, int, int]:
+        deadline = time.perf_counter() + self.budget * SEARCH_SHARE
+        team, state, moving_pawns, spawning_pawns, done = info
+        tick = self.step_count
+        self.step_count += 1
+        if done:
+            self.telemetry.export(step=self.step_count)
+            if self.executor is not None:
+                self.executor.shutdown()
+            return NOOP
+
+        if self.tree is None:
+            self.tree = SearchTree(team, self.policy, interval=self.interval, depth=self.depth,
+                                   rollout_ticks=self.rollout_ticks, policy_every=self.policy_every)
+        tree = self.tree
+        sim = Simulator.from_info(info, step=tick)
+        phase = tick % self.interval
+
+        if phase == 0:
+            # 決定: 今の盤面を根にして探索し、一番試した手を打って次の根へ
+            tree.rebase(sim)
+            if self.iterations:
+                tree.search(sim, iterations=self.iterations)
+            else:
+                self.search(sim, team, deadline)
+            command = tree.best()
+            tree.advance(command)
+            self.telemetry.gauge("search.iterations", tree.iterations)
+            self.telemetry.count("decision" if command != NOOP else "decision.noop")
+            return command
+
+        # 決定の間: 毎tickロールアウト方策で動く
+        command = self.policy.rollout_move(sim, team)
+        return command if command else NOOP
+
+    def search(self, sim, team, deadline):
+        """deadline まで探索する (ワーカーがいれば根の候補手のロールアウトも並列に回す)"""
+        tree = self.tree
+        pending = None
+        if self.executor is not None:
+            pending = self.executor.submit(sim, team, tree.expand(sim), deadline)
+        tree.search(sim, deadline=deadline)
+        if pending is not None:
+            stats = pending.collect()
+            tree.merge(stats)
+            self.telemetry.gauge("search.parallel_rollouts", sum(n for _, n in stats.values()))
@@ -0,0 +1,140 @@
+"""
+policy.py - MCTS の候補手 (prior) とロールアウト方策
+
+新しい評価関数は作らず、既存プレイヤーの戦略をそのまま使う。
+
+  - Kai6 の get_combat_move / get_battery_move / get_adaptive_move
+  - Kai5 の get_hive_mind_move (全体で1つの目標へ寄せる)
+  - NewComer の execute_bucket_brigade (一番危ない前線へのバケツリレー)
+  - 強化できる要塞の強化
+
+candidates() はこれらが出した手を重複なしで集めて prior を付ける (探索木の子になる)。
+ロールアウト方策の手 (何もしない手のこともある) には一番高い prior を付ける。
+rollout_move() は Kai6 の ADAPTIVE モードと同じ順番で1手だけ返す (ロールアウトと相手のモデル)。
+
+epsilon > 0 にすると、ロールアウトの手をその確率でランダムな移動に置き換える
+(方策が決定的なので、同じ手から何度ロールアウトしても同じ結果になるのを避ける。並列ロールアウト用)。
+
+戦略クラスは盤面ごとにキャッシュ (Kai6 の距離マップ、Kai5 の目標) を持つので、
+シミュレーション中の別々の盤面で使い回す前に毎回リセットする。
+"""
+import random
+
+from ..alternative_newcomer import NewComer
+from ..common.game_state import GameState
+from ..player_kai5.strategy import Strategy as HiveStrategy
+from ..player_kai6.strategy import Strategy as KaiStrategy
+
+NOOP = (0, 0, 0)
+
+# 戦略ごとの prior (探索でどれを先に試すか)。ロールアウト方策自身の手が一番上
+# (反復が少ないと prior の順で決まるので、その時は方策と同じ手を打つ)
+PRIOR_POLICY = 1.2
+PRIOR_COMBAT = 1.0
+PRIOR_HIVE = 0.8
+PRIOR_BRIGADE = 0.6
+PRIOR_BATTERY = 0.6
+PRIOR_ADAPTIVE = 0.5
+PRIOR_UPGRADE = 0.4
+PRIOR_NOOP = 0.3
+
+
+class StrategyPolicy:
+    def __init__(self, max_candidates=8, epsilon=0.0, rng=None):
+        self.max_candidates = max_candidates
+        self.epsilon = epsilon
+        self.rng = rng or random.Random()
+        self.graph = None
+        self.kai = KaiStrategy()
+        self.hive = HiveStrategy()
+        self.brigade = NewComer()
+
+    def view(self, sim, team) -> GameState:
+        """シミュレータの盤面を戦略に渡せる GameState にする (グラフは共有)"""
+        state = GameState(sim.state, team, sim.moving_pawns, sim.spawning_pawns, self.graph)
+        if self.graph is None:
+            self.graph = self.kai.graph = self.hive.graph = self.brigade.graph = state.graph
+        return state
+
+    def rollout_move(self, sim, team) -> tuple:
+        """Kai6 の ADAPTIVE モードと同じ順番で1手 (戦闘 → バッテリー → 拡張)"""
+        return self.rollout_moves(sim, (team,))[0]
+
+    def rollout_moves(self, sim, teams) -> list:
+        """同じ盤面で複数チームの rollout_move (盤面のビューと距離マップを共有する)"""
+        state = self.view(sim, teams[0])
+        kai = self.kai
+        kai.invalidate_distances()
+        moves = [self._adaptive(state, team) for team in teams]
+        if self.epsilon:
+            rng = self.rng
+            for i, team in enumerate(teams):
+                if rng.random() < self.epsilon:
+                    moves[i] = self._random_move(state, team)
+        return moves
+
+    def _random_move(self, state, team):
+        forts = state.forts(team)
+        if not forts:
+            return NOOP
+        fid = self.rng.choice(forts)
+        return 1, fid, self.rng.choice(state[fid][5])
+
+    def _adaptive(self, state, team):
+        enemy = 2 if team == 1 else 1
+        kai = self.kai
+        for fid in state.forts(team):
+            command = kai.get_combat_move(state, fid, team, enemy)
+            if command[0] != 0:
+                return command
+        command = kai.get_battery_move(state, team, enemy)
+        if command[0] != 0:
+            return command
+        return kai.get_adaptive_move(state, team, enemy)
+
+    def candidates(self, sim, team) -> list:
+        """[(command, prior), ...] を prior の高い順で返す (何もしない手を必ず含む)"""
+        state = self.view(sim, team)
+        enemy = 2 if team == 1 else 1
+        kai = self.kai
+        kai.invalidate_distances()
+        found = {}
+
+        def add(command, prior):
+            command = tuple(command)
+            if command[0] != 0 and found.get(command, 0) < prior:
+                found[command] = prior
+
+        policy_move = tuple(self._adaptive(state, team))
+        add(policy_move, PRIOR_POLICY)
+
+        my_forts = state.forts(team)
+        for fid in my_forts:
+            if kai.is_touching_real_enemy(state, fid, team, enemy):
+                add(kai.get_combat_move(state, fid, team, enemy), PRIOR_COMBAT)
+            elif kai.can_upgrade(state[fid]):
+                add((2, fid, 0), PRIOR_UPGRADE)
+
+        self.hive.target_fort = None
+        add(self.hive.get_hive_mind_move(state, state.moving_pawns, team, enemy), PRIOR_HIVE)
+        add(kai.get_battery_move(state, team, enemy), PRIOR_BATTERY)
+        add(kai.get_adaptive_move(state, team, enemy), PRIOR_ADAPTIVE)
+
+        # 予測で落ちる (足りない兵が一番多い) 自軍要塞へのバケツリレー
+        forecast = state.forecast()
+        worst, shortage = None, 0
+        for fid in my_forts:
+            needed = forecast.needed(fid)
+            if needed > shortage:
+                worst, shortage = fid, needed
+        if worst is not None:
+            moves = []
+            self.brigade.execute_bucket_brigade(worst, state, my_forts, moves, ignore_direct_neighbors=False)
+            moves.sort(reverse=True)
+            for _, cmd, src, dst in moves[:2]:
+                add((cmd, src, dst), PRIOR_BRIGADE)
+
+        ranked = sorted(found.items(), key=lambda item: -item[1])[:self.max_candidates - 1]
+        ranked.append((NOOP, PRIOR_POLICY if policy_move[0] == 0 else PRIOR_NOOP))
+        ranked.sort(key=lambda item: -item[1])
+        return ranked
@@ -0,0 +1,226 @@
+"""
+search.py - 時間制限つきのモンテカルロ木探索 (open-loop MCTS)
+
+木の節点は盤面ではなく「手の列」だけを持つ。反復のたびに根の盤面
+(Simulator) を複製して手を打ち直すので、
+
+  - 実際の盤面が予測とずれても、根を差し替えるだけで統計をそのまま使える
+  - 決定した手の子を次の根にすれば、前の探索の結果を次の決定に持ち越せる
+
+1つの節点 = interval tick 分。手を打ったあと残りの tick は両チームとも
+ロールアウト方策 (policy.rollout_move) で進める (相手は常にこの方策で動くとみなす)。
+葉からは rollout_ticks だけ方策で進めて、要塞数と兵力の差から勝ちやすさを見積もる。
+
+    tree = SearchTree(team, policy)
+    tree.rebase(sim)                  # 持ち越した根の候補手を実際の盤面で作り直す
+    tree.search(sim, deadline)        # deadline (perf_counter) まで反復する
+    command = tree.best()
+    tree.advance(command)             # 決定した手の子を次の根にする
+"""
+import math
+import time
+
+from .policy import NOOP
+from ..common.rules import MAX_LEVEL, upgrade_cost
+
+# レベルごとの、そこまでの強化に払った兵の合計
+INVESTED = [sum(upgrade_cost(lv) for lv in range(level)) for level in range(MAX_LEVEL + 1)]
+
+
+class Node:
+    __slots__ = ("command", "prior", "visits", "value", "children")
+
+    def __init__(self, command=NOOP, prior=1.0):
+        self.command = command
+        self.prior = prior
+        self.visits = 0
+        self.value = 0.0        # 勝ちやすさ (0〜1) の合計
+        self.children = None    # 展開前は None
+
+    @property
+    def mean(self) -> float:
+        return self.value / self.visits if self.visits else 0.5
+
+    def __repr__(self):
+        return f"Node({self.command}, n={self.visits}, q={self.mean:.3f}, p={self.prior})"
+
+
+class SearchTree:
+    def __init__(self, team, policy, interval=10, depth=3, rollout_ticks=40, policy_every=5, c_puct=1.5):
+        self.team = team
+        self.enemy = 2 if team == 1 else 1
+        self.policy = policy
+        self.interval = interval            # 1節点あたりの tick 数
+        self.depth = depth                  # 木で手を選ぶ深さ (これより先はロールアウト)
+        self.rollout_ticks = rollout_ticks
+        self.policy_every = policy_every    # ロールアウト方策を呼ぶ間隔 (tick)
+        self.c_puct = c_puct
+        self.root = Node()
+        self.iterations = 0                 # 最後の search() で統計に入れた反復数
+
+    # --- 探索 ---
+
+    def search(self, sim, deadline=None, iterations=None) -> int:
+        """sim (根の盤面) から deadline か iterations に達するまで反復する (返すのは統計に入れた反復の数)"""
+        count = 0
+        clock = time.perf_counter
+        while (iterations is None or count < iterations) and (deadline is None or clock() < deadline):
+            if self._iterate(sim.clone(), deadline):
+                count += 1
+        self.iterations = count
+        return count
+
+    def _iterate(self, sim, deadline) -> bool:
+        """
+        1反復 (選択・展開・ロールアウト・逆伝播)。統計に入れたら True
+
+        締め切りで途中までしか進められなかった反復は、評価が浅い盤面のものになるので
+        逆伝播しない (visits も数えない)。決着で止まった場合は勝ち負けが確定しているので入れる。
+        """
+        path = [self.root]
+        node = self.root
+        for _ in range(self.depth):
+            if node.children is None:
+                self._expand(node, sim)
+                child = node.children[0]
+            else:
+                child = self._select(node)
+            path.append(child)
+            if not self.play(sim, child.command, self.interval, deadline):
+                if sim.winner() is None:
+                    return False
+                break
+            node = child
+        else:
+            if not self.play(sim, NOOP, self.rollout_ticks, deadline) and sim.winner() is None:
+                return False
+
+        value = self.evaluate(sim)
+        for n in path:
+            n.visits += 1
+            n.value += value
+        return True
+
+    def _expand(self, node, sim):
+        node.children = [Node(command, prior) for command, prior in self.policy.candidates(sim, self.team)]
+
+    def expand(self, sim) -> list:
+        """根を展開して候補手を返す (展開済みならそのまま)"""
+        if self.root.children is None:
+            self._expand(self.root, sim)
+        return [child.command for child in self.root.children]
+
+    def rebase(self, sim):
+        """
+        根の候補手を sim (実際の盤面) で作り直す
+
+        持ち越した根の子は予測した盤面で展開したものなので、実際の盤面では
+        打てない・意味のない手が混ざる。今の候補手にある子は統計ごと残し、無い子は捨てる。
+        """
+        old = {child.command: child for child in self.root.children or ()}
+        children = []
+        for command, prior in self.policy.candidates(sim, self.team):
+            child = old.get(command)
+            if child is None:
+                child = Node(command, prior)
+            else:
+                child.prior = prior
+            children.append(child)
+        root = self.root
+        root.children = children
+        root.visits = sum(child.visits for child in children)
+        root.value = sum(child.value for child in children)
+
+    def merge(self, stats):
+        """外 (並列ロールアウトなど) で集めた {command: (勝ちやすさの合計, 回数)} を根の子に足す"""
+        root = self.root
+        for child in root.children or ():
+            value, visits = stats.get(child.command, (0.0, 0))
+            if visits:
+                child.visits += visits
+                child.value += value
+                root.visits += visits
+                root.value += value
+
+    def _select(self, node):
+        # PUCT: 平均 + c * prior * sqrt(N) / (1 + n)
+        scale = self.c_puct * math.sqrt(node.visits)
+        best, best_score = None, -1.0
+        for child in node.children:
+            score = child.mean + scale * child.prior / (1 + child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def play(self, sim, command, ticks, deadline) -> bool:
+        """自分の command を打ってから ticks 進める (時間切れ・決着なら途中で False)"""
+        policy = self.policy
+        team, enemy = self.team, self.enemy
+        every = self.policy_every
+        mine = command
+        for t in range(ticks):
+            theirs = None
+            if (sim.step_count % every) == 0:
+                if t > 0:
+                    mine, theirs = policy.rollout_moves(sim, (team, enemy))
+                else:
+                    theirs = policy.rollout_move(sim, enemy)
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return False
+                if sim.winner() is not None:
+                    return False
+            if team == 1:
+                sim.step(mine, theirs)
+            else:
+                sim.step(theirs, mine)
+            mine = None
+        return True
+
+    def evaluate(self, sim) -> float:
+        """自チームの勝ちやすさ (0〜1)。決着していれば 1/0、それ以外は要塞数と兵力 (強化分を含む) の差"""
+        winner = sim.winner()
+        if winner is not None:
+            return 1.0 if winner == self.team else 0.0 if winner else 0.5
+        # 強化に払った兵は生産力として残るので兵力に数え戻す (短い先読みで強化が損に見えないように)
+        material = [0, 0, 0]
+        forts = [0, 0, 0]
+        for s in sim.state:
+            forts[s[0]] += 1
+            material[s[0]] += s[3] + INVESTED[s[2]] + (upgrade_cost(s[2]) if s[4] > 0 else 0)
+        for p in sim.moving_pawns:
+            material[p[0]] += 1
+        for p in sim.spawning_pawns:
+            material[p[0]] += p[2]
+        team, enemy = self.team, self.enemy
+        diff = forts[team] - forts[enemy] + 0.05 * (material[team] - material[enemy])
+        return 1.0 / (1.0 + math.exp(-diff / 2.0))
+
+    # --- 決定と木の持ち越し ---
+
+    def best(self) -> tuple:
+        """根で一番多く試した手 (未探索なら何もしない)"""
+        if not self.root.children:
+            return NOOP
+        return max(self.root.children, key=lambda c: (c.visits, c.prior)).command
+
+    def advance(self, command):
+        """command を打ったとして、その子を次の根にする (無ければ新しい根)"""
+        for child in self.root.children or ():
+            if child.command == command:
+                self.root = child
+                return
+        self.root = Node()
+
+    def reset(self):
+        self.root = Node()
+
+    @property
+    def size(self) -> int:
+        """木の節点数"""
+        count, stack = 0, [self.root]
+        while stack:
+            node = stack.pop()
+            count += 1
+            if node.children:
+                stack.extend(node.children)
+        return count
@@ -0,0 +1,8 @@
+"""ML Player - FortressNet の方策と、複数試合をまとめて推論するバッチ処理."""
+
+from .batch import BatchedGames, BatchPolicy
+from .env import BatchedEnv
+from .model import FortressNet
+from .player import MLPlayer
+
+__all__ = ["BatchedEnv", "BatchedGames", "BatchPolicy", "FortressNet", "MLPlayer"]
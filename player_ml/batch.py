@@ -0,0 +1,131 @@
+"""
+batch.py - 複数試合の手を1回の forward でまとめて決める
+
+    policy = BatchPolicy(FortressNet.load())
+    commands = policy.decide(infos)             # infos の順にコマンド
+
+    games = BatchedGames(policy, [Kai6Player() for _ in range(64)], seeds=range(64))
+    results = games.run()                       # Match.run() と同じ形の dict のリスト
+
+BatchedGames は全試合を同じtickで進める。毎tick、まだ続いている試合の ML 側の info を集めて
+1回の forward で手を決め、各試合の MLPlayer (Controller) に渡してから update() を呼ぶ
+(エンジンから見ると普通の Controller と同じ)。
+"""
+import random
+
+import numpy as np
+
+from .features import FeatureBatch, decode
+from .model import FortressNet
+from .player import MLPlayer
+from ..simulator.board import new_board
+from ..simulator.engine import Simulator
+
+
+class BatchPolicy:
+    """
+    特徴量 → FortressNet → 合法手マスク → コマンド
+
+    temperature=0 なら一番ロジットの高い手、> 0 ならソフトマックスからサンプルする
+    (自己対戦で手をばらけさせたい時用)。
+    """
+
+    def __init__(self, model=None, capacity=256, temperature=0.0, seed=None):
+        self.model = model if model is not None else FortressNet.load()
+        self.features = FeatureBatch(capacity)
+        self.temperature = temperature
+        self.rng = np.random.default_rng(seed)
+        self.batches = 0
+        self.states = 0
+
+    def actions(self, infos) -> np.ndarray:
+        """infos の行動番号 (int の配列)"""
+        if not infos:
+            return np.zeros(0, dtype=np.int64)
+        return self.select(self.features.fill(infos), self.features.legal(infos))
+
+    def select(self, x, mask) -> np.ndarray:
+        """特徴量行列と合法手マスクから行動番号 (env.BatchedEnv からはこちらを直接使う)"""
+        logits = self.model.forward(x)
+        logits = np.where(mask, logits, -np.inf)
+        self.batches += 1
+        self.states += len(x)
+        if self.temperature <= 0:
+            return logits.argmax(axis=1)
+        z = logits / self.temperature
+        z -= z.max(axis=1, keepdims=True)
+        probs = np.exp(z)
+        probs /= probs.sum(axis=1, keepdims=True)
+        # 行ごとの累積確率と一様乱数で一括サンプル (丸め誤差で無効な手を引かないよう合計に合わせる)
+        cumulative = probs.cumsum(axis=1)
+        u = self.rng.random((len(x), 1)) * cumulative[:, -1:]
+        return (cumulative < u).sum(axis=1)
+
+    def decide(self, infos) -> list:
+        """infos の順にコマンド (cmd, src, dst) のリスト"""
+        return [decode(a, info[1]) for a, info in zip(self.actions(infos), infos)]
+
+
+class BatchedGames:
+    """
+    ML 側 (MLPlayer) 対 opponents[i] の試合を並べて同時に進める
+
+    ml_team は ML 側のチーム (1 or 2)。players を渡さなければ MLPlayer を試合数分作る
+    (どれも policy を共有するので、重みの読み込みは1回)。
+    """
+
+    def __init__(self, policy, opponents, seeds=None, max_steps=10000, jitter=0, ml_team=1, players=None):
+        self.policy = policy
+        self.opponents = list(opponents)
+        n = len(self.opponents)
+        self.seeds = list(seeds) if seeds is not None else list(range(n))
+        self.max_steps = max_steps
+        self.ml_team = ml_team
+        self.players = players if players is not None else [MLPlayer(policy=policy) for _ in range(n)]
+        self.sims = [Simulator(new_board(seed, jitter)) for seed in self.seeds]
+
+    def run(self) -> list:
+        random.seed(self.seeds[0] if self.seeds else 0)
+        ml_team = self.ml_team
+        other = 2 if ml_team == 1 else 1
+        sims = self.sims
+        results = [None] * len(sims)
+        active = list(range(len(sims)))
+        while active:
+            # ML 側: まだ続いている全試合を1バッチで
+            infos = [sims[i].info(ml_team) for i in active]
+            for i, command in zip(active, self.policy.decide(infos)):
+                self.players[i].pending = command
+
+            still = []
+            for i, info in zip(active, infos):
+                sim = sims[i]
+                mine = self.players[i].update(info)
+                theirs = sim.ask(self.opponents[i], other)
+                if ml_team == 1:
+                    sim.step(mine, theirs)
+                else:
+                    sim.step(theirs, mine)
+                winner = sim.winner()
+                if winner is None and sim.step_count < self.max_steps:
+                    still.append(i)
+                    continue
+                results[i] = self._finish(i, winner)
+            active = still
+        return results
+
+    def _finish(self, i, winner) -> dict:
+        sim = self.sims[i]
+        if winner is None:
+            winner = sim.judge()
+        ml_team = self.ml_team
+        other = 2 if ml_team == 1 else 1
+        self.players[i].update(sim.info(ml_team, True))
+        sim.ask(self.opponents[i], other, True)
+        return {
+            "winner": winner,
+            "steps": sim.step_count,
+            "forts": (sim.fort_count(1), sim.fort_count(2)),
+            "soldiers": (sim.soldiers(1), sim.soldiers(2)),
+            "seed": self.seeds[i],
+        }
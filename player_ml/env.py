@@ -0,0 +1,168 @@
+"""
+env.py - BatchedSimulator を gym 風に包んだ学習用の環境 (N試合を同時に)
+
+    env = BatchedEnv(1024, opponent=BatchPolicy(FortressNet.load(), temperature=1.0))
+    obs, mask = env.reset()                        # (N, FEATURE_DIM) float32, (N, ACTION_COUNT) bool
+    obs, mask, reward, done, info = env.step(actions)   # actions は (N,) の行動番号
+
+  - 特徴量・合法手・行動番号は features.py と同じ (1試合用の MLPlayer にそのまま使える重みになる)。
+    ただし Python のリストを経由せず、シミュレータの配列から直接まとめて作る
+  - 相手 (opponent) は None なら何もしない。BatchPolicy (select(x, mask) を持つもの) を渡すと
+    相手側の特徴量で1回推論して打たせる。自己対戦は step(actions, opponent_actions) で直接渡す
+  - 決着した試合 (か max_steps に達した試合) は reward を ±1 (引き分け 0) にして、その場で次の seed の盤面に戻す
+  - 返す obs / mask は毎回同じ配列を上書きするので、取っておくなら copy() すること
+"""
+import numpy as np
+
+from .features import (
+    ACTION_COUNT, FEATURE_DIM, FLIGHT_SCALE, FORT_FEATURES, FORTS, INCOMING_SCALE, MAX_NEIGHBORS, MOVE_BASE,
+    PAWN_SCALE, THREAT_SCALE, UPGRADE_BASE, UPGRADE_SCALE,
+)
+from ..common.rules import MAX_LEVEL, NO_UPGRADE
+from ..simulator.batched import COST_TABLE, BatchedSimulator
+from ..simulator.board import ADJACENCY
+
+# 行動番号の移動部分 (fid * MAX_NEIGHBORS + k) → 行き先 (無ければ -1)
+_MOVE_DST = np.full(FORTS * MAX_NEIGHBORS, -1, dtype=np.int64)
+for _fid, _neighbors in enumerate(ADJACENCY):
+    _k = min(len(_neighbors), MAX_NEIGHBORS)
+    _MOVE_DST[_fid * MAX_NEIGHBORS:_fid * MAX_NEIGHBORS + _k] = _neighbors[:_k]
+_MOVE_SRC = np.repeat(np.arange(FORTS), MAX_NEIGHBORS)
+
+
+def decode_actions(actions) -> np.ndarray:
+    """(N,) の行動番号 → (N, 3) のコマンド (features.decode をまとめてやる版)"""
+    actions = np.asarray(actions, dtype=np.int64)
+    commands = np.zeros((len(actions), 3), dtype=np.int64)
+    upgrade = (actions >= UPGRADE_BASE) & (actions < MOVE_BASE)
+    commands[upgrade, 0] = 2
+    commands[upgrade, 1] = actions[upgrade] - UPGRADE_BASE
+    move_index = np.clip(actions - MOVE_BASE, 0, len(_MOVE_DST) - 1)
+    move = (actions >= MOVE_BASE) & (actions < MOVE_BASE + len(_MOVE_DST)) & (_MOVE_DST[move_index] >= 0)
+    commands[move, 0] = 1
+    commands[move, 1] = _MOVE_SRC[move_index[move]]
+    commands[move, 2] = _MOVE_DST[move_index[move]]
+    return commands
+
+
+class BatchedEnv:
+    def __init__(self, n, ml_team=1, opponent=None, max_steps=10000, jitter=0, seed=0):
+        self.n = n
+        self.ml_team = ml_team
+        self.other = 2 if ml_team == 1 else 1
+        self.opponent = opponent
+        self.max_steps = max_steps
+        self.sim = BatchedSimulator(n, seeds=range(seed, seed + n), jitter=jitter)
+        self._next_seed = seed + n
+        self.obs = np.zeros((n, FEATURE_DIM), dtype=np.float32)
+        self.mask = np.zeros((n, ACTION_COUNT), dtype=bool)
+        self._other_obs = np.zeros_like(self.obs)
+        self._other_mask = np.zeros_like(self.mask)
+        # 集計
+        self.ticks = 0
+        self.games = 0
+        self.wins = 0
+
+    def reset(self):
+        self.sim.reset(seeds=np.arange(self._next_seed - self.n, self._next_seed))
+        return self.observe(self.ml_team, self.obs, self.mask)
+
+    # --- 観測 ---
+
+    def observe(self, team, obs=None, mask=None):
+        """team から見た特徴量と合法手 (features.encode / legal_actions と同じ値)"""
+        obs = self.obs if obs is None else obs
+        mask = self.mask if mask is None else mask
+        sim = self.sim
+        n = self.n
+        enemy = 2 if team == 1 else 1
+        owner, level, pawns, upgrade = sim.owner, sim.level, sim.pawns, sim.upgrade
+
+        forts = obs[:, :FORTS * FORT_FEATURES].reshape(n, FORTS, FORT_FEATURES)
+        mine = owner == team
+        forts[:, :, 0] = mine
+        forts[:, :, 1] = owner == enemy
+        forts[:, :, 2] = owner == 0
+        forts[:, :, 3] = level / MAX_LEVEL
+        forts[:, :, 4] = pawns / PAWN_SCALE
+        forts[:, :, 5] = np.where(upgrade > 0, upgrade / UPGRADE_SCALE, 0.0)
+
+        moving = sim.moving
+        size = n * FORTS
+        flight = obs[:, FORTS * FORT_FEATURES:]
+        if moving.size:
+            game = moving["game"]
+            key = game.astype(np.int64) * FORTS + moving["dst"]
+            kind = moving["kind"].astype(np.float64)
+            distance = np.maximum(1.0, 100.0 - moving["pos"].astype(np.float64))
+            ours = moving["team"] == team
+            theirs = moving["team"] == enemy
+            incoming = np.bincount(key[ours], weights=kind[ours], minlength=size)
+            forts[:, :, 6] = incoming.reshape(n, FORTS) / INCOMING_SCALE
+            incoming = np.bincount(key[theirs], weights=kind[theirs], minlength=size)
+            forts[:, :, 7] = incoming.reshape(n, FORTS) / INCOMING_SCALE
+            threat = np.bincount(key[theirs], weights=kind[theirs] * 10 / distance[theirs], minlength=size)
+            forts[:, :, 8] = threat.reshape(n, FORTS) / THREAT_SCALE
+            flight[:, 0] = np.bincount(game[ours], minlength=n) / FLIGHT_SCALE
+            flight[:, 1] = np.bincount(game[theirs], minlength=n) / FLIGHT_SCALE
+        else:
+            forts[:, :, 6:9] = 0.0
+            flight[:, 0:2] = 0.0
+        spawning = sim.spawning
+        if spawning.size:
+            game = spawning["game"]
+            count = spawning["count"].astype(np.float64)
+            ours = spawning["team"] == team
+            theirs = spawning["team"] == enemy
+            flight[:, 2] = np.bincount(game[ours], weights=count[ours], minlength=n) / FLIGHT_SCALE
+            flight[:, 3] = np.bincount(game[theirs], weights=count[theirs], minlength=n) / FLIGHT_SCALE
+        else:
+            flight[:, 2:4] = 0.0
+
+        # 合法手
+        mask[:] = False
+        mask[:, 0] = True
+        mask[:, UPGRADE_BASE:UPGRADE_BASE + FORTS] = (
+            mine & (level < MAX_LEVEL) & (upgrade == NO_UPGRADE) & (pawns >= COST_TABLE[level]))
+        can_send = np.repeat(mine & (pawns >= 2), MAX_NEIGHBORS, axis=1)
+        mask[:, MOVE_BASE:MOVE_BASE + len(_MOVE_DST)] = can_send & (_MOVE_DST >= 0)
+        return obs, mask
+
+    # --- 1tick ---
+
+    def step(self, actions, opponent_actions=None):
+        """
+        ML 側の行動番号 (N,) で全試合を1tick進める
+
+        戻り値 (obs, mask, reward, done, info)。info["winner"] は終わった試合の勝者 (続行中は -1)、
+        info["steps"] はその試合の長さ。終わった試合の obs はもう次の試合の最初の盤面。
+        """
+        sim = self.sim
+        if opponent_actions is None and self.opponent is not None:
+            x, mask = self.observe(self.other, self._other_obs, self._other_mask)
+            opponent_actions = self.opponent.select(x, mask)
+        mine = decode_actions(actions)
+        theirs = None if opponent_actions is None else decode_actions(opponent_actions)
+        if self.ml_team == 1:
+            sim.step(mine, theirs)
+        else:
+            sim.step(theirs, mine)
+        self.ticks += self.n
+
+        winner = sim.winner()
+        timeout = (winner < 0) & (sim.step_count >= self.max_steps)
+        if timeout.any():
+            winner = np.where(timeout, sim.judge(), winner)
+        done = winner >= 0
+        reward = np.where(done & (winner == self.ml_team), 1.0,
+                          np.where(done & (winner == self.other), -1.0, 0.0)).astype(np.float32)
+        steps = sim.step_count.copy()
+        if done.any():
+            games = np.flatnonzero(done)
+            self.games += len(games)
+            self.wins += int((winner[games] == self.ml_team).sum())
+            seeds = np.arange(self._next_seed, self._next_seed + len(games))
+            self._next_seed += len(games)
+            sim.reset(games, seeds)
+        obs, mask = self.observe(self.ml_team, self.obs, self.mask)
+        return obs, mask, reward, done, {"winner": np.where(done, winner, -1), "steps": steps}
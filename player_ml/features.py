@@ -0,0 +1,158 @@
+"""
+features.py - 複数試合の盤面を1つの特徴量行列 (float32) にまとめる
+
+README の MLPlayer は state_to_tensor で1盤面ずつテンソルを作っていたが、
+自己対戦や学習データ作りでは何百試合も同時に回すので、
+全試合分を最初に確保した (capacity, FEATURE_DIM) の float32 行列へ書き込む。
+
+  1行 = 12要塞 × FORT_FEATURES + 兵の集計 GLOBAL_FEATURES
+  要塞の特徴量は「自分から見た」値 (自軍/敵/中立) なので、チーム1でも2でも同じモデルが使える
+
+    features = FeatureBatch(capacity=256)
+    x = features.fill(infos)          # (len(infos), FEATURE_DIM) のビュー (次の fill で上書きされる)
+    mask = features.legal(infos)      # (len(infos), ACTION_COUNT) の bool
+
+行動の番号 (ACTION_COUNT = 64):
+  0                     何もしない
+  1 + fid               fid の強化
+  13 + fid * 4 + k      fid → neighbors[k] へ移動 (隣接は最大4)
+  61〜63                未使用 (常に無効)
+"""
+import numpy as np
+
+from ..common.pawns import PawnTable
+from ..common.rules import HARD_LIMITS, MAX_LEVEL, NO_UPGRADE, UPGRADE_TIME, upgrade_cost
+
+FORTS = 12
+MAX_NEIGHBORS = 4
+
+# 要塞ごと: 自軍, 敵, 中立, レベル, 兵数, 強化の残り, 向かっている自軍, 向かっている敵, 敵の脅威
+FORT_FEATURES = 9
+# 全体: 移動中の自軍/敵の数, 出撃待機の自軍/敵の数
+GLOBAL_FEATURES = 4
+FEATURE_DIM = FORTS * FORT_FEATURES + GLOBAL_FEATURES
+
+NOOP_ACTION = 0
+UPGRADE_BASE = 1
+MOVE_BASE = UPGRADE_BASE + FORTS
+ACTION_COUNT = 64
+
+NOOP = (0, 0, 0)
+
+# 正規化の目安
+PAWN_SCALE = float(HARD_LIMITS[MAX_LEVEL])
+UPGRADE_SCALE = float(max(UPGRADE_TIME))
+INCOMING_SCALE = 20.0
+THREAT_SCALE = 10.0
+FLIGHT_SCALE = 100.0
+
+
+def encode(info) -> list:
+    """1試合分の info を FEATURE_DIM 個の float のリストにする"""
+    team, state, moving_pawns, spawning_pawns, done = info
+    enemy = 2 if team == 1 else 1
+    table = PawnTable(moving_pawns, len(state))
+    mine_in = table.incoming(team)
+    enemy_in = table.incoming(enemy)
+    enemy_threat = table.threat(enemy)
+
+    row = []
+    for fid, s in enumerate(state):
+        owner = s[0]
+        upgrade = s[4]
+        row.append(1.0 if owner == team else 0.0)
+        row.append(1.0 if owner == enemy else 0.0)
+        row.append(1.0 if owner == 0 else 0.0)
+        row.append(s[2] / MAX_LEVEL)
+        row.append(s[3] / PAWN_SCALE)
+        row.append(upgrade / UPGRADE_SCALE if upgrade != NO_UPGRADE and upgrade > 0 else 0.0)
+        row.append(mine_in[fid] / INCOMING_SCALE)
+        row.append(enemy_in[fid] / INCOMING_SCALE)
+        row.append(enemy_threat[fid] / THREAT_SCALE)
+
+    moving_mine = moving_enemy = 0
+    for p in moving_pawns:
+        if p[0] == team:
+            moving_mine += 1
+        elif p[0] == enemy:
+            moving_enemy += 1
+    spawning_mine = spawning_enemy = 0
+    for p in spawning_pawns:
+        if p[0] == team:
+            spawning_mine += p[2]
+        elif p[0] == enemy:
+            spawning_enemy += p[2]
+    row.append(moving_mine / FLIGHT_SCALE)
+    row.append(moving_enemy / FLIGHT_SCALE)
+    row.append(spawning_mine / FLIGHT_SCALE)
+    row.append(spawning_enemy / FLIGHT_SCALE)
+    return row
+
+
+def legal_actions(info, out):
+    """out (ACTION_COUNT の bool 配列) に打てる行動を書き込む"""
+    team, state = info[0], info[1]
+    out[:] = False
+    out[NOOP_ACTION] = True
+    for fid, s in enumerate(state):
+        if s[0] != team:
+            continue
+        level = s[2]
+        if level < MAX_LEVEL and s[4] == NO_UPGRADE and s[3] >= upgrade_cost(level):
+            out[UPGRADE_BASE + fid] = True
+        if s[3] >= 2:
+            base = MOVE_BASE + fid * MAX_NEIGHBORS
+            out[base:base + min(len(s[5]), MAX_NEIGHBORS)] = True
+    return out
+
+
+def decode(action, state) -> tuple:
+    """行動の番号 → コマンド (cmd, src, dst)"""
+    action = int(action)
+    if action == NOOP_ACTION:
+        return NOOP
+    if action < MOVE_BASE:
+        return 2, action - UPGRADE_BASE, 0
+    fid, k = divmod(action - MOVE_BASE, MAX_NEIGHBORS)
+    if fid >= len(state) or k >= len(state[fid][5]):
+        return NOOP
+    return 1, fid, state[fid][5][k]
+
+
+class FeatureBatch:
+    """
+    最初に確保した特徴量行列と合法手マスク
+
+    fill() / legal() は毎回同じ配列に書き込んで先頭 len(infos) 行のビューを返す。
+    capacity を超える数を渡された時だけ確保し直す。
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = 0
+        self.matrix = None
+        self.mask = None
+        self._reserve(capacity)
+
+    def _reserve(self, n):
+        if n <= self.capacity:
+            return
+        self.capacity = max(n, self.capacity * 2)
+        self.matrix = np.zeros((self.capacity, FEATURE_DIM), dtype=np.float32)
+        self.mask = np.zeros((self.capacity, ACTION_COUNT), dtype=bool)
+
+    def fill(self, infos) -> np.ndarray:
+        n = len(infos)
+        self._reserve(n)
+        out = self.matrix[:n]
+        if n:
+            # 行ごとに numpy へ書くより、まとめて1回で変換した方が速い
+            out[:] = [encode(info) for info in infos]
+        return out
+
+    def legal(self, infos) -> np.ndarray:
+        n = len(infos)
+        self._reserve(n)
+        mask = self.mask
+        for i, info in enumerate(infos):
+            legal_actions(info, mask[i])
+        return mask[:n]
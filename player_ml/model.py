@@ -0,0 +1,54 @@
+"""
+model.py - FortressNet (numpy だけで推論する MLP)
+
+README の FortressNet (全結合 → ReLU → 全結合 → ReLU → 64コマンド) と同じ形。
+入力は features.FEATURE_DIM。推論はCPUでバッチ全体を1回の行列積で済ませる。
+
+重みは .npz (W1, b1, W2, b2, W3, b3) で読み書きする。ファイルが無ければ seed から
+初期化した (学習していない) 重みになる。PyTorch で学習した場合は
+{name: tensor.numpy() for ...} を np.savez で保存すれば読める。
+"""
+import os
+
+import numpy as np
+
+from .features import ACTION_COUNT, FEATURE_DIM
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "model.npz")
+
+
+class FortressNet:
+    LAYERS = ("1", "2", "3")
+
+    def __init__(self, hidden=(128, 64), input_dim=FEATURE_DIM, actions=ACTION_COUNT, seed=0):
+        sizes = (input_dim,) + tuple(hidden) + (actions,)
+        rng = np.random.default_rng(seed)
+        self.params = {}
+        for name, n_in, n_out in zip(self.LAYERS, sizes[:-1], sizes[1:]):
+            # He 初期化 (ReLU 用)
+            self.params["W" + name] = (rng.standard_normal((n_in, n_out)) * np.sqrt(2.0 / n_in)).astype(np.float32)
+            self.params["b" + name] = np.zeros(n_out, dtype=np.float32)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH, seed=0):
+        """path があれば読み込み、無ければ初期化したままのモデルを返す"""
+        if path and os.path.exists(path):
+            with np.load(path) as data:
+                params = {key: data[key].astype(np.float32) for key in data.files}
+            hidden = tuple(params["W" + name].shape[1] for name in cls.LAYERS[:-1])
+            model = cls(hidden, params["W1"].shape[0], params["W3"].shape[1], seed)
+            model.params.update(params)
+            return model
+        return cls(seed=seed)
+
+    def save(self, path=DEFAULT_PATH):
+        np.savez(path, **self.params)
+
+    def forward(self, x) -> np.ndarray:
+        """(N, input_dim) → (N, actions) のロジット"""
+        p = self.params
+        h = np.maximum(x @ p["W1"] + p["b1"], 0.0)
+        h = np.maximum(h @ p["W2"] + p["b2"], 0.0)
+        return h @ p["W3"] + p["b3"]
+
+    __call__ = forward
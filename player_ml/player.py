@@ -0,0 +1,34 @@
+"""
+player.py - ML Player (FortressNet の方策で手を選ぶ)
+
+1試合だけで使う時は、毎tick自分の info を1行のバッチにして推論する。
+BatchedGames から使う時は、バッチで決めた手が pending に入っているのでそれを返す。
+"""
+from tcg.controller import Controller
+from .features import NOOP
+
+
+class MLPlayer(Controller):
+    def __init__(self, model_path=None, policy=None, temperature=0.0):
+        super().__init__()
+        if policy is None:
+            # batch.py は player.py を import するので、ここで遅れて読む
+            from .batch import BatchPolicy
+            from .model import DEFAULT_PATH, FortressNet
+            policy = BatchPolicy(FortressNet.load(model_path or DEFAULT_PATH), capacity=1,
+                                 temperature=temperature)
+        self.policy = policy
+        self.pending = None  # バッチで決めた次の手
+
+    def team_name(self) -> str:
+        return "ML"
+
+    def update(self, info) -> tuple[int, int, int]:
+        if info[4]:
+            self.pending = None
+            return NOOP
+        command = self.pending
+        if command is None:
+            command = self.policy.decide([info])[0]
+        self.pending = None
+        return command
@@ -0,0 +1,6 @@
+"""ローカル対戦シミュレータ - 外部エンジン無しでプレイヤーを対戦・評価する."""
+
+from .board import new_board
+from .engine import Match, Simulator, run_match
+
+__all__ = ["Match", "Simulator", "new_board", "run_match"]
@@ -0,0 +1,342 @@
+"""
+batched.py - N試合を numpy の配列でまとめて進めるシミュレータ (自己対戦・学習データ用)
+
+engine.Simulator と同じルールを、試合をまたいだ列データで1tickずつ進める。
+
+  要塞: owner / kind / level / pawns / upgrade / production   それぞれ (N, 12) の配列
+  兵:   moving (game, team, kind, src, dst, pos) と spawning (game, team, kind, count, src, dst)
+        の列データ (全試合分を1つの列に入れ、試合の中では追加した順を保つ)
+
+    sim = BatchedSimulator(1024)
+    sim.step(commands1, commands2)      # commands は (N, 3) の int 配列 (cmd, src, dst)。None なら何もしない
+    sim.winner()                        # (N,) 決着していれば 1/2 (両者全滅は 0)、続行中は -1
+    sim.reset(games)                    # 終わった試合だけ初期盤面に戻す
+    sim.info(g, team)                   # 試合 g を Controller に渡す info の形にする (既存プレイヤーとの対戦・検証用)
+
+同じコマンドを渡せば engine.Simulator と同じ盤面になる (異なるチームの兵が
+同じtickに同じ要塞へ着いた時だけ、その要塞を元のエンジンと同じ順番で1体ずつ処理する)。
+numpy が必要。
+"""
+import numpy as np
+
+from ..common.rules import (
+    HARD_LIMITS, MAX_LEVEL, NO_UPGRADE, PAWN_SPEED, PRODUCTION_INTERVAL,
+    SPAWN_INTERVAL, UPGRADE_TIME, upgrade_cost,
+)
+from .board import ADJACENCY, new_board
+from .engine import Simulator
+
+FORTS = len(ADJACENCY)
+MAX_NEIGHBORS = max(len(n) for n in ADJACENCY)
+
+# 隣接表 (足りない所は -1)
+NEIGHBORS = np.full((FORTS, MAX_NEIGHBORS), -1, dtype=np.int64)
+for _fid, _neighbors in enumerate(ADJACENCY):
+    NEIGHBORS[_fid, :len(_neighbors)] = _neighbors
+
+# レベルで引く表
+LIMIT_TABLE = np.array(HARD_LIMITS, dtype=np.int32)
+INTERVAL_TABLE = np.array(PRODUCTION_INTERVAL, dtype=np.int32)
+UPGRADE_TIME_TABLE = np.array(UPGRADE_TIME, dtype=np.int32)
+COST_TABLE = np.array([upgrade_cost(level) for level in range(MAX_LEVEL + 1)], dtype=np.int32)
+
+MOVING_FIELDS = (("game", np.int32), ("team", np.int8), ("kind", np.int8),
+                 ("src", np.int8), ("dst", np.int8), ("pos", np.float32))
+SPAWNING_FIELDS = (("game", np.int32), ("team", np.int8), ("kind", np.int8),
+                   ("count", np.int32), ("src", np.int8), ("dst", np.int8))
+
+
+class PawnColumns:
+    """
+    全試合の兵の列データ
+
+    追加は末尾に、削除は keep() でまとめて詰めるので、同じ試合の中の順番は
+    engine.Simulator のリストと同じになる。容量が足りなくなったら倍に広げる。
+    """
+
+    def __init__(self, fields, capacity=1024):
+        self.fields = fields
+        self.size = 0
+        self.capacity = capacity
+        self.data = {name: np.zeros(capacity, dtype=dtype) for name, dtype in fields}
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.data[name][:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def append(self, **columns):
+        n = len(columns["game"])
+        if not n:
+            return
+        end = self.size + n
+        if end > self.capacity:
+            self.capacity = max(end, self.capacity * 2)
+            for name, dtype in self.fields:
+                grown = np.zeros(self.capacity, dtype=dtype)
+                grown[:self.size] = self.data[name][:self.size]
+                self.data[name] = grown
+        for name, _ in self.fields:
+            self.data[name][self.size:end] = columns[name]
+        self.size = end
+
+    def keep(self, mask):
+        """mask が True の行だけ (順番を保って) 残す"""
+        n = int(mask.sum())
+        if n == self.size:
+            return
+        for name, _ in self.fields:
+            column = self.data[name]
+            column[:n] = column[:self.size][mask]
+        self.size = n
+
+
+class BatchedSimulator:
+    def __init__(self, n, seeds=None, jitter=0, capacity=None):
+        self.n = n
+        self.jitter = jitter
+        self.seeds = np.array(seeds if seeds is not None else range(n), dtype=np.int64)
+        self.owner = np.zeros((n, FORTS), dtype=np.int8)
+        self.kind = np.zeros((n, FORTS), dtype=np.int8)
+        self.level = np.zeros((n, FORTS), dtype=np.int8)
+        self.pawns = np.zeros((n, FORTS), dtype=np.int32)
+        self.upgrade = np.zeros((n, FORTS), dtype=np.int32)
+        self.production = np.zeros((n, FORTS), dtype=np.int32)
+        self.step_count = np.zeros(n, dtype=np.int64)
+        capacity = capacity or n * 64
+        self.moving = PawnColumns(MOVING_FIELDS, capacity)
+        self.spawning = PawnColumns(SPAWNING_FIELDS, max(16, capacity // 8))
+        self._games = np.arange(n)
+        self._boards = {}
+        self.reset()
+
+    # --- 初期化 ---
+
+    def _board(self, seed):
+        key = seed if self.jitter else 0   # jitter 無しなら盤面は seed によらず同じ
+        board = self._boards.get(key)
+        if board is None:
+            rows = new_board(seed, self.jitter)
+            board = np.array([r[:5] for r in rows], dtype=np.int32).T
+            if len(self._boards) < 4096:
+                self._boards[key] = board
+        return board
+
+    def reset(self, games=None, seeds=None):
+        """games (None なら全部) を初期盤面に戻し、その試合の兵を消す"""
+        games = self._games if games is None else np.asarray(games, dtype=np.int64)
+        if seeds is not None:
+            self.seeds[games] = seeds
+        for g in games:
+            owner, kind, level, pawns, upgrade = self._board(int(self.seeds[g]))
+            self.owner[g] = owner
+            self.kind[g] = kind
+            self.level[g] = level
+            self.pawns[g] = pawns
+            self.upgrade[g] = upgrade
+        self.production[games] = 0
+        self.step_count[games] = 0
+        if len(games) == self.n:
+            self.moving.size = self.spawning.size = 0
+        else:
+            cleared = np.zeros(self.n, dtype=bool)
+            cleared[games] = True
+            self.moving.keep(~cleared[self.moving["game"]])
+            self.spawning.keep(~cleared[self.spawning["game"]])
+
+    # --- コマンド ---
+
+    def apply(self, team, commands):
+        """
+        全試合に team のコマンド (N, 3) を適用する。無効なコマンドは無視する
+
+        team は int か (N,) の配列 (試合ごとに先に動くチームが違う時用)。
+        """
+        commands = np.asarray(commands, dtype=np.int64)
+        team = np.broadcast_to(np.asarray(team, dtype=np.int8), (self.n,))
+        cmd, src, dst = commands[:, 0], commands[:, 1], commands[:, 2]
+        games = self._games
+        in_range = (src >= 0) & (src < FORTS)
+        src = np.where(in_range, src, 0)
+        ok = (cmd != 0) & in_range & (self.owner[games, src] == team)
+
+        move = ok & (cmd == 1)
+        if move.any():
+            g, s, d, t = games[move], src[move], dst[move], team[move]
+            sent = self.pawns[g, s] // 2
+            valid = (NEIGHBORS[s] == d[:, None]).any(axis=1) & (sent >= 1)
+            g, s, d, t, sent = g[valid], s[valid], d[valid], t[valid], sent[valid]
+            self.pawns[g, s] -= sent
+            self.spawning.append(game=g, team=t, kind=self.kind[g, s], count=sent, src=s, dst=d)
+
+        up = ok & (cmd == 2)
+        if up.any():
+            g, s = games[up], src[up]
+            level = self.level[g, s]
+            cost = COST_TABLE[level]
+            valid = (level < MAX_LEVEL) & (self.upgrade[g, s] == NO_UPGRADE) & (self.pawns[g, s] >= cost)
+            g, s, level, cost = g[valid], s[valid], level[valid], cost[valid]
+            self.pawns[g, s] -= cost
+            self.upgrade[g, s] = UPGRADE_TIME_TABLE[level]
+
+    # --- 1tick進める ---
+
+    def advance(self):
+        self.step_count += 1
+        owner, level, pawns = self.owner, self.level, self.pawns
+        upgrade, production = self.upgrade, self.production
+
+        # 強化・生産
+        upgrading = upgrade > 0
+        upgrade[upgrading] -= 1
+        finished = upgrading & (upgrade <= 0)
+        if finished.any():
+            level[finished] = np.minimum(level[finished] + 1, MAX_LEVEL)
+            upgrade[finished] = NO_UPGRADE
+        owned = owner != 0
+        growing = owned & (pawns < LIMIT_TABLE[level])
+        production[growing] += 1
+        ready = growing & (production >= INTERVAL_TABLE[level])
+        production[ready] = 0
+        pawns[ready] += 1
+        production[owned & ~growing] = 0
+
+        # 出撃
+        spawning = self.spawning
+        if spawning.size:
+            sp_game = spawning["game"]
+            due = (self.step_count[sp_game] % SPAWN_INTERVAL) == 0
+            if due.any():
+                sp_team, sp_src = spawning["team"], spawning["src"]
+                lost = due & (owner[sp_game, sp_src] != sp_team)   # 出撃元を失ったら残りは消える
+                launch = due & ~lost
+                if launch.any():
+                    self.moving.append(game=sp_game[launch], team=sp_team[launch], kind=spawning["kind"][launch],
+                                       src=sp_src[launch], dst=spawning["dst"][launch],
+                                       pos=np.zeros(int(launch.sum()), dtype=np.float32))
+                    spawning["count"][launch] -= 1
+                spawning.keep(~lost & (spawning["count"] > 0))
+
+        # 移動・到着
+        moving = self.moving
+        if moving.size:
+            pos = moving["pos"]
+            pos += PAWN_SPEED
+            arrived = pos >= 100.0
+            if arrived.any():
+                self._arrive(moving["game"][arrived], moving["team"][arrived], moving["dst"][arrived])
+                moving.keep(~arrived)
+
+    def _arrive(self, games, teams, dsts):
+        """着いた兵 (moving の順) を要塞に反映する"""
+        owner = self.owner.reshape(-1)
+        pawns = self.pawns.reshape(-1)
+        upgrade = self.upgrade.reshape(-1)
+        production = self.production.reshape(-1)
+        key = games.astype(np.int64) * FORTS + dsts
+        size = self.n * FORTS
+        counts = [None,
+                  np.bincount(key[teams == 1], minlength=size),
+                  np.bincount(key[teams == 2], minlength=size)]
+        mixed = (counts[1] > 0) & (counts[2] > 0)
+
+        # 1チームだけが着いた要塞: k体まとめて (味方なら +k、敵なら守備兵を減らし、足りなければ占領)
+        for team in (1, 2):
+            k = counts[team]
+            target = np.flatnonzero((k > 0) & ~mixed)
+            if not len(target):
+                continue
+            k = k[target]
+            current = pawns[target]
+            friendly = owner[target] == team
+            captured = ~friendly & (k > current)
+            pawns[target] = np.where(friendly, current + k, np.where(captured, k - current, current - k))
+            taken = target[captured]
+            owner[taken] = team
+            upgrade[taken] = NO_UPGRADE
+            production[taken] = 0
+
+        # 両チームが同じtickに着いた要塞: 元のエンジンと同じく1体ずつ順番に
+        if mixed.any():
+            for fort, team in zip(key[mixed[key]].tolist(), teams[mixed[key]].tolist()):
+                if owner[fort] == team:
+                    pawns[fort] += 1
+                elif pawns[fort] > 0:
+                    pawns[fort] -= 1
+                else:
+                    owner[fort] = team
+                    pawns[fort] = 1
+                    upgrade[fort] = NO_UPGRADE
+                    production[fort] = 0
+
+    def step(self, commands1=None, commands2=None):
+        """両チームのコマンドを適用して1tick進める (適用順は試合ごとに step_count の偶奇で入れ替える)"""
+        if commands1 is not None or commands2 is not None:
+            noop = np.zeros((self.n, 3), dtype=np.int64)
+            c1 = noop if commands1 is None else np.asarray(commands1, dtype=np.int64)
+            c2 = noop if commands2 is None else np.asarray(commands2, dtype=np.int64)
+            even = (self.step_count % 2 == 0)
+            first = np.where(even, 1, 2).astype(np.int8)
+            self.apply(first, np.where(even[:, None], c1, c2))
+            self.apply(3 - first, np.where(even[:, None], c2, c1))
+        self.advance()
+
+    # --- 勝敗 ---
+
+    def _pawn_presence(self, team) -> np.ndarray:
+        present = np.zeros(self.n, dtype=bool)
+        for pool in (self.moving, self.spawning):
+            if pool.size:
+                present[pool["game"][pool["team"] == team]] = True
+        return present
+
+    def alive(self, team) -> np.ndarray:
+        return (self.owner == team).any(axis=1) | self._pawn_presence(team)
+
+    def soldiers(self, team) -> np.ndarray:
+        total = np.where(self.owner == team, self.pawns, 0).sum(axis=1)
+        moving, spawning = self.moving, self.spawning
+        if moving.size:
+            total += np.bincount(moving["game"][moving["team"] == team], minlength=self.n)
+        if spawning.size:
+            mine = spawning["team"] == team
+            total += np.bincount(spawning["game"][mine], weights=spawning["count"][mine],
+                                 minlength=self.n).astype(total.dtype)
+        return total
+
+    def fort_count(self, team) -> np.ndarray:
+        return (self.owner == team).sum(axis=1)
+
+    def winner(self) -> np.ndarray:
+        """試合ごとに、決着していれば勝者 (1/2)、両者全滅なら 0、続行中なら -1"""
+        alive1, alive2 = self.alive(1), self.alive(2)
+        return np.select([alive1 & alive2, alive1, alive2], [-1, 1, 2], 0)
+
+    def judge(self) -> np.ndarray:
+        """打ち切り時の判定: 要塞数 → 総兵力。同じなら引き分け (0)"""
+        f1, f2 = self.fort_count(1), self.fort_count(2)
+        s1, s2 = self.soldiers(1), self.soldiers(2)
+        return np.select([f1 > f2, f1 < f2, s1 > s2, s1 < s2], [1, 2, 1, 2], 0)
+
+    # --- 1試合だけ取り出す ---
+
+    def info(self, g, team, done=False):
+        """試合 g を Controller.update() に渡す info にする (毎回新しいリストを作る)"""
+        sim = self.to_simulator(g)
+        return sim.info(team, done)
+
+    def to_simulator(self, g) -> Simulator:
+        state = [[int(self.owner[g, i]), int(self.kind[g, i]), int(self.level[g, i]), int(self.pawns[g, i]),
+                  int(self.upgrade[g, i]), list(ADJACENCY[i])] for i in range(FORTS)]
+        moving, spawning = self.moving, self.spawning
+        m = moving["game"] == g
+        moving_pawns = [[int(t), int(k), int(s), int(d), float(p)]
+                        for t, k, s, d, p in zip(moving["team"][m], moving["kind"][m], moving["src"][m],
+                                                 moving["dst"][m], moving["pos"][m])]
+        m = spawning["game"] == g
+        spawning_pawns = [[int(t), int(k), int(c), int(s), int(d)]
+                          for t, k, c, s, d in zip(spawning["team"][m], spawning["kind"][m], spawning["count"][m],
+                                                   spawning["src"][m], spawning["dst"][m])]
+        return Simulator(state, moving_pawns, spawning_pawns, int(self.step_count[g]),
+                         [int(x) for x in self.production[g]])
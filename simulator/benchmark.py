@@ -0,0 +1,279 @@
+"""
+benchmark.py - 各プレイヤーの update() 1回あたりの処理時間を測る
+
+エンジンは毎フレーム update() を呼ぶので、平均より最悪値が大事。
+同じ info の列 (対戦の記録 + ランダム盤面) を全プレイヤーに流して
+p50 / p99 / max のレイテンシと、1tickあたりのメモリ確保量を出す。
+
+    python -m tcg.players.simulator.benchmark                 # 計測してベースラインと比較
+    python -m tcg.players.simulator.benchmark --save          # ベースラインを更新
+
+ベースラインは JSON で保存するので、コミットしておけば回帰が diff で見える。
+プレイヤーや common/ の処理の重さが変わるコミットでは --save したベースラインも一緒にコミットし、
+増えた分はコミットメッセージに理由を書く (黙って REGRESSION のまま残さない)。
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from .board import ADJACENCY
+from .engine import Match, mirror_info, wants_team_one_view
+from .players import PLAYERS, make_player
+from .replay import REPLAY_SUFFIX, Replay
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "latency_baseline.json")
+
+# ベースラインから何割遅くなったら回帰として印を付けるか
+REGRESSION_RATIO = 1.25
+
+
+# --- 入力 (info の列) ---
+
+class _Recorder:
+    """update() に来た info を複製して貯める"""
+
+    def __init__(self, player, frames):
+        self.player = player
+        self.frames = frames
+        self.team_one_view = wants_team_one_view(player)
+
+    def update(self, info):
+        self.frames.append(copy_info(info))
+        return self.player.update(info)
+
+
+def copy_info(info):
+    team, state, moving_pawns, spawning_pawns, done = info
+    return (team,
+            [[s[0], s[1], s[2], s[3], s[4], list(s[5])] for s in state],
+            [list(p) for p in moving_pawns],
+            [list(p) for p in spawning_pawns],
+            done)
+
+
+def record_frames(player1="machined", player2="kai6", seed=0, max_steps=3000) -> list:
+    """2人を対戦させて、両チームが受け取った info を順に返す"""
+    frames = []
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        Match(_Recorder(make_player(player1), frames), _Recorder(make_player(player2), frames),
+              seed=seed, max_steps=max_steps).run()
+    # 最後の done=True は計測から外す
+    return [f for f in frames if not f[4]]
+
+
+def synthetic_frames(count=500, seed=0) -> list:
+    """実戦では出にくい盤面 (兵が多い・移動中が多い) も含むランダムな info"""
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        state = [[rng.choice((0, 1, 2)), 1, rng.randint(0, 5), rng.randint(0, 60),
+                  rng.choice((-1, -1, -1, rng.randint(1, 100))), list(ADJACENCY[i])]
+                 for i in range(len(ADJACENCY))]
+        moving = [[rng.choice((1, 2)), 1, a, rng.choice(ADJACENCY[a]), rng.uniform(0, 100)]
+                  for a in rng.choices(range(len(ADJACENCY)), k=rng.randint(0, 40))]
+        spawning = [[rng.choice((1, 2)), 1, rng.randint(1, 25), a, rng.choice(ADJACENCY[a])]
+                    for a in rng.sample(range(len(ADJACENCY)), rng.randint(0, 6))]
+        frames.append((rng.choice((1, 2)), state, moving, spawning, False))
+    return frames
+
+
+def save_frames(path, frames):
+    with open(path, "w", encoding="utf-8") as f:
+        for team, state, moving_pawns, spawning_pawns, done in frames:
+            f.write(json.dumps([team, state, moving_pawns, spawning_pawns, done]) + "\n")
+
+
+def load_frames(path) -> list:
+    """JSON lines か、replay.py の記録ファイル (.tcgr) から info の列を読む"""
+    if path.endswith(REPLAY_SUFFIX):
+        return [info for info, _ in Replay(path) if not info[4]]
+    with open(path, encoding="utf-8") as f:
+        return [tuple(json.loads(line)) for line in f if line.strip()]
+
+
+# --- 計測 ---
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _split_by_team(frames):
+    # プレイヤーは1インスタンス1チームなので、チームごとに別インスタンスで流す
+    return [[f for f in frames if f[0] == team] for team in (1, 2)]
+
+
+def _views(player, frames) -> list:
+    """player に渡す info の複製 (チーム1 の盤面しか扱えないプレイヤーにはチーム2 の分を反転して)"""
+    if wants_team_one_view(player):
+        return [mirror_info(f) if f[0] == 2 else copy_info(f) for f in frames]
+    return [copy_info(f) for f in frames]
+
+
+def measure_latency(spec, frames, warmup=20) -> dict:
+    """update() の時間 (マイクロ秒) を1tickずつ測る"""
+    samples = []
+    perf_counter_ns = time.perf_counter_ns
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        for team_frames in _split_by_team(frames):
+            if not team_frames:
+                continue
+            player = make_player(spec)
+            team_frames = _views(player, team_frames)
+            for info in team_frames[:warmup]:
+                player.update(info)
+            for info in team_frames[warmup:]:
+                start = perf_counter_ns()
+                player.update(info)
+                samples.append((perf_counter_ns() - start) / 1000.0)
+    samples.sort()
+    return {
+        "ticks": len(samples),
+        "p50_us": round(percentile(samples, 50), 1),
+        "p99_us": round(percentile(samples, 99), 1),
+        "max_us": round(samples[-1], 1) if samples else 0.0,
+        "mean_us": round(sum(samples) / len(samples), 1) if samples else 0.0,
+    }
+
+
+def measure_allocations(spec, frames, limit=300) -> dict:
+    """
+    1tickあたりのメモリ確保量 (KiB)
+
+    tracemalloc は遅いので時間の計測とは別に回す。peak は update() 中に
+    一時的に確保した分も含み、retained は呼び出し後も残った分 (キャッシュ等)。
+    """
+    peaks = []
+    retained = []
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        tracemalloc.start()
+        try:
+            for team_frames in _split_by_team(frames):
+                player = make_player(spec)
+                for info in _views(player, team_frames[:limit]):
+                    before = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                    player.update(info)
+                    current, peak = tracemalloc.get_traced_memory()
+                    peaks.append(max(0, peak - before))
+                    retained.append(current - before)
+        finally:
+            tracemalloc.stop()
+    if not peaks:
+        return {"alloc_kib": 0.0, "retained_kib": 0.0}
+    return {
+        "alloc_kib": round(sum(peaks) / len(peaks) / 1024.0, 2),
+        "retained_kib": round(sum(retained) / len(retained) / 1024.0, 3),
+    }
+
+
+def run_benchmark(players, frames, allocations=True) -> dict:
+    results = {}
+    for spec in players:
+        row = measure_latency(spec, frames)
+        if allocations:
+            row.update(measure_allocations(spec, frames))
+        results[spec] = row
+        print(f"  {spec:<14} p50={row['p50_us']:8.1f}us p99={row['p99_us']:8.1f}us "
+              f"max={row['max_us']:9.1f}us", file=sys.stderr)
+    return results
+
+
+# --- ベースライン ---
+
+def load_baseline(path) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results, baseline, ratio=REGRESSION_RATIO) -> list:
+    """
+    ベースラインより ratio 倍以上遅い (重い) 項目を返す
+
+    max は1回のGCやOSの割り込みで大きく振れるので判定には使わない (表示だけ)。
+    """
+    regressions = []
+    for spec, row in results.items():
+        base = baseline.get(spec)
+        if not base:
+            continue
+        for key in ("p50_us", "p99_us", "alloc_kib"):
+            if key in row and base.get(key) and row[key] > base[key] * ratio:
+                regressions.append((spec, key, base[key], row[key]))
+    return regressions
+
+
+def print_report(results, baseline):
+    keys = ("p50_us", "p99_us", "max_us", "alloc_kib")
+    print(f"{'player':<14}" + "".join(f"{k:>22}" for k in keys))
+    for spec, row in results.items():
+        base = baseline.get(spec, {})
+        cells = []
+        for k in keys:
+            value = row.get(k)
+            if value is None:
+                cells.append(f"{'-':>22}")
+            elif base.get(k):
+                cells.append(f"{value:>12.1f} ({(value / base[k] - 1) * 100:+6.1f}%)")
+            else:
+                cells.append(f"{value:>22.1f}")
+        print(f"{spec:<14}" + "".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="update() のレイテンシ計測")
+    parser.add_argument("--players", nargs="+", default=list(PLAYERS))
+    parser.add_argument("--frames", help="info の列 (JSON lines か .tcgr)。省略時は対戦記録 + ランダム盤面")
+    parser.add_argument("--record", nargs=2, default=["machined", "kai6"], metavar=("P1", "P2"),
+                        help="記録に使う対戦カード")
+    parser.add_argument("--steps", type=int, default=3000, help="記録する対戦の長さ")
+    parser.add_argument("--synthetic", type=int, default=500, help="ランダム盤面の数")
+    parser.add_argument("--dump-frames", help="使った info の列を保存する")
+    parser.add_argument("--no-alloc", action="store_true", help="メモリ確保量を測らない")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="結果をベースラインとして保存する")
+    args = parser.parse_args(argv)
+
+    # ログは計測対象外
+    os.environ.setdefault("TCG_LOG_LEVEL", "OFF")
+
+    if args.frames:
+        frames = load_frames(args.frames)
+    else:
+        frames = record_frames(args.record[0], args.record[1], max_steps=args.steps)
+        frames += synthetic_frames(args.synthetic)
+    if args.dump_frames:
+        save_frames(args.dump_frames, frames)
+
+    print(f"{len(frames)} frames", file=sys.stderr)
+    results = run_benchmark(args.players, frames, allocations=not args.no_alloc)
+    baseline = load_baseline(args.baseline)
+    print_report(results, baseline)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"baseline saved -> {args.baseline}")
+        return 0
+    regressions = compare(results, baseline)
+    for spec, key, before, after in regressions:
+        print(f"REGRESSION {spec} {key}: {before} -> {after}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+board.py - 12要塞マップの初期配置
+
+  0   1   2        チーム1 (上側) は 1 から、チーム2 (下側) は 10 から開始
+  3   4   5        MIRROR_MAP (i <-> 11-i) で点対称
+  6   7   8
+  9  10  11
+"""
+import random
+
+ADJACENCY = [
+    [1, 3],          # 0
+    [0, 2, 4],       # 1
+    [1, 5],          # 2
+    [0, 4, 6],       # 3
+    [1, 3, 5, 7],    # 4
+    [2, 4, 8],       # 5
+    [3, 7, 9],       # 6
+    [4, 6, 8, 10],   # 7
+    [5, 7, 11],      # 8
+    [6, 10],         # 9
+    [7, 9, 11],      # 10
+    [8, 10],         # 11
+]
+
+# (team, kind, level, pawn_number) の上半分。下半分は点対称にコピーする
+INITIAL_TOP = [
+    (0, 1, 1, 8),    # 0
+    (1, 1, 1, 10),   # 1  チーム1 本拠地
+    (0, 1, 1, 8),    # 2
+    (0, 1, 1, 12),   # 3
+    (0, 1, 2, 20),   # 4  中央の重要拠点
+    (0, 1, 1, 12),   # 5
+]
+
+START_FORTS = {1: 1, 2: 10}
+
+
+def mirror(fid) -> int:
+    return 11 - fid
+
+
+def new_board(seed=None, jitter=0):
+    """
+    初期の state を作る
+
+    jitter > 0 なら中立要塞の兵数を ±jitter の範囲で乱数調整する
+    (対称性を保つため、上下で同じ値を使う)。
+    """
+    rng = random.Random(seed)
+    rows = [None] * 12
+    for fid, (team, kind, level, pawns) in enumerate(INITIAL_TOP):
+        if team == 0 and jitter:
+            pawns = max(0, pawns + rng.randint(-jitter, jitter))
+        rows[fid] = [team, kind, level, pawns, -1, list(ADJACENCY[fid])]
+        m = mirror(fid)
+        m_team = 0 if team == 0 else 3 - team
+        rows[m] = [m_team, kind, level, pawns, -1, list(ADJACENCY[m])]
+    return rows
@@ -0,0 +1,296 @@
+"""
+engine.py - ヘッドレスの対戦シミュレータ
+
+外部のゲームエンジン無しで Controller.update() を駆動する。
+描画はせず、1tickの処理はリストの直接操作だけで済ませる。
+
+    from tcg.players.simulator import Match
+    result = Match(MachinedPlayer(), Kai6Player(), seed=1).run()
+
+ルール (common/rules.py):
+  - 所有している要塞は PRODUCTION_INTERVAL[level] tickごとに1体増える (HARD_LIMITS[level] まで)
+  - 移動 (1, src, dst): src の半分の兵を dst (隣接) へ。出撃地点から SPAWN_INTERVAL ごとに1体ずつ出る
+  - 強化 (2, src, 0): upgrade_cost(level) を払い、UPGRADE_TIME[level] tick後にレベル+1
+  - 敵/中立の要塞に着いた兵は守備兵を1体減らす。守備兵0の要塞に着くと占領
+  - 要塞も移動中・出撃待機の兵も無くなったチームの負け。max_steps で打ち切り (要塞数→総兵力で判定)
+
+自分を常にチーム1 (上側、1番から開始) だと決め打ちしたプレイヤー (MachinedPlayer など) は
+クラス属性 team_one_view = True を持つ。チーム2 に座った時は Simulator.ask() が盤面を
+点対称に反転 (要塞 i <-> 11-i、チーム 1 <-> 2) して渡し、返ったコマンドを元の番号に戻す。
+"""
+import random
+
+from ..common.rules import (
+    HARD_LIMITS, MAX_LEVEL, NO_UPGRADE, PAWN_SPEED, PRODUCTION_INTERVAL,
+    SPAWN_INTERVAL, UPGRADE_TIME, send_amount, upgrade_cost,
+)
+from .board import new_board
+
+# チームの入れ替え (0: 中立はそのまま)
+_SWAP_TEAM = (0, 2, 1)
+
+
+def wants_team_one_view(player) -> bool:
+    """自分がチーム1 の盤面しか扱えないプレイヤーか"""
+    return getattr(player, "team_one_view", False)
+
+
+def mirror_info(info) -> tuple:
+    """
+    info を点対称に反転した新しい info (チーム2 の info → チーム1 から見た形)
+
+    盤面が点対称 (board.py) なので、反転した盤面もルール上そのまま正しい。
+    """
+    team, state, moving_pawns, spawning_pawns, done = info
+    last = len(state) - 1
+    swap = _SWAP_TEAM
+    mirrored = [[swap[s[0]], s[1], s[2], s[3], s[4], [last - n for n in s[5]]] for s in reversed(state)]
+    moving = [[swap[p[0]], p[1], last - p[2], last - p[3], p[4]] for p in moving_pawns]
+    spawning = [[swap[p[0]], p[1], p[2], last - p[3], last - p[4]] for p in spawning_pawns]
+    return (swap[team], mirrored, moving, spawning, done)
+
+
+def mirror_command(command, size=12):
+    """mirror_info の盤面に対するコマンドを元の要塞番号に戻す"""
+    if not command or command[0] == 0:
+        return command
+    cmd, src, dst = command
+    last = size - 1
+    if cmd == 1:
+        return cmd, last - src, last - dst
+    return cmd, last - src, dst
+
+
+class Simulator:
+    """
+    盤面とルールだけを持つエンジン本体 (プレイヤーは持たない)
+
+    state / moving_pawns / spawning_pawns はプレイヤーに渡す info と同じ形式のリスト。
+    tickをまたいで同じオブジェクトを使い回すので、プレイヤー側で書き換えないこと。
+    """
+
+    def __init__(self, state=None, moving_pawns=None, spawning_pawns=None, step=0, production=None):
+        self.state = state if state is not None else new_board()
+        self.moving_pawns = moving_pawns if moving_pawns is not None else []
+        self.spawning_pawns = spawning_pawns if spawning_pawns is not None else []
+        self.step_count = step
+        # 要塞ごとの生産カウンタ (次の1体までの経過tick)
+        self.production = production if production is not None else [0] * len(self.state)
+
+    @classmethod
+    def from_info(cls, info, step=0):
+        """プレイヤーが受け取った info から盤面を複製する (生産カウンタは不明なので0)"""
+        team, state, moving_pawns, spawning_pawns, done = info
+        return cls([list(s) for s in state],
+                   [list(p) for p in moving_pawns],
+                   [list(p) for p in spawning_pawns],
+                   step)
+
+    def clone(self):
+        return Simulator([s[:] for s in self.state],
+                         [p[:] for p in self.moving_pawns],
+                         [p[:] for p in self.spawning_pawns],
+                         self.step_count,
+                         self.production[:])
+
+    def info(self, team, done=False):
+        return (team, self.state, self.moving_pawns, self.spawning_pawns, done)
+
+    def ask(self, player, team, done=False):
+        """team 側の player に info を渡してコマンドを返す (team_one_view なら反転して渡し、戻す)"""
+        if team == 2 and wants_team_one_view(player):
+            return mirror_command(player.update(mirror_info(self.info(team, done))), len(self.state))
+        return player.update(self.info(team, done))
+
+    # --- コマンド ---
+
+    def apply(self, team, command) -> bool:
+        """コマンドを適用する。無効なコマンドは無視して False を返す"""
+        if not command:
+            return False
+        cmd, src, dst = command
+        if cmd == 0:
+            return False
+        state = self.state
+        if not (0 <= src < len(state)) or state[src][0] != team:
+            return False
+        fort = state[src]
+
+        if cmd == 1:
+            if dst not in fort[5]:
+                return False
+            n = send_amount(fort[3])
+            if n < 1:
+                return False
+            fort[3] -= n
+            self.spawning_pawns.append([team, fort[1], n, src, dst])
+            return True
+
+        if cmd == 2:
+            level = fort[2]
+            if level >= MAX_LEVEL or fort[4] != NO_UPGRADE:
+                return False
+            cost = upgrade_cost(level)
+            if fort[3] < cost:
+                return False
+            fort[3] -= cost
+            fort[4] = UPGRADE_TIME[level]
+            return True
+
+        return False
+
+    # --- 1tick進める ---
+
+    def advance(self):
+        self.step_count += 1
+        state = self.state
+        production = self.production
+
+        # 強化・生産
+        for i, fort in enumerate(state):
+            if fort[4] > 0:
+                fort[4] -= 1
+                if fort[4] <= 0:
+                    fort[2] = min(fort[2] + 1, MAX_LEVEL)
+                    fort[4] = NO_UPGRADE
+            if fort[0] == 0:
+                continue
+            if fort[3] < HARD_LIMITS[fort[2]]:
+                production[i] += 1
+                if production[i] >= PRODUCTION_INTERVAL[fort[2]]:
+                    production[i] = 0
+                    fort[3] += 1
+            else:
+                production[i] = 0
+
+        # 出撃
+        if self.step_count % SPAWN_INTERVAL == 0 and self.spawning_pawns:
+            remaining = []
+            for sp in self.spawning_pawns:
+                team, kind, count, src, dst = sp
+                if state[src][0] != team:
+                    continue  # 出撃元を失ったら残りは消える
+                self.moving_pawns.append([team, kind, src, dst, 0.0])
+                sp[2] = count - 1
+                if sp[2] > 0:
+                    remaining.append(sp)
+            self.spawning_pawns[:] = remaining
+
+        # 移動・到着
+        if self.moving_pawns:
+            in_flight = []
+            for pawn in self.moving_pawns:
+                pawn[4] += PAWN_SPEED
+                if pawn[4] < 100.0:
+                    in_flight.append(pawn)
+                    continue
+                team = pawn[0]
+                fort = state[pawn[3]]
+                if fort[0] == team:
+                    fort[3] += 1
+                elif fort[3] > 0:
+                    fort[3] -= 1
+                else:
+                    # 占領
+                    fort[0] = team
+                    fort[3] = 1
+                    fort[4] = NO_UPGRADE
+                    production[pawn[3]] = 0
+            self.moving_pawns[:] = in_flight
+
+    def step(self, command1=None, command2=None):
+        """両チームのコマンドを適用して1tick進める (適用順は毎tick入れ替えて公平にする)"""
+        if self.step_count % 2 == 0:
+            self.apply(1, command1)
+            self.apply(2, command2)
+        else:
+            self.apply(2, command2)
+            self.apply(1, command1)
+        self.advance()
+
+    # --- 勝敗 ---
+
+    def alive(self, team) -> bool:
+        for s in self.state:
+            if s[0] == team:
+                return True
+        for p in self.moving_pawns:
+            if p[0] == team:
+                return True
+        for p in self.spawning_pawns:
+            if p[0] == team:
+                return True
+        return False
+
+    def soldiers(self, team) -> int:
+        return (sum(int(s[3]) for s in self.state if s[0] == team)
+                + sum(1 for p in self.moving_pawns if p[0] == team)
+                + sum(int(p[2]) for p in self.spawning_pawns if p[0] == team))
+
+    def fort_count(self, team) -> int:
+        return sum(1 for s in self.state if s[0] == team)
+
+    def winner(self):
+        """決着していれば勝者 (1/2)、両者全滅なら 0、続行中なら None"""
+        alive1 = self.alive(1)
+        alive2 = self.alive(2)
+        if alive1 and alive2:
+            return None
+        if alive1:
+            return 1
+        if alive2:
+            return 2
+        return 0
+
+    def judge(self) -> int:
+        """打ち切り時の判定: 要塞数 → 総兵力。同じなら引き分け (0)"""
+        f1, f2 = self.fort_count(1), self.fort_count(2)
+        if f1 != f2:
+            return 1 if f1 > f2 else 2
+        s1, s2 = self.soldiers(1), self.soldiers(2)
+        if s1 != s2:
+            return 1 if s1 > s2 else 2
+        return 0
+
+
+class Match:
+    """2つの Controller を対戦させる"""
+
+    def __init__(self, player1, player2, seed=0, max_steps=10000, jitter=0, state=None):
+        self.players = {1: player1, 2: player2}
+        self.seed = seed
+        self.max_steps = max_steps
+        self.sim = Simulator(state if state is not None else new_board(seed, jitter))
+
+    def run(self) -> dict:
+        # プレイヤー内部の random も固定して、同じ seed なら同じ試合になるようにする
+        random.seed(self.seed)
+        sim = self.sim
+        p1 = self.players[1]
+        p2 = self.players[2]
+        winner = None
+        while sim.step_count < self.max_steps:
+            c1 = sim.ask(p1, 1)
+            c2 = sim.ask(p2, 2)
+            sim.step(c1, c2)
+            winner = sim.winner()
+            if winner is not None:
+                break
+        if winner is None:
+            winner = sim.judge()
+
+        # 終了を通知 (ログのflushなど)
+        sim.ask(p1, 1, True)
+        sim.ask(p2, 2, True)
+
+        return {
+            "winner": winner,
+            "steps": sim.step_count,
+            "forts": (sim.fort_count(1), sim.fort_count(2)),
+            "soldiers": (sim.soldiers(1), sim.soldiers(2)),
+            "seed": self.seed,
+        }
+
+
+def run_match(player1, player2, seed=0, max_steps=10000, jitter=0) -> dict:
+    return Match(player1, player2, seed=seed, max_steps=max_steps, jitter=jitter).run()
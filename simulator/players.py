@@ -0,0 +1,52 @@
+"""
+players.py - 同梱プレイヤーの一覧と読み込み
+
+名前 ("kai6" など) か "モジュール:クラス" の形式でプレイヤーを指定できる。
+モジュールはまず players パッケージ (このリポジトリの直下) からの相対パスで探す。
+"""
+import importlib
+
+PLAYERS = {
+    "machined": ("machined_player", "MachinedPlayer"),
+    "new_machined": ("new_machined_player", "NewMachinedPlayer"),
+    "newcomer": ("alternative_newcomer", "NewComer"),
+    "kai3": ("player_kai3", "Kai3Player"),
+    "kai4": ("player_kai4", "Kai4Player"),
+    "kai5": ("player_kai5", "Kai5Player"),
+    "kai6": ("player_kai6", "Kai6Player"),
+    "mcts": ("player_mcts", "MCTSPlayer"),
+}
+
+# 総当たり戦の既定には入れないプレイヤー (名前を指定した時だけ出る)。
+# mcts は1手に持ち時間 (既定 8ms) を使い切るので、入れると総当たりの時間がほぼこれで決まる
+OPT_IN = frozenset({"mcts"})
+DEFAULT_PLAYERS = [name for name in PLAYERS if name not in OPT_IN]
+
+# チーム1 の盤面しか扱えないプレイヤー。今は team_one_view で分かるが、それを付ける前の
+# リビジョン (regression の "@rev") でも鏡写しが要るので名前でも持っておく
+TEAM_ONE_ONLY = frozenset({"machined", "new_machined", "newcomer"})
+
+# simulator の親パッケージ (tcg.players)
+BASE_PACKAGE = __package__.rpartition(".")[0]
+
+
+def load_player(spec):
+    """プレイヤー名または "module:Class" からクラスを返す"""
+    if spec in PLAYERS:
+        module_name, class_name = PLAYERS[spec]
+    elif ":" in spec:
+        module_name, class_name = spec.split(":", 1)
+    else:
+        raise KeyError(f"unknown player: {spec} (候補: {', '.join(PLAYERS)})")
+    try:
+        module = importlib.import_module("." + module_name, BASE_PACKAGE)
+    except ModuleNotFoundError as e:
+        # players パッケージの外にあるモジュールは絶対パスで探す
+        if not (e.name or "").startswith(f"{BASE_PACKAGE}.{module_name.split('.')[0]}"):
+            raise
+        module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def make_player(spec, **kwargs):
+    return load_player(spec)(**kwargs)
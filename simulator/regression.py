@@ -0,0 +1,288 @@
+"""
+regression.py - 記録した info の列を2つのプレイヤーに流して、判断と速さの違いを出す
+
+replay.py の記録 (.tcgr) を1ファイルずつ A と B に同じ順番で流し、
+  - 返したコマンド (cmd, src, dst) が違う tick
+  - tick ごとの update() の時間 (と B - A の差)
+を集計する。盤面は記録のまま進む (どちらの手も盤面には反映しない) ので、A と B は必ず同じ info を見る。
+ファイルごとに ProcessPool のワーカーで回し、各ワーカーは最初に2つのクラスを読み込んで使い回す。
+
+    python -m tcg.players.simulator.tournament --players kai5 kai6 --record corpus/   # 記録を作る
+    python -m tcg.players.simulator.regression kai6@HEAD~3 kai6 corpus/                # 3コミット前と比べる
+    python -m tcg.players.simulator.regression machined new_machined corpus/ --show 50
+
+プレイヤーは players.py と同じ指定 (名前 / module:Class) に "@<git のリビジョン>" を付けられる。
+その時はリビジョンを git archive で一時ディレクトリに展開し、別の名前のパッケージとして読み込む。
+"""
+import argparse
+import importlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+from .benchmark import percentile
+from .engine import mirror_command, mirror_info, wants_team_one_view
+from .players import PLAYERS, TEAM_ONE_ONLY, load_player
+from .replay import REPLAY_SUFFIX, Replay
+
+# players パッケージ (このリポジトリの直下) のディレクトリ
+PLAYERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NOOP = (0, 0, 0)
+
+# ワーカープロセス内の状態 (_init_worker で作る)
+_versions = None
+
+
+# --- プレイヤーの読み込み (git のリビジョン指定つき) ---
+
+def checkout(rev) -> str:
+    """rev を一時ディレクトリに展開してパスを返す (展開済みなら使い回す)"""
+    sha = subprocess.run(["git", "rev-parse", "--verify", rev + "^{commit}"], cwd=PLAYERS_DIR,
+                         capture_output=True, text=True, check=True).stdout.strip()
+    target = os.path.join(tempfile.gettempdir(), f"tcg-players-{sha[:12]}")
+    if not os.path.isdir(target):
+        archive = subprocess.run(["git", "archive", "--format=tar", sha], cwd=PLAYERS_DIR,
+                                 capture_output=True, check=True).stdout
+        staging = tempfile.mkdtemp(prefix="tcg-players-")
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(staging)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            pass  # 他のプロセスが先に展開した
+    return target
+
+
+def _package_for(rev) -> str:
+    """rev の展開先を "_tcg_players_<sha>" というパッケージとして登録して名前を返す"""
+    path = checkout(rev)
+    name = "_" + os.path.basename(path).replace("-", "_")
+    if name not in sys.modules:
+        package = types.ModuleType(name)
+        package.__path__ = [path]
+        sys.modules[name] = package
+    return name
+
+
+def team_one_only(spec, cls) -> bool:
+    """
+    チーム1 の盤面しか扱えないプレイヤーか
+
+    クラスの team_one_view は古いリビジョンには無いので、名前 (TEAM_ONE_ONLY) でも判定する。
+    """
+    name = spec.partition("@")[0]
+    if name in TEAM_ONE_ONLY or tuple(name.split(":", 1)) in {PLAYERS[n] for n in TEAM_ONE_ONLY}:
+        return True
+    return wants_team_one_view(cls)
+
+
+def load_version(spec):
+    """"kai6" / "module:Class" / "kai6@HEAD~3" からクラスを返す"""
+    name, _, rev = spec.partition("@")
+    if not rev:
+        return load_player(name)
+    if name in PLAYERS:
+        module_name, class_name = PLAYERS[name]
+    elif ":" in name:
+        module_name, class_name = name.split(":", 1)
+    else:
+        raise KeyError(f"unknown player: {name} (候補: {', '.join(PLAYERS)})")
+    module = importlib.import_module(f"{_package_for(rev)}.{module_name}")
+    return getattr(module, class_name)
+
+
+# --- ワーカー側 ---
+
+def _init_worker(spec_a, spec_b):
+    global _versions
+    # 試合中のログ・標準出力は捨てる
+    os.environ["TCG_LOG_LEVEL"] = "OFF"
+    os.environ.pop("TCG_TELEMETRY", None)
+    sys.stdout = open(os.devnull, "w")
+    _versions = tuple((cls, team_one_only(spec, cls)) for spec, cls in
+                      ((spec_a, load_version(spec_a)), (spec_b, load_version(spec_b))))
+
+
+def _normalize(command) -> tuple:
+    if not command:
+        return NOOP
+    cmd, src, dst = command
+    return int(cmd), int(src), int(dst)
+
+
+def _play(cls, team_one, infos, seed):
+    """infos を順に update() に流して (コマンドのリスト, 時間[us] のリスト, エラー) を返す"""
+    random.seed(seed)
+    commands = []
+    latencies = []
+    perf_counter_ns = time.perf_counter_ns
+    # チーム1 の盤面しか扱えないプレイヤーには、記録がチーム2 なら試合と同じく反転して渡してコマンドを戻す
+    mirrored = team_one and bool(infos) and infos[0][0] == 2
+    if mirrored:
+        infos = [mirror_info(info) for info in infos]
+    try:
+        player = cls()
+        for info in infos:
+            start = perf_counter_ns()
+            command = player.update(info)
+            latencies.append((perf_counter_ns() - start) / 1000.0)
+            if mirrored:
+                command = mirror_command(command, len(info[1]))
+            commands.append(_normalize(command))
+    except Exception as e:
+        return commands, latencies, f"{type(e).__name__}: {e}"
+    return commands, latencies, ""
+
+
+def compare_file(path, seed=0) -> dict:
+    """1ファイル分を A と B に流して比べる (_init_worker の後で呼ぶ)"""
+    replay = Replay(path)
+    # 試合終了の通知 (done) は比べない。プレイヤーが info を書き換えても影響しないよう別々に作る
+    ticks = [i for i in range(len(replay)) if not replay.ticks["done"][i]]
+    results = []
+    for cls, team_one in _versions:
+        results.append(_play(cls, team_one, [replay.info(i) for i in ticks], seed))
+    (commands_a, latency_a, error_a), (commands_b, latency_b, error_b) = results
+    steps = replay.ticks["step"]
+    diffs = [(ticks[i], int(steps[ticks[i]]), a, b)
+             for i, (a, b) in enumerate(zip(commands_a, commands_b)) if a != b]
+    n = min(len(latency_a), len(latency_b))
+    return {
+        "path": path,
+        "ticks": len(ticks),
+        "diffs": diffs,
+        "latency_a": latency_a[:n],
+        "latency_b": latency_b[:n],
+        "error": "; ".join(f"{side}: {e}" for side, e in (("A", error_a), ("B", error_b)) if e),
+    }
+
+
+# --- 親側 ---
+
+def corpus_files(paths) -> list:
+    """ファイルとディレクトリ (の中の .tcgr) を並べる"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(REPLAY_SUFFIX)))
+        else:
+            files.append(path)
+    return files
+
+
+def _stats(values) -> dict:
+    ordered = sorted(values)
+    return {
+        "p50_us": round(percentile(ordered, 50), 1),
+        "p99_us": round(percentile(ordered, 99), 1),
+        "max_us": round(ordered[-1], 1) if ordered else 0.0,
+        "mean_us": round(sum(ordered) / len(ordered), 1) if ordered else 0.0,
+    }
+
+
+def run_regression(spec_a, spec_b, paths, workers=None, seed=0, slowest=10) -> dict:
+    """
+    A と B を記録に流した結果をまとめる
+
+    workers=0 ならこのプロセスで順に回す (デバッグ用)。
+    """
+    files = corpus_files(paths)
+    # リビジョンの展開はワーカーを起動する前に1回だけ
+    for spec in (spec_a, spec_b):
+        if "@" in spec:
+            checkout(spec.partition("@")[2])
+    if workers == 0:
+        saved = sys.stdout
+        try:
+            _init_worker(spec_a, spec_b)
+            results = [compare_file(path, seed) for path in files]
+        finally:
+            sys.stdout = saved
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(spec_a, spec_b)) as pool:
+            results = list(pool.map(compare_file, files, [seed] * len(files)))
+
+    latency_a, latency_b, deltas = [], [], []
+    for r in results:
+        latency_a.extend(r["latency_a"])
+        latency_b.extend(r["latency_b"])
+        deltas.extend((b - a, r["path"], i) for i, (a, b) in enumerate(zip(r["latency_a"], r["latency_b"])))
+    ticks = sum(r["ticks"] for r in results)
+    diff_count = sum(len(r["diffs"]) for r in results)
+    deltas.sort(key=lambda d: -d[0])
+    return {
+        "a": spec_a,
+        "b": spec_b,
+        "files": len(files),
+        "ticks": ticks,
+        "diff_ticks": diff_count,
+        "diff_rate": diff_count / ticks if ticks else 0.0,
+        "latency_a": _stats(latency_a),
+        "latency_b": _stats(latency_b),
+        "latency_delta": _stats([d[0] for d in deltas]),
+        "slowest": [{"path": path, "tick": i, "delta_us": round(delta, 1)} for delta, path, i in deltas[:slowest]],
+        "per_file": [{"path": r["path"], "ticks": r["ticks"], "diffs": r["diffs"], "error": r["error"]}
+                     for r in results],
+    }
+
+
+def print_report(report, show=20):
+    print(f"A = {report['a']}  B = {report['b']}  ({report['files']} files, {report['ticks']} ticks)")
+    print(f"decisions differ on {report['diff_ticks']} ticks ({report['diff_rate'] * 100:.2f}%)")
+    print(f"{'':<8}" + "".join(f"{k:>12}" for k in ("p50_us", "p99_us", "max_us", "mean_us")))
+    for label, key in (("A", "latency_a"), ("B", "latency_b"), ("B - A", "latency_delta")):
+        row = report[key]
+        print(f"{label:<8}" + "".join(f"{row[k]:>12.1f}" for k in ("p50_us", "p99_us", "max_us", "mean_us")))
+
+    shown = 0
+    for f in report["per_file"]:
+        if f["error"]:
+            print(f"ERROR {f['path']}: {f['error']}")
+        for tick, step, a, b in f["diffs"]:
+            if shown >= show:
+                break
+            if shown == 0:
+                print(f"\n{'file':<40} {'tick':>6} {'step':>6}  A -> B")
+            print(f"{os.path.basename(f['path']):<40} {tick:>6} {step:>6}  {a} -> {b}")
+            shown += 1
+    if report["slowest"]:
+        print("\nlargest slowdowns (B - A):")
+        for s in report["slowest"]:
+            print(f"  {os.path.basename(s['path']):<40} tick {s['tick']:>6}  {s['delta_us']:+.1f}us")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="記録した盤面で2つのプレイヤーの判断と速さを比べる")
+    parser.add_argument("a", help="比較元 (名前 / module:Class、@<git rev> 付き可)")
+    parser.add_argument("b", help="比較先")
+    parser.add_argument("corpus", nargs="+", help=f"記録ファイル ({REPLAY_SUFFIX}) かそのディレクトリ")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数 (既定: CPU数、0 ならこのプロセスで)")
+    parser.add_argument("--seed", type=int, default=0, help="ファイルごとに固定する random の seed")
+    parser.add_argument("--show", type=int, default=20, help="表示する違いの数")
+    parser.add_argument("--json", help="結果を JSON で保存する")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    report = run_regression(args.a, args.b, args.corpus, args.workers, args.seed)
+    print_report(report, args.show)
+    print(f"\n{report['ticks']} ticks in {time.perf_counter() - start:.1f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 1 if report["diff_ticks"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
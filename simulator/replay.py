@@ -0,0 +1,280 @@
+"""
+replay.py - 対戦の記録 (バイナリ) と、記録をコピー無しで読むリーダー
+
+Kai の write_full_log はテキストで大きく、兵数を丸め、移動中の兵を書かない。
+ReplayRecorder は Controller.update() を包んで、毎tickの info と返したコマンド
+(と update() にかかった時間) を固定長のレコードで書き出す。
+
+    player = ReplayRecorder(Kai6Player(), "kai6.tcgr")   # Match にそのまま渡せる。done のtickで閉じる
+    replay = Replay("kai6.tcgr")                         # memmap で開く (読み込みは触った所だけ)
+    replay.ticks["pawns"]                                # (tick数, 要塞数) float64 のビュー
+    replay.ticks["cmd"], replay.latency_us()
+    info, command = replay[100]                          # info をリストに戻す (既存プレイヤーにそのまま渡せる *)
+    for info, command in replay: ...
+
+  * 戻るのは値まで: 兵数・強化タイマー・pos は float64 で書くのでそのまま戻るが、整数値のものは
+    int になる (10.0 → 10)。pos が座標 ([x, y]) で来た場合は NaN として書くので座標は戻らない
+    (進行度の無いエンジン用。元の info とは別物になる)。
+
+ファイルの中身 (リトルエンディアン、詰め物なし):
+
+  ヘッダ 64 bytes   magic "TCGREPL1", version, 要塞数 F, 隣接の最大数 K, team, tick数, 移動中の兵の数, 出撃待機の数
+  隣接表            F * K の int8 (足りない所は -1)。8 bytes 境界まで 0 で埋める
+  tick              TICK_FIELDS (要塞ごとの列は F 個ずつ) × tick数
+  移動中の兵         MOVING_FIELDS × 合計 (tick の moving_start から moving_count 個がそのtickの分)
+  出撃待機           SPAWNING_FIELDS × 合計 (spawning_start / spawning_count)
+
+書き込みは1tickずつ: tick はそのままファイルへ、移動中・出撃待機の兵は一時ファイルへ書いていき、
+close() で一時ファイルを後ろに繋いでヘッダの数を埋める (試合全体をメモリに持たない)。
+close() されなかったファイルはヘッダの tick数などが 0 のまま (途中までの記録としては読めない)。
+
+書き込み側は標準ライブラリだけで動く (試合中に使うので)。読み込み側は numpy が必要。
+"""
+import os
+import shutil
+import struct
+import tempfile
+import time
+
+MAGIC = b"TCGREPL1"
+REPLAY_SUFFIX = ".tcgr"
+VERSION = 2
+HEADER = struct.Struct("<8sHHHH4xQQQ20x")
+
+# (名前, struct の型, 要塞ごとか)
+TICK_FIELDS = (
+    ("step", "I", False),
+    ("done", "B", False),
+    ("cmd", "B", False),
+    ("src", "b", False),
+    ("dst", "b", False),
+    ("latency_us", "f", False),
+    ("moving_start", "I", False),
+    ("moving_count", "I", False),
+    ("spawning_start", "I", False),
+    ("spawning_count", "I", False),
+    ("owner", "B", True),
+    ("kind", "B", True),
+    ("level", "B", True),
+    ("pawns", "d", True),
+    ("upgrade", "d", True),
+)
+MOVING_FIELDS = (("team", "B"), ("kind", "B"), ("src", "B"), ("dst", "B"), ("pos", "d"))
+SPAWNING_FIELDS = (("team", "B"), ("kind", "B"), ("src", "B"), ("dst", "B"), ("count", "I"))
+
+MOVING = struct.Struct("<" + "".join(code for _, code in MOVING_FIELDS))
+SPAWNING = struct.Struct("<" + "".join(code for _, code in SPAWNING_FIELDS))
+
+NOOP = (0, 0, 0)
+
+def tick_struct(forts) -> struct.Struct:
+    return struct.Struct("<" + "".join(f"{forts}{code}" if per_fort else code for _, code, per_fort in TICK_FIELDS))
+
+
+def _padded(size) -> int:
+    return (size + 7) // 8 * 8
+
+
+# --- 書き込み ---
+
+class ReplayWriter:
+    """info とコマンドを1tickずつファイルに書き、close() でヘッダ (tick数など) を埋める"""
+
+    def __init__(self, path):
+        self.path = path
+        self.team = 0
+        self.adjacency = None
+        self.count = 0
+        self.moving_count = 0
+        self.spawning_count = 0
+        self._tick = None
+        self._file = None
+        self._moving = None       # 移動中の兵 (一時ファイル。close() で本体の後ろに繋ぐ)
+        self._spawning = None     # 出撃待機 (同上)
+
+    def _open(self, team, state):
+        self.team = team
+        self.adjacency = [list(s[5]) for s in state]
+        self._tick = tick_struct(len(state))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "wb")
+        # ヘッダは数が決まってから書き直すので、ここでは tick数 0 のものを置いておく
+        self._file.write(self._header())
+        neighbors = max(len(n) for n in self.adjacency)
+        table = bytearray()
+        for n in self.adjacency:
+            table += struct.pack(f"<{neighbors}b", *(n + [-1] * (neighbors - len(n))))
+        table += bytes(_padded(len(table)) - len(table))
+        self._file.write(table)
+        self._moving = tempfile.TemporaryFile()
+        self._spawning = tempfile.TemporaryFile()
+
+    def _header(self) -> bytes:
+        return HEADER.pack(MAGIC, VERSION, len(self.adjacency), max(len(n) for n in self.adjacency), self.team,
+                           self.count, self.moving_count, self.spawning_count)
+
+    def append(self, info, command, latency_us=0.0, step=None):
+        team, state, moving_pawns, spawning_pawns, done = info
+        if self._tick is None:
+            self._open(team, state)
+        if moving_pawns:
+            nan = float("nan")
+            pack_moving = MOVING.pack
+            moving = bytearray()
+            for p in moving_pawns:
+                pos = p[4]
+                moving += pack_moving(p[0], p[1], p[2], p[3], nan if isinstance(pos, (list, tuple)) else pos)
+            self._moving.write(moving)
+        if spawning_pawns:
+            pack_spawning = SPAWNING.pack
+            spawning = bytearray()
+            for p in spawning_pawns:
+                spawning += pack_spawning(p[0], p[1], p[3], p[4], int(p[2]))
+            self._spawning.write(spawning)
+
+        cmd, src, dst = command if command else NOOP
+        self._file.write(self._tick.pack(
+            self.count if step is None else step, bool(done), cmd, src, dst, latency_us,
+            self.moving_count, len(moving_pawns), self.spawning_count, len(spawning_pawns),
+            *[s[0] for s in state], *[s[1] for s in state], *[s[2] for s in state],
+            *[s[3] for s in state], *[s[4] for s in state]))
+        self.count += 1
+        self.moving_count += len(moving_pawns)
+        self.spawning_count += len(spawning_pawns)
+
+    def close(self):
+        if self._file is None:
+            return
+        f = self._file
+        self._file = None
+        try:
+            for spool in (self._moving, self._spawning):
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+                spool.close()
+            f.seek(0)
+            f.write(self._header())
+        finally:
+            f.close()
+
+
+class ReplayRecorder:
+    """
+    Controller.update() を包んで記録する
+
+    1tickごとにファイルへ書き、done のtick (試合終了の通知) を記録したら閉じる。途中で止める時は close()。
+    """
+
+    def __init__(self, player, path):
+        self.player = player
+        # 包んだプレイヤーがチーム1 の盤面しか扱えないなら、記録するのも反転後の info
+        self.team_one_view = getattr(player, "team_one_view", False)
+        self.writer = ReplayWriter(path)
+        self.closed = False
+
+    def team_name(self) -> str:
+        return self.player.team_name()
+
+    def update(self, info):
+        start = time.perf_counter_ns()
+        command = self.player.update(info)
+        elapsed = (time.perf_counter_ns() - start) / 1000.0
+        self.writer.append(info, command, elapsed)
+        if info[4]:
+            self.close()
+        return command
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+
+# --- 読み込み ---
+
+def _dtype(fields, forts=None):
+    import numpy as np
+    return np.dtype([(name, "<" + code, (forts,)) if forts and per_fort else (name, "<" + code)
+                     for name, code, per_fort in fields])
+
+
+class Replay:
+    """
+    記録ファイルを memmap で開く
+
+    ticks / moving / spawning は numpy の構造化配列のビュー (ファイルの中身を直接見る)。
+    """
+
+    def __init__(self, path):
+        import numpy as np
+        self.path = path
+        self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        header = HEADER.unpack_from(self._buffer, 0)
+        magic, version, forts, neighbors, team, ticks, moving, spawning = header
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a replay file (magic={magic!r}, version={version})")
+        self.forts = forts
+        self.team = team
+        offset = HEADER.size
+        table = np.frombuffer(self._buffer, dtype=np.int8, count=forts * neighbors, offset=offset)
+        self.adjacency = [[int(v) for v in row if v >= 0] for row in table.reshape(forts, neighbors)]
+        offset += _padded(forts * neighbors)
+
+        tick_dtype = _dtype(TICK_FIELDS, forts)
+        moving_dtype = _dtype([(name, code, False) for name, code in MOVING_FIELDS])
+        spawning_dtype = _dtype([(name, code, False) for name, code in SPAWNING_FIELDS])
+        self.ticks = np.frombuffer(self._buffer, dtype=tick_dtype, count=ticks, offset=offset)
+        offset += tick_dtype.itemsize * ticks
+        self.moving = np.frombuffer(self._buffer, dtype=moving_dtype, count=moving, offset=offset)
+        offset += moving_dtype.itemsize * moving
+        self.spawning = np.frombuffer(self._buffer, dtype=spawning_dtype, count=spawning, offset=offset)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def latency_us(self):
+        return self.ticks["latency_us"]
+
+    def commands(self):
+        """(tick数, 3) の int 配列 (cmd, src, dst)"""
+        import numpy as np
+        ticks = self.ticks
+        return np.stack([ticks["cmd"], ticks["src"], ticks["dst"]], axis=1).astype(np.int64)
+
+    def pawns(self, i):
+        """tick i の (移動中, 出撃待機) の構造化配列のビュー"""
+        tick = self.ticks[i]
+        start, count = int(tick["moving_start"]), int(tick["moving_count"])
+        moving = self.moving[start:start + count]
+        start, count = int(tick["spawning_start"]), int(tick["spawning_count"])
+        return moving, self.spawning[start:start + count]
+
+    def info(self, i) -> tuple:
+        """tick i の info (プレイヤーに渡せるリストの形。毎回新しく作る)"""
+        tick = self.ticks[i]
+        owner, kind, level = tick["owner"].tolist(), tick["kind"].tolist(), tick["level"].tolist()
+        pawns, upgrade = tick["pawns"].tolist(), tick["upgrade"].tolist()
+        state = [[owner[f], kind[f], level[f], _number(pawns[f]), _number(upgrade[f]), list(self.adjacency[f])]
+                 for f in range(self.forts)]
+        moving, spawning = self.pawns(i)
+        moving_pawns = [[t, k, s, d, p] for t, k, s, d, p in moving.tolist()]
+        spawning_pawns = [[t, k, c, s, d] for t, k, s, d, c in spawning.tolist()]
+        return (self.team, state, moving_pawns, spawning_pawns, bool(tick["done"]))
+
+    def command(self, i) -> tuple:
+        tick = self.ticks[i]
+        return int(tick["cmd"]), int(tick["src"]), int(tick["dst"])
+
+    def __getitem__(self, i):
+        return self.info(i), self.command(i)
+
+    def __iter__(self):
+        for i in range(len(self.ticks)):
+            yield self.info(i), self.command(i)
+
+
+def _number(value):
+    """書いた値 (float) を、整数なら int に戻す"""
+    return int(value) if value == int(value) else value
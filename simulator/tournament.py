@@ -0,0 +1,207 @@
+"""
+tournament.py - 同梱プレイヤーの総当たり戦 (マルチプロセス)
+
+全ペアについて、先手/後手の両方 × seed N個 を ProcessPool で並列に回し、
+1試合1行で結果ファイルに書き出しながら、最後に勝率と Elo を表示する。
+
+    python -m tcg.players.simulator.tournament --seeds 20 --workers 8 --out results.csv
+    python -m tcg.players.simulator.tournament --players kai6 newcomer mcts   # mcts は指定した時だけ
+
+既定の参加者は players.DEFAULT_PLAYERS (重い mcts は入らない)。
+中立要塞の初期兵数は既定で ±3 揺らす (tuning と同じ)。--jitter 0 だと seed を変えても
+盤面が同じで、決定的なプレイヤー同士は seed ごとに同じ試合を繰り返すだけになる。
+チーム1 前提のプレイヤー (team_one_view) は後手でも Simulator.ask が盤面と手を鏡写しにするので、
+先手・後手の両方の結果をそのまま集計に使える (_Guarded も team_one_view を引き継ぐ)。
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .engine import Match, wants_team_one_view
+from .players import DEFAULT_PLAYERS, OPT_IN, make_player
+from .replay import REPLAY_SUFFIX, ReplayRecorder
+
+RESULT_FIELDS = ["p1", "p2", "seed", "winner", "steps", "forts1", "forts2",
+                 "soldiers1", "soldiers2", "seconds", "error"]
+
+
+def _init_worker():
+    # 試合中のログ・標準出力は捨てる (ファイルの取り合いとパイプ詰まりを防ぐ)
+    os.environ["TCG_LOG_LEVEL"] = "OFF"
+    sys.stdout = open(os.devnull, "w")
+
+
+class _SideError(Exception):
+    """どちら側のプレイヤーが例外を出したかを持たせる"""
+
+    def __init__(self, side, error):
+        super().__init__(f"{type(error).__name__}: {error}")
+        self.side = side
+
+
+class _Guarded:
+    """update() の例外に陣営番号を付けて投げ直す"""
+
+    def __init__(self, player, side):
+        self.player = player
+        self.side = side
+        self.team_one_view = wants_team_one_view(player)
+
+    def update(self, info):
+        try:
+            return self.player.update(info)
+        except Exception as e:
+            raise _SideError(self.side, e) from e
+
+
+def _recorded(player, record, match_id, side):
+    if not record:
+        return player
+    return ReplayRecorder(player, os.path.join(record, f"{match_id}-t{side}{REPLAY_SUFFIX}"))
+
+
+def play_game(p1, p2, seed, max_steps=10000, jitter=3, record=None) -> dict:
+    """
+    1試合を回して結果を dict で返す (例外を出した側は負け扱いで error に記録する)
+
+    record にディレクトリを渡すと、両プレイヤーの info とコマンドを replay.py の形式で書き出す。
+    """
+    match_id = f"{p1}-{p2}-{seed}"
+    os.environ["TCG_MATCH_ID"] = match_id
+    start = time.perf_counter()
+    row = {"p1": p1, "p2": p2, "seed": seed, "error": ""}
+    try:
+        player1 = _recorded(make_player(p1), record, match_id, 1)
+        player2 = _recorded(make_player(p2), record, match_id, 2)
+        result = Match(_Guarded(player1, 1), _Guarded(player2, 2), seed=seed,
+                       max_steps=max_steps, jitter=jitter).run()
+        row.update(winner=result["winner"], steps=result["steps"],
+                   forts1=result["forts"][0], forts2=result["forts"][1],
+                   soldiers1=result["soldiers"][0], soldiers2=result["soldiers"][1])
+    except _SideError as e:
+        row.update(winner=3 - e.side, steps=0, forts1=0, forts2=0, soldiers1=0, soldiers2=0,
+                   error=f"p{e.side} {e}")
+    except Exception as e:
+        # 生成時などどちらのせいか分からないものは引き分けにして error に残す
+        row.update(winner=0, steps=0, forts1=0, forts2=0, soldiers1=0, soldiers2=0,
+                   error=f"{type(e).__name__}: {e}")
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def schedule(players, seeds):
+    """全ペア × 先手後手 × seed の試合リスト"""
+    games = []
+    for a, b in itertools.combinations(players, 2):
+        for seed in range(seeds):
+            games.append((a, b, seed))
+            games.append((b, a, seed))
+    return games
+
+
+def compute_elo(results, k=16.0, initial=1500.0, passes=10) -> dict:
+    """
+    Elo レーティング
+
+    試合順に依存しないよう、同じ結果列を passes 回なぞって K を減衰させる。
+    """
+    rating = {}
+    ordered = sorted(results, key=lambda r: (r["p1"], r["p2"], r["seed"]))
+    for n in range(passes):
+        step_k = k / (n + 1)
+        for r in ordered:
+            a, b = r["p1"], r["p2"]
+            ra = rating.setdefault(a, initial)
+            rb = rating.setdefault(b, initial)
+            expected = 1.0 / (1.0 + 10 ** ((rb - ra) / 400.0))
+            score = {1: 1.0, 2: 0.0}.get(int(r["winner"]), 0.5)
+            rating[a] = ra + step_k * (score - expected)
+            rating[b] = rb - step_k * (score - expected)
+    return rating
+
+
+def summarize(results) -> dict:
+    """プレイヤーごとの 勝/負/分 と勝率"""
+    table = {}
+    for r in results:
+        winner = int(r["winner"])
+        for side, name in ((1, r["p1"]), (2, r["p2"])):
+            rec = table.setdefault(name, {"games": 0, "wins": 0, "losses": 0, "draws": 0})
+            rec["games"] += 1
+            if winner == side:
+                rec["wins"] += 1
+            elif winner == 0:
+                rec["draws"] += 1
+            else:
+                rec["losses"] += 1
+    for rec in table.values():
+        rec["win_rate"] = (rec["wins"] + 0.5 * rec["draws"]) / rec["games"] if rec["games"] else 0.0
+    return table
+
+
+def run_tournament(players, seeds=4, workers=None, out=None, max_steps=10000, jitter=3,
+                   progress=True, record=None) -> list:
+    games = schedule(players, seeds)
+    results = []
+    writer = None
+    out_file = None
+    if out:
+        out_file = open(out, "w", newline="", encoding="utf-8")
+        writer = csv.DictWriter(out_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(play_game, a, b, seed, max_steps, jitter, record) for a, b, seed in games]
+            for i, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                results.append(row)
+                if writer is not None:
+                    writer.writerow(row)
+                    out_file.flush()
+                if progress and (i % 50 == 0 or i == len(games)):
+                    print(f"[{i}/{len(games)}] games done", file=sys.stderr)
+    finally:
+        if out_file is not None:
+            out_file.close()
+    return results
+
+
+def print_report(results):
+    table = summarize(results)
+    elo = compute_elo(results)
+    print(f"{'player':<14} {'elo':>7} {'games':>6} {'win':>5} {'loss':>5} {'draw':>5} {'rate':>6}")
+    for name in sorted(table, key=lambda n: -elo.get(n, 0)):
+        rec = table[name]
+        print(f"{name:<14} {elo[name]:7.1f} {rec['games']:6d} {rec['wins']:5d} "
+              f"{rec['losses']:5d} {rec['draws']:5d} {rec['win_rate']:6.3f}")
+    errors = [r for r in results if r["error"]]
+    if errors:
+        print(f"\n{len(errors)} games raised errors (e.g. {errors[0]['p1']} vs {errors[0]['p2']}: {errors[0]['error']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="総当たり戦 (マルチプロセス)")
+    parser.add_argument("--players", nargs="+", default=list(DEFAULT_PLAYERS),
+                        help="プレイヤー名または module:Class "
+                             f"(既定: {', '.join(sorted(OPT_IN))} 以外の同梱プレイヤー)")
+    parser.add_argument("--seeds", type=int, default=4, help="1ペア・1先後あたりの試合数")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数 (既定: CPU数)")
+    parser.add_argument("--max-steps", type=int, default=10000)
+    parser.add_argument("--jitter", type=int, default=3, help="中立要塞の初期兵数の揺らぎ (盤面を seed ごとに変える)")
+    parser.add_argument("--out", default="tournament_results.csv", help="結果ファイル (CSV)")
+    parser.add_argument("--record", help="全試合の記録 (.tcgr) を書き出すディレクトリ")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_tournament(args.players, args.seeds, args.workers, args.out,
+                             args.max_steps, args.jitter, record=args.record)
+    print_report(results)
+    print(f"\n{len(results)} games in {time.perf_counter() - start:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+tuning.py - プレイヤーの調整用の定数 (Config) をローカルシミュレータで探索する
+
+プレイヤーのクラスが config_class (common/config.py の Config) を持っていれば、
+その SPACE から config を引いて、相手プレイヤーたちとの対戦の勝率で比べる。
+持っているのは machined / new_machined / newcomer / kai5 / kai6。kai3・kai4 は
+Kai5・Kai6 の前の版で、比べる相手として残しているだけなので持たせていない。
+
+  successive halving: 全候補を少ない試合数で評価 → 上位 1/eta だけ残して試合を eta 倍に … を rungs 回
+  rungs=1 ならただのランダムサーチ。候補の0番は既定値 (今の定数) なので、改善したかが分かる
+
+試合は常駐の ProcessPool (探索の最初から最後まで同じワーカー) で並列に回す。
+各ワーカーは最初の試合でプレイヤーのモジュールを読み込み、以降は使い回す。
+上の rung では前の rung までの試合はそのまま使い、足りない seed の分だけ追加で回す。
+
+試合中に例外を出した候補は負け扱いにせず、例外を記録して「失敗」の印を付け、
+それ以降は試合を回さない (結果の表と JSON の "errors" に出る)。
+
+先後は既定で両方。team_one_view のプレイヤー (MachinedPlayer など、チーム1 前提のもの) も
+Simulator.ask が盤面と手を鏡写しにするので、チーム2 側の試合もそのまま評価に使える。
+片側だけで調整したいときは --sides 1。
+
+    python -m tcg.players.simulator.tuning machined --opponents kai6 newcomer --configs 32 --seeds 2
+    python -m tcg.players.simulator.tuning kai6 --opponents kai5 --configs 64 --rungs 4 --out kai6.json
+
+結果の JSON の "config" は Config.from_dict() でそのまま読める:
+
+    Kai6Player(config=Kai6Config.from_dict(json.load(open("kai6.json"))["best"]["config"]))
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .engine import Match
+from .players import load_player
+from .tournament import _Guarded, _SideError
+
+SCORES = {"win": 1.0, "draw": 0.5, "loss": 0.0}
+
+
+def _init_worker():
+    # 試合中のログ・標準出力は捨てる
+    os.environ["TCG_LOG_LEVEL"] = "OFF"
+    os.environ.pop("TCG_TELEMETRY", None)
+    sys.stdout = open(os.devnull, "w")
+
+
+def play(spec, values, opponent, seed, side, max_steps=3000, jitter=3) -> tuple:
+    """
+    spec (config=values) を side 側で opponent と1試合させて (得点, 例外)
+
+    得点は勝ち1, 分け0.5, 負け0。候補が例外を出したら (None, "型: メッセージ") を返す
+    (極端な値で壊れる config を負けと区別するため)。
+    候補と相手は tournament と同じく別々に見張り、相手が試合中に例外を出したら相手の負け
+    (候補の失敗にはしない)。相手を作れないのは候補と関係ないのでそのまま投げる。
+    """
+    cls = load_player(spec)
+    try:
+        player = cls(config=cls.config_class.from_dict(values))
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    other = load_player(opponent)()
+    player, other = _Guarded(player, side), _Guarded(other, 3 - side)
+    players = (player, other) if side == 1 else (other, player)
+    try:
+        winner = Match(*players, seed=seed, max_steps=max_steps, jitter=jitter).run()["winner"]
+    except _SideError as e:
+        if e.side == side:
+            return None, str(e)
+        winner = side
+    except Exception as e:
+        # どちらの update() でもない例外 (エンジンなど) は従来通り候補の失敗にする
+        return None, f"{type(e).__name__}: {e}"
+    if winner == side:
+        return SCORES["win"], None
+    return (SCORES["draw"] if winner == 0 else SCORES["loss"]), None
+
+
+class Candidate:
+    __slots__ = ("id", "values", "scores", "errors", "rung")
+
+    def __init__(self, cid, values):
+        self.id = cid
+        self.values = values
+        self.scores = {}  # (opponent, seed, side) -> 得点
+        self.errors = {}  # (opponent, seed, side) -> 例外 ("型: メッセージ")
+        self.rung = 0
+
+    @property
+    def failed(self) -> bool:
+        """試合中に例外を出した (以降は評価しない)"""
+        return bool(self.errors)
+
+    @property
+    def score(self) -> float:
+        return sum(self.scores.values()) / len(self.scores) if self.scores else 0.0
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "config": self.values, "score": round(self.score, 4),
+                "games": len(self.scores), "rung": self.rung, "failed": self.failed,
+                "errors": [{"opponent": o, "seed": seed, "side": side, "error": error}
+                           for (o, seed, side), error in self.errors.items()]}
+
+    def record(self, key, result):
+        score, error = result
+        if error is None:
+            self.scores[key] = score
+        else:
+            self.errors[key] = error
+
+
+class Tuner:
+    """
+    探索の間ずっと同じ ProcessPool を使う評価器
+
+    workers=0 ならこのプロセスで順に回す (デバッグ用)。
+    """
+
+    def __init__(self, spec, opponents, workers=None, max_steps=3000, jitter=3, progress=True, sides=(1, 2)):
+        self.spec = spec
+        self.opponents = list(opponents)
+        self.sides = tuple(sides)
+        self.max_steps = max_steps
+        self.jitter = jitter
+        self.progress = progress
+        self.config_class = load_player(spec).config_class
+        self._pool = None
+        if workers != 0:
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self.games = 0
+
+    def evaluate(self, candidates, seeds):
+        """
+        各候補について、まだ回していない (相手, seed, 先後) の試合を回して scores に足す
+
+        失敗した候補 (例外を出した) には新しい試合を回さない。
+        並列の場合、同じ候補の試合がすでに投げてあればそれは最後まで回る。
+        """
+        jobs = []
+        for c in candidates:
+            if c.failed:
+                continue
+            for opponent in self.opponents:
+                for seed in seeds:
+                    for side in self.sides:
+                        if (opponent, seed, side) not in c.scores:
+                            jobs.append((c, (opponent, seed, side)))
+        args = (self.max_steps, self.jitter)
+        if self._pool is None:
+            for c, key in jobs:
+                if not c.failed:
+                    c.record(key, play(self.spec, c.values, *key, *args))
+        else:
+            futures = {self._pool.submit(play, self.spec, c.values, *key, *args): (c, key) for c, key in jobs}
+            for i, future in enumerate(as_completed(futures), 1):
+                c, key = futures[future]
+                c.record(key, future.result())
+                if self.progress and i % 100 == 0:
+                    print(f"  [{i}/{len(jobs)}] games", file=sys.stderr)
+        self.games += len(jobs)
+
+    def successive_halving(self, configs=32, seeds=2, eta=2, rungs=3, rng=None) -> list:
+        """
+        configs 個の候補 (0番は既定値) を successive halving で絞る
+
+        rung r では生き残りを seeds * eta**r 個の seed (先後・相手ごと) で評価する。
+        失敗した候補は次の rung に残さず、並びでも一番後ろ。
+        全候補を最後に残った rung の順 → 得点順で並べて返す。
+        """
+        rng = rng or random.Random(0)
+        config_class = self.config_class
+        candidates = [Candidate(0, config_class().tuned())]
+        candidates += [Candidate(i, config_class.sample(rng).tuned()) for i in range(1, configs)]
+        alive = candidates
+        for rung in range(rungs):
+            budget = seeds * eta ** rung
+            start = time.perf_counter()
+            self.evaluate(alive, range(budget))
+            for c in alive:
+                c.rung = rung
+            failed = [c for c in alive if c.failed]
+            alive = sorted((c for c in alive if not c.failed), key=lambda c: -c.score)
+            if self.progress:
+                best = f"best #{alive[0].id} {alive[0].score:.3f}" if alive else "no config survived"
+                print(f"rung {rung}: {len(alive) + len(failed)} configs x {budget} seeds "
+                      f"in {time.perf_counter() - start:.1f}s, {best} (default {candidates[0].score:.3f}), "
+                      f"{len(failed)} failed", file=sys.stderr)
+            if not alive:
+                break
+            if rung < rungs - 1:
+                alive = alive[:max(1, len(alive) // eta)]
+        return sorted(candidates, key=lambda c: (c.failed, -c.rung, -c.score))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Config の探索 (successive halving / ランダムサーチ)")
+    parser.add_argument("player", help="調整するプレイヤー (config_class を持つもの)")
+    parser.add_argument("--opponents", nargs="+", default=["kai6"], help="対戦相手")
+    parser.add_argument("--configs", type=int, default=32, help="候補の数 (0番は既定値)")
+    parser.add_argument("--seeds", type=int, default=2, help="最初の rung の seed 数 (先後・相手ごと)")
+    parser.add_argument("--eta", type=int, default=2, help="rung ごとに残す割合の逆数・試合数の倍率")
+    parser.add_argument("--rungs", type=int, default=3, help="1 ならランダムサーチ")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数 (既定: CPU数)")
+    parser.add_argument("--max-steps", type=int, default=3000)
+    parser.add_argument("--jitter", type=int, default=3, help="中立要塞の初期兵数の揺らぎ (盤面を seed ごとに変える)")
+    parser.add_argument("--sides", type=int, nargs="+", choices=(1, 2), default=[1, 2],
+                        help="調整するプレイヤーが持つ側 (既定: 先後両方)")
+    parser.add_argument("--seed", type=int, default=0, help="候補を引く乱数の seed")
+    parser.add_argument("--show", type=int, default=10)
+    parser.add_argument("--out", help="結果を JSON で保存する")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with Tuner(args.player, args.opponents, args.workers, args.max_steps, args.jitter, sides=args.sides) as tuner:
+        ranked = tuner.successive_halving(args.configs, args.seeds, args.eta, args.rungs,
+                                          random.Random(args.seed))
+    default = next(c for c in ranked if c.id == 0)
+    print(f"{'id':>4} {'rung':>4} {'games':>6} {'score':>6}  config")
+    for c in ranked[:args.show]:
+        mark = "  FAILED" if c.failed else ""
+        print(f"{c.id:>4} {c.rung:>4} {len(c.scores):>6} {c.score:6.3f}  {c.values}{mark}")
+    print(f"default: rung {default.rung}, score {default.score:.3f}" + ("  FAILED" if default.failed else ""))
+    failed = [c for c in ranked if c.failed]
+    if failed:
+        print(f"\n{len(failed)} configs failed (raised during a game):")
+        for c in failed:
+            (opponent, seed, side), error = next(iter(c.errors.items()))
+            print(f"  #{c.id} vs {opponent} seed={seed} side={side}: {error}")
+    print(f"\n{tuner.games} games in {time.perf_counter() - start:.1f}s")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"player": args.player, "opponents": args.opponents, "sides": args.sides,
+                       "best": ranked[0].to_dict(),
+                       "default": default.to_dict(), "ranked": [c.to_dict() for c in ranked]}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+simulator/batched.py が engine.Simulator と同じ盤面になるかの確認
+
+同じ乱数のコマンド (無効なものも混ぜる) を両方に渡して、数tickごとに全試合の盤面を突き合わせる。
+"""
+import random
+
+import numpy as np
+import pytest
+
+from tcg.players.simulator.batched import BatchedSimulator
+from tcg.players.simulator.board import ADJACENCY
+from tcg.players.simulator.engine import Match
+
+GAMES = 16
+TICKS = 3000
+CHECK_EVERY = 10
+
+
+def random_command(rng, state, team):
+    """だいたいは自分の要塞からの出撃か強化、たまに無効なコマンドや何もしない"""
+    r = rng.random()
+    if r < 0.6:
+        return (0, 0, 0)
+    own = [i for i, s in enumerate(state) if s[0] == team]
+    if r < 0.65 or not own:
+        return (rng.randint(0, 2), rng.randrange(12), rng.randrange(12))
+    src = rng.choice(own)
+    if r < 0.8:
+        return (2, src, 0)
+    return (1, src, rng.choice(ADJACENCY[src]))
+
+
+def board(sim):
+    state = [s[:5] for s in sim.state]
+    moving = [(t, k, s, d, round(p, 3)) for t, k, s, d, p in sim.moving_pawns]
+    spawning = [tuple(p) for p in sim.spawning_pawns]
+    return state, moving, spawning, sim.production, sim.step_count
+
+
+def assert_same(batched, sims):
+    for g, sim in enumerate(sims):
+        assert board(batched.to_simulator(g)) == board(sim), f"game {g} tick {sim.step_count}"
+
+
+@pytest.mark.parametrize("jitter", [0, 3])
+def test_initial_board_matches_match(jitter):
+    seeds = list(range(100, 100 + GAMES))
+    batched = BatchedSimulator(GAMES, seeds=seeds, jitter=jitter)
+    for g, seed in enumerate(seeds):
+        expected = Match(None, None, seed=seed, jitter=jitter).sim
+        assert board(batched.to_simulator(g)) == board(expected)
+
+
+def test_same_commands_give_same_boards():
+    rng = random.Random(0)
+    batched = BatchedSimulator(GAMES, seeds=range(GAMES), jitter=3)
+    sims = [batched.to_simulator(g) for g in range(GAMES)]
+    for tick in range(TICKS):
+        c1 = [random_command(rng, sim.state, 1) for sim in sims]
+        c2 = [random_command(rng, sim.state, 2) for sim in sims]
+        batched.step(np.array(c1), np.array(c2))
+        for sim, a, b in zip(sims, c1, c2):
+            sim.step(a, b)
+        if tick % CHECK_EVERY == 0:
+            assert_same(batched, sims)
+    assert_same(batched, sims)
+    assert list(batched.winner()) == [-1 if w is None else w for w in (sim.winner() for sim in sims)]
+
+
+def test_none_commands_only_advance():
+    batched = BatchedSimulator(4, seeds=range(4))
+    sims = [batched.to_simulator(g) for g in range(4)]
+    for _ in range(50):
+        batched.step()
+        for sim in sims:
+            sim.step()
+    assert_same(batched, sims)
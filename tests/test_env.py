@@ -0,0 +1,44 @@
+"""
+player_ml/env.py の BatchedEnv.observe が features.py (1試合用) と同じ特徴量・合法手になるかの確認
+"""
+import random
+
+import numpy as np
+import pytest
+
+from tcg.players.player_ml.env import BatchedEnv, decode_actions
+from tcg.players.player_ml.features import ACTION_COUNT, FeatureBatch, decode
+
+GAMES = 8
+
+
+def random_actions(rng, mask):
+    return np.array([rng.choice(np.flatnonzero(row)) if rng.random() < 0.4 else 0 for row in mask])
+
+
+@pytest.mark.parametrize("team", [1, 2])
+def test_observe_matches_feature_batch(team):
+    rng = random.Random(team)
+    env = BatchedEnv(GAMES, ml_team=team, jitter=3, seed=10)
+    batch = FeatureBatch(GAMES)
+    obs, mask = env.reset()
+    other = 2 if team == 1 else 1
+    for tick in range(600):
+        if tick % 20 == 0:
+            for side in (team, other):
+                obs, mask = env.observe(side)
+                infos = [env.sim.info(g, side) for g in range(GAMES)]
+                np.testing.assert_allclose(obs, batch.fill(infos), rtol=1e-5, atol=1e-6)
+                np.testing.assert_array_equal(mask, batch.legal(infos))
+            obs, mask = env.observe(team)
+        _, other_mask = env.observe(other, np.zeros_like(obs), np.zeros_like(mask))
+        obs, mask, _, _, _ = env.step(random_actions(rng, mask), random_actions(rng, other_mask))
+
+
+def test_decode_actions_matches_decode():
+    env = BatchedEnv(1)
+    state = env.sim.info(0, 1)[1]
+    actions = np.arange(ACTION_COUNT)
+    commands = decode_actions(actions)
+    for action, command in zip(actions, commands):
+        assert tuple(command) == tuple(decode(int(action), state)), action
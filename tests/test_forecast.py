@@ -0,0 +1,121 @@
+"""
+common/forecast.py の確認
+
+移動中の兵だけなら (kind 1 なら) engine.Simulator を何もせず進めた結果と同じになるはず。
+出撃待機の兵は最初の1体を早めに見積もるので、エンジンより早いか同じtickに落ちることだけ見る。
+"""
+import random
+
+import pytest
+
+from tcg.players.common.forecast import Forecast
+from tcg.players.common.rules import NO_UPGRADE
+from tcg.players.simulator.board import ADJACENCY, new_board
+from tcg.players.simulator.engine import Simulator
+
+HORIZON = 80
+
+
+def random_board(rng, moving=30, spawning=0):
+    state = new_board(rng.randrange(1000), jitter=3)
+    for s in state:
+        s[0] = rng.choice((0, 1, 2))
+        s[2] = rng.randint(1, 5)
+        s[3] = rng.randint(0, 15)
+    moving_pawns = []
+    for _ in range(moving):
+        src = rng.randrange(len(state))
+        moving_pawns.append([rng.choice((1, 2)), 1, src, rng.choice(ADJACENCY[src]), rng.randrange(0, 100, 2) * 1.0])
+    spawning_pawns = []
+    for _ in range(spawning):
+        src = rng.randrange(len(state))
+        spawning_pawns.append([state[src][0] or 1, 1, rng.randint(1, 8), src, rng.choice(ADJACENCY[src])])
+    return state, moving_pawns, spawning_pawns
+
+
+def run_engine(state, moving_pawns, spawning_pawns, ticks):
+    """何もコマンドを出さずに進めて、tickごとの (所有, 兵数) を返す"""
+    sim = Simulator([s[:] for s in state], [p[:] for p in moving_pawns], [p[:] for p in spawning_pawns])
+    history = [[(s[0], s[3]) for s in sim.state]]
+    for _ in range(ticks):
+        sim.step()
+        history.append([(s[0], s[3]) for s in sim.state])
+    return history
+
+
+def first_flip(history, fid):
+    owner = history[0][fid][0]
+    for tick, row in enumerate(history):
+        if row[fid][0] != owner:
+            return tick
+    return None
+
+
+def test_quiet_board_never_flips():
+    state = new_board(0)
+    forecast = Forecast(state, [], [], horizon=HORIZON)
+    for fid in range(len(state)):
+        assert not forecast.threatened(fid)
+        assert not forecast.flips(fid)
+        assert forecast.needed(fid) == 0
+        assert forecast.fort(fid).flip_tick is None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_moving_pawns_match_engine(seed):
+    rng = random.Random(seed)
+    state, moving_pawns, _ = random_board(rng)
+    history = run_engine(state, moving_pawns, [], HORIZON)
+    forecast = Forecast(state, moving_pawns, [], horizon=HORIZON)
+    for fid in range(len(state)):
+        fort = forecast.fort(fid)
+        assert fort.flip_tick == first_flip(history, fid), fid
+        assert (fort.final_owner, fort.final_pawns) == history[HORIZON][fid], fid
+        assert forecast.flips(fid) == (fort.flip_tick is not None)
+        for tick in (1, 17, 50):
+            assert forecast.pawns_at(fid, tick) == history[tick][fid], (fid, tick)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_needed_is_the_smallest_reinforcement(seed):
+    rng = random.Random(seed)
+    state, moving_pawns, _ = random_board(rng, moving=60)
+    forecast = Forecast(state, moving_pawns, [], horizon=HORIZON)
+    for fid, s in enumerate(state):
+        needed = forecast.needed(fid)
+        if s[0] == 0 or not forecast.flips(fid):
+            assert needed == 0
+            continue
+        assert needed > 0
+        for extra, flips in ((needed, False), (needed - 1, True)):
+            reinforced = [row[:] for row in state]
+            reinforced[fid][3] += extra
+            history = run_engine(reinforced, moving_pawns, [], HORIZON)
+            assert (first_flip(history, fid) is not None) == flips, (fid, extra)
+
+
+def test_spawning_pawns_are_not_late():
+    horizon = 120
+    checked = 0
+    for seed in range(30):
+        rng = random.Random(seed)
+        state, moving_pawns, spawning_pawns = random_board(rng, moving=10, spawning=6)
+        forecast = Forecast(state, moving_pawns, spawning_pawns, horizon=horizon)
+        history = run_engine(state, moving_pawns, spawning_pawns, horizon)
+        checked += check_not_late(forecast, history, state, spawning_pawns)
+    assert checked > 0
+
+
+def check_not_late(forecast, history, state, spawning_pawns):
+    checked = 0
+    for fid, s in enumerate(state):
+        engine_flip = first_flip(history, fid)
+        incoming = [sp for sp in spawning_pawns if sp[4] == fid]
+        # 早く着いて得をするのは味方の増援だけ。出撃元が落ちると残りは消えるので、それも除く
+        if (engine_flip is None or any(sp[0] == s[0] for sp in incoming)
+                or any(first_flip(history, sp[3]) is not None for sp in incoming)):
+            continue
+        checked += 1
+        assert forecast.fort(fid).flip_tick is not None, fid
+        assert forecast.fort(fid).flip_tick <= engine_flip, fid
+    return checked
@@ -0,0 +1,75 @@
+"""
+simulator/replay.py の書いて読み戻す確認
+
+ReplayRecorder で包んだプレイヤーが受け取った info と返したコマンドが、Replay から同じ値で戻るか。
+"""
+import copy
+import random
+
+import pytest
+
+from tcg.players.simulator.engine import Match
+from tcg.players.simulator.players import make_player
+from tcg.players.simulator.replay import Replay, ReplayRecorder
+
+MAX_STEPS = 300
+
+
+class Capture:
+    """受け取った info と返したコマンドを取っておく"""
+
+    def __init__(self, player):
+        self.player = player
+        self.team_one_view = getattr(player, "team_one_view", False)
+        self.seen = []
+
+    def team_name(self) -> str:
+        return self.player.team_name()
+
+    def update(self, info):
+        snapshot = copy.deepcopy(info)
+        command = self.player.update(info)
+        self.seen.append((snapshot, tuple(command) if command else (0, 0, 0)))
+        return command
+
+
+class RandomPlayer:
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+
+    def team_name(self) -> str:
+        return "random"
+
+    def update(self, info):
+        team, state = info[0], info[1]
+        own = [i for i, s in enumerate(state) if s[0] == team]
+        if not own or self.rng.random() < 0.7:
+            return (0, 0, 0)
+        src = self.rng.choice(own)
+        return (1, src, self.rng.choice(state[src][5]))
+
+
+@pytest.mark.parametrize("spec,team", [("kai6", 1), ("kai6", 2), ("newcomer", 2)])
+def test_round_trip(tmp_path, monkeypatch, spec, team):
+    monkeypatch.chdir(tmp_path)   # プレイヤーのログは tmp_path に出す
+    capture = Capture(make_player(spec))
+    path = tmp_path / "match.tcgr"
+    recorder = ReplayRecorder(capture, str(path))
+    players = {team: recorder, 3 - team: RandomPlayer()}
+    Match(players[1], players[2], seed=3, max_steps=MAX_STEPS, jitter=3).run()
+    assert recorder.closed
+
+    replay = Replay(str(path))
+    assert len(replay) == len(capture.seen)
+    assert bool(replay.ticks["done"][-1]) and not replay.ticks["done"][:-1].any()
+    for i, (info, command) in enumerate(capture.seen):
+        assert replay.info(i) == info, i
+        assert replay.command(i) == command, i
+    assert replay.commands().shape == (len(capture.seen), 3)
+
+
+def test_other_file_is_rejected(tmp_path):
+    path = tmp_path / "broken.tcgr"
+    path.write_bytes(b"not a replay" + bytes(64))
+    with pytest.raises(ValueError):
+        Replay(str(path))